@@ -1,3 +1,4 @@
+import os
 from loguru import logger
 
 # Configuration du logger
@@ -5,3 +6,89 @@ logger.add("logs/predict_api.log", rotation="100 MB", level="INFO")
 
 # Logger global accessible partout
 app_logger = logger
+
+# ---------------------------------------------------------
+# Paramètres de service du modèle (surchargeables par variables d'environnement)
+# ---------------------------------------------------------
+
+# Intervalle (secondes) entre deux vérifications d'un nouveau run MLflow
+MODEL_POLL_INTERVAL = float(os.getenv("MODEL_POLL_INTERVAL", "30"))
+
+# Moteur d'inférence : "numpy" (poids exportés, sans TensorFlow) ou "keras"
+MODEL_ENGINE = os.getenv("MODEL_ENGINE", "numpy")
+
+# Nombre maximal de lignes acceptées par /predict/batch
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "10000"))
+
+# Taille maximale (octets) du fichier envoyé à /predict/batch/upload
+PREDICT_BATCH_MAX_BYTES = int(os.getenv("PREDICT_BATCH_MAX_BYTES", str(16 * 1024 ** 2)))
+
+# Micro-batching des appels au modèle (désactivé par défaut)
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "3"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_QUEUE_DEPTH = int(os.getenv("MICROBATCH_QUEUE_DEPTH", "1024"))
+
+# Cache des résultats de prédiction (désactivé par défaut)
+PREDICTION_CACHE_ENABLED = os.getenv("PREDICTION_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+
+# Exécuteur dédié à l'inférence : "thread" ou "process", et nombre de workers
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "4"))
+
+# Taille des paquets de lignes lus / prédits / écrits par /predict/score-all
+SCORE_ALL_CHUNK_SIZE = int(os.getenv("SCORE_ALL_CHUNK_SIZE", "5000"))
+
+# Intervalle minimal (secondes) entre deux vérifications de la base par /health/ready
+DB_PROBE_INTERVAL = float(os.getenv("DB_PROBE_INTERVAL", "5"))
+
+# Nombre de lignes lues par paquet lors de l'extraction des données d'entraînement
+TRAIN_EXTRACT_CHUNK_SIZE = int(os.getenv("TRAIN_EXTRACT_CHUNK_SIZE", "50000"))
+
+# Entraînement incrémental : epochs par défaut et seuil de dérive (statistiques du scaler)
+# au-delà duquel un réentraînement complet est forcé
+TRAIN_INCREMENTAL_EPOCHS = int(os.getenv("TRAIN_INCREMENTAL_EPOCHS", "10"))
+TRAIN_DRIFT_THRESHOLD = float(os.getenv("TRAIN_DRIFT_THRESHOLD", "0.5"))
+# Nombre minimal de nouveaux prêts pour un entraînement incrémental (en dessous, le job ne fait rien
+# et les prêts sont repris au run suivant)
+TRAIN_INCREMENTAL_MIN_ROWS = int(os.getenv("TRAIN_INCREMENTAL_MIN_ROWS", "50"))
+
+# Instantanés sur disque des features d'entraînement (X, y, preprocessor), réutilisés
+# tant que les données n'ont pas changé ; éviction par taille totale et par âge
+FEATURE_SNAPSHOT_ENABLED = os.getenv("FEATURE_SNAPSHOT_ENABLED", "true").lower() in ("1", "true", "yes")
+FEATURE_SNAPSHOT_DIR = os.getenv("FEATURE_SNAPSHOT_DIR", "models/snapshots")
+FEATURE_SNAPSHOT_MAX_BYTES = int(os.getenv("FEATURE_SNAPSHOT_MAX_BYTES", str(2 * 1024 ** 3)))
+FEATURE_SNAPSHOT_MAX_AGE = float(os.getenv("FEATURE_SNAPSHOT_MAX_AGE", str(7 * 24 * 3600)))
+
+# Recherche d'hyperparamètres : nombre de processus d'entraînement en parallèle
+# (les threads TensorFlow sont répartis entre eux)
+TRAIN_SEARCH_WORKERS = int(os.getenv("TRAIN_SEARCH_WORKERS", str(os.cpu_count() or 1)))
+
+# Artefacts d'entraînement (modèle, preprocessor, poids, courbe de loss) : écrits dans un spool local
+# puis envoyés à MLflow par un thread de fond, avec reprises ; le spool survit à un redémarrage.
+# ARTIFACT_ASYNC_UPLOAD=false : envoi synchrone en fin d'entraînement
+ARTIFACT_ASYNC_UPLOAD = os.getenv("ARTIFACT_ASYNC_UPLOAD", "true").lower() in ("1", "true", "yes")
+ARTIFACT_SPOOL_DIR = os.getenv("ARTIFACT_SPOOL_DIR", "models/spool")
+ARTIFACT_UPLOAD_RETRIES = int(os.getenv("ARTIFACT_UPLOAD_RETRIES", "5"))
+ARTIFACT_UPLOAD_BACKOFF = float(os.getenv("ARTIFACT_UPLOAD_BACKOFF", "2"))
+
+# Import CSV (scripts/import_csv.py) : lignes par paquet, chaque paquet dans sa propre transaction
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+# Colonnes du CSV identifiant une ligne source d'un export à l'autre (réimport incrémental)
+IMPORT_KEY_COLUMNS = os.getenv("IMPORT_KEY_COLUMNS", "nom,prenom,date_creation_compte").split(",")
+# Import en flux (--stream) : nombre de processus d'import, chacun avec sa connexion
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", str(os.cpu_count() or 1)))
+
+# Validation croisée (POST /train/cv) : nombre de folds et de processus d'entraînement en parallèle
+TRAIN_CV_FOLDS = int(os.getenv("TRAIN_CV_FOLDS", "5"))
+TRAIN_CV_WORKERS = int(os.getenv("TRAIN_CV_WORKERS", str(os.cpu_count() or 1)))
+
+# Arrêt anticipé : epochs sans amélioration de val_loss avant l'arrêt (0 = désactivé)
+TRAIN_PATIENCE = int(os.getenv("TRAIN_PATIENCE", "5"))
+
+# Entraînement hors mémoire (mode out_of_core) : mémoire allouée aux données
+# (détermine la taille des paquets lus en base) et part de validation (découpage par hachage de prets.id)
+TRAIN_MEMORY_LIMIT_MB = int(os.getenv("TRAIN_MEMORY_LIMIT_MB", "512"))
+TRAIN_VALIDATION_FRACTION = float(os.getenv("TRAIN_VALIDATION_FRACTION", "0.2"))
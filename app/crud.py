@@ -3,6 +3,13 @@ from sqlalchemy.orm import Session
 from app import models, schemas
 
 
+def _invalidate_feature_snapshots():
+    # Une modification en place ne change pas l'empreinte des données d'entraînement
+    # (cf. feature_snapshot.data_fingerprint) : les instantanés de features sont périmés
+    from app.modules.feature_snapshot import feature_snapshots
+    feature_snapshots.clear()
+
+
 # =========================================================
 #                      CRUD Client
 # =========================================================
@@ -40,6 +47,7 @@ def update_client(db: Session, client_id: int, updated_client: schemas.ClientCre
         setattr(db_client, field, value)
 
     db.commit()
+    _invalidate_feature_snapshots()
     db.refresh(db_client)
     return db_client
 
@@ -81,5 +89,6 @@ def update_pret(db: Session, pret_id: int, updated_pret: schemas.PretCreate):
         setattr(db_pret, field, value)
 
     db.commit()
+    _invalidate_feature_snapshots()
     db.refresh(db_pret)
     return db_pret
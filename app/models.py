@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, Float, Boolean,
-    ForeignKey, Date
+    ForeignKey, Date, DateTime, func
 )
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -48,6 +48,12 @@ class Client(Base):
     # Comptes & dates
     date_creation_compte = Column(Date, nullable=True)
 
+    # Import CSV incrémental : empreintes (SHA-256) de l'identité de la ligne source
+    # (nom, prénom, date de création du compte : les noms eux-mêmes ne sont pas stockés)
+    # et du contenu importé. NULL pour les clients créés par l'API.
+    source_key = Column(String(64), unique=True, index=True, nullable=True)
+    row_hash = Column(String(64), nullable=True)
+
     # Relation 1:N -> un client peut avoir plusieurs prêts
     prets = relationship("Pret", back_populates="client", cascade="all, delete-orphan")
 
@@ -61,7 +67,11 @@ class Pret(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     # Relation vers Client
-    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"))
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), index=True)
+
+    # Import CSV incrémental : clé source (cf. Client.source_key) de la ligne dont
+    # provient le prêt, seul prêt du client mis à jour au réimport. NULL pour les prêts créés par l'API.
+    source_key = Column(String(64), unique=True, index=True, nullable=True)
 
     # Données financières du prêt
     montant_pret = Column(Float)
@@ -74,3 +84,21 @@ class Pret(Base):
 
     # Relation SQLAlchemy
     client = relationship("Client", back_populates="prets")
+
+
+# =========================================================
+#       Prediction (mapping table : predictions)
+# =========================================================
+class Prediction(Base):
+    __tablename__ = "predictions"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Prêt évalué
+    pret_id = Column(Integer, ForeignKey("prets.id", ondelete="CASCADE"), index=True)
+
+    # Montant prédit et version du modèle (run MLflow) qui l'a produit
+    montant_pret_predit = Column(Float)
+    model_version = Column(String(64), index=True)
+
+    created_at = Column(DateTime, server_default=func.now())
@@ -1,23 +1,92 @@
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense
+import threading
 
-def create_nn_model(input_dim):
+# L'import paresseux de tensorflow.keras n'est pas sûr entre threads
+# (ex. : /train pendant que le watcher recharge un modèle Keras)
+_keras_import_lock = threading.Lock()
+
+
+def import_keras():
+    """
+    Importe TensorFlow/Keras à la première utilisation seulement :
+    le service de prédiction (moteur NumPy) n'en a pas besoin.
+    """
+    with _keras_import_lock:
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Dense
+    return Sequential, Dense
+
+
+def create_nn_model(input_dim, hidden_units=(64, 32), learning_rate=None):
     """
     Fonction pour créer et compiler un modèle de réseau de neurones simple.
+
+    `hidden_units` donne la largeur de chaque couche cachée (relu) ;
+    `learning_rate` None garde le taux par défaut d'Adam.
     """
+    Sequential, Dense = import_keras()
+
     model = Sequential()
-    model.add(Dense(64, activation='relu', input_dim=input_dim))
-    model.add(Dense(32, activation='relu'))
+    for i, units in enumerate(hidden_units):
+        if i == 0:
+            model.add(Dense(units, activation='relu', input_dim=input_dim))
+        else:
+            model.add(Dense(units, activation='relu'))
     model.add(Dense(1))
-    model.compile(optimizer='adam', loss='mse')
+
+    optimizer = 'adam'
+    if learning_rate is not None:
+        from tensorflow.keras.optimizers import Adam
+        optimizer = Adam(learning_rate=learning_rate)
+    model.compile(optimizer=optimizer, loss='mse')
     return model
 
-def train_model(model, X, y, X_val=None, y_val=None, epochs=50, batch_size=32, verbose=0 ):
-    hist = model.fit(X, y,
-                validation_data=(X_val, y_val) if X_val is not None and y_val is not None else None,
-                epochs=epochs, batch_size=batch_size, verbose=verbose)
+def make_dataset(X, y, batch_size=32, shuffle=False, seed=42):
+    """
+    Pipeline tf.data : float32, mélange optionnel, batchs et préchargement
+    du batch suivant pendant le calcul du batch courant.
+    """
+    import numpy as np
+    import_keras()
+    import tensorflow as tf
+
+    dataset = tf.data.Dataset.from_tensor_slices((
+        np.asarray(X, dtype=np.float32),
+        np.asarray(y, dtype=np.float32),
+    ))
+    if shuffle:
+        dataset = dataset.shuffle(len(X), seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def train_model(model, X, y, X_val=None, y_val=None, epochs=50, batch_size=32, verbose=0, callbacks=None,
+                patience=None):
+    """
+    Entraîne le modèle sur un pipeline tf.data (float32, batché, préchargé).
+
+    Avec `patience` et des données de validation, l'entraînement s'arrête quand
+    val_loss ne s'améliore plus depuis `patience` epochs et les meilleurs poids
+    sont restaurés ; len(hist.history["loss"]) donne le nombre d'epochs effectuées.
+    """
+    has_validation = X_val is not None and y_val is not None
+    hist = fit_dataset(model, make_dataset(X, y, batch_size, shuffle=True),
+                validation_data=make_dataset(X_val, y_val, batch_size) if has_validation else None,
+                epochs=epochs, verbose=verbose, callbacks=callbacks, patience=patience)
     return model , hist
 
+
+def fit_dataset(model, dataset, validation_data=None, epochs=50, verbose=0, callbacks=None, patience=None):
+    """
+    model.fit sur des tf.data.Dataset déjà batchés (en mémoire ou générés
+    paquet par paquet), avec arrêt anticipé optionnel sur val_loss.
+    """
+    callbacks = list(callbacks or [])
+    if patience and validation_data is not None:
+        from tensorflow.keras.callbacks import EarlyStopping
+        callbacks.append(EarlyStopping(monitor="val_loss", patience=patience, restore_best_weights=True))
+
+    return model.fit(dataset, validation_data=validation_data,
+                epochs=epochs, verbose=verbose, callbacks=callbacks)
+
 def model_predict(model, X):
     y_pred = model.predict(X).flatten()
     return y_pred
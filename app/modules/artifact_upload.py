@@ -0,0 +1,202 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from contextlib import nullcontext
+from types import SimpleNamespace
+from typing import Optional
+
+import joblib
+
+from app.config import app_logger, ARTIFACT_SPOOL_DIR, ARTIFACT_UPLOAD_RETRIES, ARTIFACT_UPLOAD_BACKOFF
+from app.modules.metrics import stage_timer, registry, CallbackGauge
+
+# Tag posé sur le run tant que ses artefacts ne sont pas tous dans MLflow :
+# le run n'est pas servi (cf. SERVING_RUNS_FILTER) avant la fin de l'envoi
+PENDING_TAG = "artifacts_pending"
+
+MANIFEST = "manifest.json"
+
+
+def upload_spooled(path):
+    """
+    Envoie à MLflow une entrée du spool (courbe de loss rendue ici, modèle Keras,
+    preprocessor, poids NumPy), retire le tag PENDING_TAG du run puis supprime l'entrée.
+    """
+    import mlflow
+    import mlflow.sklearn
+    import matplotlib.pyplot as plt
+
+    from app.models_ia import import_keras
+    from app.modules.draw import draw_loss
+
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    run_id = manifest["run_id"]
+
+    import_keras()  # TensorFlow initialisé avant le dépicklage du modèle
+    model = joblib.load(os.path.join(path, "model.pkl"))
+
+    # Envoi synchrone depuis l'entraînement : le run est déjà actif dans ce thread
+    active = mlflow.active_run()
+    run = nullcontext() if active and active.info.run_id == run_id else mlflow.start_run(run_id=run_id)
+    with stage_timer("train", "artifact_upload"), run:
+        fig = draw_loss(SimpleNamespace(history=manifest["history"]))
+        try:
+            mlflow.log_figure(fig, "loss.png")
+        finally:
+            plt.close(fig)
+        mlflow.sklearn.log_model(model, manifest["model_name"])  # Enregistrement du modèle dans MLFlow
+        mlflow.log_artifact(os.path.join(path, "preprocessor.pkl"))
+        mlflow.log_artifact(os.path.join(path, "model_weights.npz"))
+        mlflow.delete_tag(PENDING_TAG)
+
+    shutil.rmtree(path, ignore_errors=True)
+    app_logger.info(f"Artefacts du run {run_id} envoyés à MLflow")
+
+
+class ArtifactUploader:
+    """
+    File d'envoi des artefacts d'entraînement vers MLflow.
+
+    L'entraînement écrit les artefacts dans un spool local (un dossier par run,
+    écrit puis renommé) et rend la main ; un thread de fond les envoie, avec
+    reprises espacées (backoff exponentiel). Une entrée en échec après
+    `max_retries` tentatives, ou interrompue par un arrêt, reste dans le spool
+    et est renvoyée au démarrage suivant (resume).
+
+    Parameters
+    ----------
+    spool_dir : str
+        Dossier du spool.
+    max_retries : int
+        Nombre de tentatives par entrée avant abandon (jusqu'au prochain démarrage).
+    backoff : float
+        Délai (secondes) avant la première reprise, doublé à chaque échec.
+    """
+
+    def __init__(self, spool_dir=ARTIFACT_SPOOL_DIR, max_retries=ARTIFACT_UPLOAD_RETRIES,
+                 backoff=ARTIFACT_UPLOAD_BACKOFF):
+        self.spool_dir = spool_dir
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def spool(self, run_id, model, preprocessor, history, model_name):
+        """
+        Écrit les artefacts d'un run dans le spool et retourne le chemin de l'entrée.
+        """
+        from app.modules.numpy_model import NumpyDenseModel
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, run_id)
+        tmp = os.path.join(self.spool_dir, f".{run_id}.tmp")
+        os.makedirs(tmp, exist_ok=True)
+        try:
+            joblib.dump(model, os.path.join(tmp, "model.pkl"))
+            joblib.dump(preprocessor, os.path.join(tmp, "preprocessor.pkl"))
+            # Export des poids pour le moteur d'inférence NumPy (sans TensorFlow)
+            NumpyDenseModel.from_keras(model).save(os.path.join(tmp, "model_weights.npz"))
+            with open(os.path.join(tmp, MANIFEST), "w") as f:
+                json.dump({
+                    "run_id": run_id,
+                    "model_name": model_name,
+                    "history": {k: [float(v) for v in values] for k, values in history.items()},
+                    "created_at": time.time(),
+                }, f)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return path
+
+    def submit(self, path):
+        self.start()
+        self._queue.put(path)
+
+    def pending(self):
+        """Entrées du spool pas encore envoyées."""
+        if not os.path.isdir(self.spool_dir):
+            return 0
+        return sum(
+            os.path.isfile(os.path.join(self.spool_dir, name, MANIFEST))
+            for name in os.listdir(self.spool_dir) if not name.startswith(".")
+        )
+
+    def resume(self):
+        """
+        Remet en file les entrées restées dans le spool (redémarrage), des plus anciennes
+        aux plus récentes, et supprime les écritures interrompues. Retourne leur nombre.
+        """
+        if not os.path.isdir(self.spool_dir):
+            return 0
+        entries = []
+        for name in os.listdir(self.spool_dir):
+            path = os.path.join(self.spool_dir, name)
+            if name.startswith("."):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.isfile(os.path.join(path, MANIFEST)):
+                entries.append((os.path.getmtime(os.path.join(path, MANIFEST)), path))
+        for _, path in sorted(entries):
+            self.submit(path)
+        if entries:
+            app_logger.info(f"{len(entries)} envoi(s) d'artefacts repris depuis le spool")
+        return len(entries)
+
+    def flush(self):
+        """Attend la fin des envois en file (scripts, tests)."""
+        self._queue.join()
+
+    # -----------------------------------------------------
+    # Thread d'envoi
+    # -----------------------------------------------------
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="artifact-uploader", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                path = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._upload_with_retries(path)
+            finally:
+                self._queue.task_done()
+
+    def _upload_with_retries(self, path):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                upload_spooled(path)
+                return True
+            except Exception as e:
+                app_logger.warning(f"Envoi des artefacts {path} en échec (tentative {attempt}) : {e}")
+            if attempt == self.max_retries or self._stop.wait(self.backoff * 2 ** (attempt - 1)):
+                break
+        app_logger.error(f"Artefacts {path} conservés dans le spool, renvoyés au prochain démarrage")
+        return False
+
+
+# Instance partagée par l'entraînement
+artifact_uploader = ArtifactUploader()
+
+registry.register(CallbackGauge(
+    "artifact_spool_entries", "Artefacts d'entraînement en attente d'envoi à MLflow", "state",
+    lambda: {"pending": artifact_uploader.pending()},
+))
@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from typing import Any, Optional
+
+from pydantic import ValidationError
+
+from app.schemas import ClientBase, PretBase, ClientInput
+
+
+def parse_ndjson(text: str) -> list[Any]:
+    """
+    Découpe un flux NDJSON (un objet ClientInput par ligne).
+    Les lignes illisibles (JSON mal formé, entier trop long, imbrication trop
+    profonde) sont conservées sous forme d'erreur pour garder l'ordre.
+    """
+    rows = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            rows.append(ValueError(f"JSON invalide : {e.msg}"))
+        except (ValueError, RecursionError) as e:
+            rows.append(ValueError(f"JSON invalide : {e}"))
+    return rows
+
+
+def _csv_value(value: Optional[str]) -> Optional[str]:
+    """Cellule vide -> None, virgule décimale -> point ('62,5' -> '62.5')."""
+    if value is None or value.strip() == "":
+        return None
+    value = value.strip()
+    try:
+        float(value.replace(",", "."))
+        return value.replace(",", ".")
+    except ValueError:
+        return value
+
+
+def parse_csv(text: str) -> list[dict]:
+    """
+    Lit un CSV au format de data/data.csv et le convertit en payloads ClientInput.
+    Les colonnes inconnues (nom, prenom, sexe...) sont ignorées ;
+    score_credit et risque_personnel alimentent à la fois le client et le prêt,
+    comme dans scripts/import_csv.py.
+
+    Raises
+    ------
+    ValueError
+        Fichier illisible en CSV (champ trop long, guillemets non fermés...).
+    """
+    rows, reader = [], csv.DictReader(io.StringIO(text))
+    try:
+        for line in reader:
+            values = {k: _csv_value(v) for k, v in line.items() if k is not None}
+            rows.append({
+                "client": {f: values.get(f) for f in ClientBase.model_fields if f in values},
+                "pret": {f: values.get(f) for f in PretBase.model_fields if f in values},
+            })
+    except csv.Error as e:
+        # line_num : dernière ligne lue du précédent enregistrement, l'enregistrement fautif commence à la suivante
+        raise ValueError(f"CSV invalide (ligne {reader.line_num + 1}) : {e}")
+    return rows
+
+
+def validate_rows(rows: list[Any]) -> tuple[list[tuple[int, ClientInput]], dict[int, str]]:
+    """
+    Valide chaque ligne indépendamment.
+
+    Returns
+    -------
+    valid : list of (index, ClientInput)
+        Les lignes valides, dans l'ordre d'entrée.
+    errors : dict
+        Message d'erreur par index de ligne invalide.
+    """
+    valid, errors = [], {}
+    for idx, row in enumerate(rows):
+        if isinstance(row, Exception):
+            errors[idx] = str(row)
+            continue
+        try:
+            valid.append((idx, ClientInput.model_validate(row)))
+        except ValidationError as e:
+            # loc vide : la ligne elle-même n'est pas un objet JSON
+            errors[idx] = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" if err["loc"] else err["msg"]
+                for err in e.errors()
+            )
+    return valid, errors
@@ -0,0 +1,177 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+
+from app.config import (
+    app_logger,
+    MICROBATCH_WINDOW_MS,
+    MICROBATCH_MAX_SIZE,
+    MICROBATCH_QUEUE_DEPTH,
+)
+from app.models_ia import model_predict
+from app.modules.metrics import Histogram, registry
+
+
+class QueueFullError(RuntimeError):
+    """La file d'attente du micro-batcher est saturée."""
+
+
+@dataclass
+class _Pending:
+    serving: Any
+    X: np.ndarray
+    enqueued_at: float
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatcher:
+    """
+    Regroupe les appels concurrents à model_predict en une seule passe.
+
+    Les requêtes arrivées dans la fenêtre `window_ms` (comptée depuis la
+    première requête du lot) ou jusqu'à `max_batch_size` requêtes sont
+    concaténées, prédites ensemble, puis les résultats sont redistribués
+    à chaque appelant.
+
+    Parameters
+    ----------
+    window_ms : float
+        Durée maximale d'attente pour compléter un lot, en millisecondes.
+    max_batch_size : int
+        Nombre maximal de requêtes par lot.
+    queue_depth : int
+        Nombre maximal de requêtes en attente avant rejet (QueueFullError).
+    """
+
+    def __init__(self, window_ms=MICROBATCH_WINDOW_MS, max_batch_size=MICROBATCH_MAX_SIZE,
+                 queue_depth=MICROBATCH_QUEUE_DEPTH):
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.queue_depth = queue_depth
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_depth)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self.batch_size_hist = Histogram(
+            "microbatch_batch_size", [1, 2, 4, 8, 16, 32, 64, 128, 256],
+            "Nombre de requêtes regroupées par passe du modèle",
+        )
+        self.queue_wait_hist = Histogram(
+            "microbatch_queue_wait_seconds",
+            [0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25],
+            "Temps d'attente d'une requête avant son passage dans le modèle",
+        )
+
+    # -----------------------------------------------------
+    # API appelée par les routes
+    # -----------------------------------------------------
+    def predict(self, serving, X):
+        """
+        Soumet X au prochain lot et attend la prédiction correspondante.
+        """
+        return self._enqueue(serving, X).result()
+
+    async def submit(self, serving, X):
+        """
+        Version asynchrone de predict, pour la boucle d'événements : l'attente
+        du lot n'occupe aucun thread, le lot n'est donc pas borné par la taille
+        d'un pool.
+        """
+        return await asyncio.wrap_future(self._enqueue(serving, X))
+
+    def _enqueue(self, serving, X) -> Future:
+        self.start()
+        pending = _Pending(serving=serving, X=np.asarray(X), enqueued_at=time.perf_counter())
+        try:
+            self._queue.put_nowait(pending)
+        except queue.Full:
+            raise QueueFullError(f"File de micro-batching saturée ({self.queue_depth} requêtes)")
+        return pending.future
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "queue_depth": self.queue_depth,
+            "queued": self._queue.qsize(),
+            "batch_size": self.batch_size_hist.snapshot(),
+            "queue_wait_seconds": self.queue_wait_hist.snapshot(),
+        }
+
+    # -----------------------------------------------------
+    # Boucle de traitement
+    # -----------------------------------------------------
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = first.enqueued_at + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    # Fenêtre écoulée : on ne prend plus que les requêtes déjà en file
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        now = time.perf_counter()
+        self.batch_size_hist.observe(len(batch))
+        for pending in batch:
+            self.queue_wait_hist.observe(now - pending.enqueued_at)
+
+        # Un lot ne mélange pas deux versions de modèle (remplacement à chaud)
+        groups = {}
+        for pending in batch:
+            groups.setdefault(pending.serving.version, []).append(pending)
+
+        for group in groups.values():
+            try:
+                X = np.vstack([p.X for p in group])
+                y_pred = model_predict(group[0].serving.model, X)
+                offset = 0
+                for p in group:
+                    n = p.X.shape[0]
+                    p.future.set_result(y_pred[offset:offset + n])
+                    offset += n
+            except Exception as e:
+                app_logger.error(f"Erreur de micro-batching : {e}")
+                for p in group:
+                    if not p.future.done():
+                        p.future.set_exception(e)
+
+
+# Instance partagée par les routes de prédiction
+micro_batcher = MicroBatcher()
+registry.register(micro_batcher.batch_size_hist)
+registry.register(micro_batcher.queue_wait_hist)
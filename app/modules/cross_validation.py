@@ -0,0 +1,234 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.config import app_logger, TRAIN_CV_FOLDS, TRAIN_CV_WORKERS, TRAIN_PATIENCE
+from app.database import SessionLocal
+from app.modules.hyperparam_search import _init_trial_worker
+from app.modules.metrics import stage_timer
+from app.modules.model_store import MODEL_ARTIFACT_PATH
+
+TARGET = "montant_pret"
+
+# Part des lignes d'entraînement de chaque tâche réservée à l'arrêt anticipé (val_loss) :
+# les lignes évaluées (fold de validation, jeu de test) ne servent jamais à l'entraînement
+EARLY_STOPPING_FRACTION = 0.1
+
+
+def fold_indices(n, folds=TRAIN_CV_FOLDS, test_fraction=0.2, seed=42):
+    """
+    Découpage des `n` lignes : un jeu de test mis de côté, puis k folds
+    sur les lignes restantes.
+
+    Returns
+    -------
+    (dev, test, splits) : indices des lignes hors test, indices du jeu de test,
+    liste de k couples (indices d'entraînement, indices de validation).
+
+    Raises
+    ------
+    ValueError
+        Moins de 2 folds, ou pas assez de lignes pour le découpage.
+    """
+    from sklearn.model_selection import KFold, train_test_split
+
+    if folds < 2:
+        raise ValueError("folds doit valoir au moins 2")
+    if not 0 < test_fraction < 1:
+        raise ValueError("test_fraction doit être compris entre 0 et 1")
+    dev, test = train_test_split(np.arange(n), test_size=test_fraction, random_state=seed)
+    if len(dev) < folds:
+        raise ValueError(f"Pas assez de lignes ({n}) pour {folds} folds")
+    splits = [
+        (dev[train], dev[val])
+        for train, val in KFold(n_splits=folds, shuffle=True, random_state=seed).split(dev)
+    ]
+    return dev, test, splits
+
+
+def summarize_folds(fold_metrics):
+    """
+    Moyenne et variance (entre folds) de chaque métrique.
+    """
+    return {
+        name: {
+            "mean": float(np.mean([m[name] for m in fold_metrics])),
+            "variance": float(np.var([m[name] for m in fold_metrics])),
+        }
+        for name in fold_metrics[0]
+    }
+
+
+# ---------------------------------------------------------
+# Processus d'entraînement (un fold par appel)
+# ---------------------------------------------------------
+
+def _run_fold(data_dir, fold, train_idx, eval_idx, params):
+    """
+    Entraîne un modèle sur `train_idx` avec son propre preprocessor (fit sur
+    ces lignes seulement) et l'évalue sur `eval_idx`. `fold` vaut None pour le
+    modèle final (toutes les lignes hors test, évalué sur le jeu de test).
+    """
+    import pandas as pd
+
+    from app.models_ia import create_nn_model, train_model, model_predict
+    from app.modules.preprocess import fit_preprocessor, transform_with, split
+    from app.modules.evaluate import evaluate_performance
+    from app.modules.numpy_model import NumpyDenseModel
+
+    df = pd.read_pickle(os.path.join(data_dir, "data.pkl"))
+
+    start = time.time()
+    X, y, preprocessor = fit_preprocessor(df.iloc[train_idx], TARGET)
+    X_eval, y_eval = transform_with(preprocessor, df.iloc[eval_idx], TARGET)
+    X_train, X_es, y_train, y_es = split(X, y, test_size=EARLY_STOPPING_FRACTION)
+
+    model = create_nn_model(X.shape[1])
+    model, hist = train_model(
+        model, X_train, y_train, X_val=X_es, y_val=y_es,
+        epochs=params["epochs"], batch_size=params["batch_size"], patience=params["patience"],
+    )
+    perf = evaluate_performance(y_eval, model_predict(model, X_eval))
+    result = {
+        "fold": fold,
+        "metrics": {k: float(v) for k, v in perf.items()},
+        "rows": len(y),
+        "epochs_run": len(hist.history["loss"]),
+        "duration_seconds": round(time.time() - start, 2),
+    }
+    if fold is None:
+        result.update(
+            n_features=X.shape[1], history=hist.history, preprocessor=preprocessor,
+            weights=NumpyDenseModel.from_keras(model),
+        )
+    return result
+
+
+# ---------------------------------------------------------
+# Orchestration (job de fond)
+# ---------------------------------------------------------
+
+def cross_validation_job(job, model_name=MODEL_ARTIFACT_PATH, folds=TRAIN_CV_FOLDS, workers=TRAIN_CV_WORKERS,
+                         epochs=50, batch_size=32, patience=TRAIN_PATIENCE, test_fraction=0.2, seed=42):
+    """
+    Validation croisée en k folds, en parallèle, puis modèle final évalué
+    sur un jeu de test mis de côté.
+
+    Les k folds et le modèle final (toutes les lignes hors test) sont k + 1
+    tâches indépendantes réparties sur `workers` processus ; chacune entraîne
+    son propre preprocessor sur ses lignes d'entraînement, sans fuite des
+    lignes évaluées. Avec k + 1 cœurs, la durée est proche d'un seul fit.
+
+    Chaque fold est un run MLflow imbriqué ; le run parent porte la moyenne
+    et la variance des métriques (cv_MSE_mean, cv_MSE_variance...), les
+    métriques de test, et le modèle final, qui devient le modèle servi.
+
+    Returns
+    -------
+    dict
+        Métriques par fold, moyenne / variance, métriques de test, id du run.
+    """
+    import mlflow
+
+    from app.models_ia import create_nn_model
+    from app.modules.preprocess import load_training_dataframe, max_pret_id
+    from app.modules.training import log_model_artifacts
+
+    workers = max(1, min(workers, folds + 1))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    params = {"epochs": epochs, "batch_size": batch_size, "patience": patience}
+
+    start = time.time()
+    data_dir = tempfile.mkdtemp(prefix="cross-validation-")
+    db = SessionLocal()
+    try:
+        job.stage = "preprocessing"
+        high_water_mark = max_pret_id(db)
+        with stage_timer("train", "load_training_dataframe"):
+            df = load_training_dataframe(db, max_pret_id=high_water_mark)
+        df = df.dropna(subset=[TARGET]).reset_index(drop=True)
+        dev, test, splits = fold_indices(len(df), folds, test_fraction, seed)
+        # Données brutes partagées avec les processus : le prétraitement est fait par fold
+        df.to_pickle(os.path.join(data_dir, "data.pkl"))
+
+        job.stage = "cross_validation"
+        job.progress = {"folds_done": 0, "folds_total": folds, "final_model": "pending"}
+        results, final = [], None
+
+        with mlflow.start_run() as parent:
+            mlflow.log_params({
+                "mode": "cv", "folds": folds, "workers": workers, "threads_per_worker": threads,
+                "test_fraction": test_fraction, "high_water_mark": high_water_mark, "rows": len(df),
+                **params,
+            })
+
+            context = multiprocessing.get_context("spawn")
+            with stage_timer("train", "cross_validation"), ProcessPoolExecutor(
+                max_workers=workers, mp_context=context,
+                initializer=_init_trial_worker, initargs=(threads,),
+            ) as pool:
+                # Le modèle final (le plus de lignes) part en premier
+                futures = [pool.submit(_run_fold, data_dir, None, dev, test, params)]
+                futures += [
+                    pool.submit(_run_fold, data_dir, i, train_idx, val_idx, params)
+                    for i, (train_idx, val_idx) in enumerate(splits)
+                ]
+                for future in as_completed(futures):
+                    result = future.result()
+                    if result["fold"] is None:
+                        final = result
+                        job.progress = {**job.progress, "final_model": "done"}
+                        continue
+                    results.append(result)
+
+                    with mlflow.start_run(run_name=f"fold-{result['fold']}", nested=True):
+                        mlflow.log_params({"fold": result["fold"], "rows": result["rows"]})
+                        mlflow.log_metrics(result["metrics"])
+                        mlflow.log_metric("duration_seconds", result["duration_seconds"])
+                        mlflow.log_metric("epochs_run", result["epochs_run"])
+                    job.progress = {**job.progress, "folds_done": len(results)}
+
+            results.sort(key=lambda r: r["fold"])
+            summary = summarize_folds([r["metrics"] for r in results])
+            test_metrics = final["metrics"]
+
+            job.stage = "logging"
+            for name, stats in summary.items():
+                mlflow.log_metric(f"cv_{name}_mean", stats["mean"])
+                mlflow.log_metric(f"cv_{name}_variance", stats["variance"])
+            mlflow.log_metrics({f"test_{k}": v for k, v in test_metrics.items()})
+            mlflow.log_metric("epochs_run", final["epochs_run"])
+
+            model = create_nn_model(final["n_features"])
+            model.set_weights(final["weights"].keras_weights())
+            log_model_artifacts(
+                model, final["preprocessor"], SimpleNamespace(history=final["history"]), test_metrics, model_name
+            )
+
+        duration = round(time.time() - start, 2)
+        app_logger.info(f"Validation croisée ({folds} folds) terminée en {duration} s (job {job.id})")
+        return {
+            "mode": "cv",
+            "folds": [
+                {"fold": r["fold"], "metrics": r["metrics"], "epochs_run": r["epochs_run"],
+                 "duration_seconds": r["duration_seconds"]}
+                for r in results
+            ],
+            "cv_metrics": summary,
+            "test_metrics": test_metrics,
+            "rows": len(df),
+            "test_rows": len(test),
+            "workers": workers,
+            "threads_per_worker": threads,
+            "training_time_seconds": duration,
+            "run_id": parent.info.run_id,
+        }
+    finally:
+        db.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
@@ -0,0 +1,119 @@
+import math
+
+import numpy as np
+
+from app.modules.preprocess import build_feature_record
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class CompiledEncoder:
+    """
+    Version "compilée" du ColumnTransformer entraîné par preprocessing().
+
+    Les paramètres appris (valeurs d'imputation, moyennes / écarts-types,
+    modalités du one-hot) sont extraits une fois pour toutes ; l'encodage
+    d'une entrée se fait ensuite directement en NumPy, sans DataFrame ni
+    pipeline scikit-learn.
+
+    Une valeur manquante est imputée comme à l'entraînement ; une modalité
+    inconnue donne une ligne de zéros (handle_unknown="ignore").
+    """
+
+    def __init__(self, n_features, numeric_cols, num_slice, num_fill, num_mean, num_scale,
+                 categorical_cols, cat_fill, cat_lookups):
+        self.n_features = n_features
+        self.numeric_cols = list(numeric_cols)
+        self.num_slice = num_slice
+        self.num_fill = np.asarray(num_fill, dtype=np.float64)
+        self.num_mean = np.asarray(num_mean, dtype=np.float64)
+        self.num_scale = np.asarray(num_scale, dtype=np.float64)
+        self.categorical_cols = list(categorical_cols)
+        self.cat_fill = list(cat_fill)
+        self.cat_lookups = list(cat_lookups)
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor):
+        """
+        Extrait les paramètres d'un ColumnTransformer entraîné.
+
+        Raises
+        ------
+        ValueError
+            Si la structure du preprocessor ne correspond pas à celle de
+            build_preprocessor() (le transform scikit-learn reste alors utilisé).
+        """
+        if preprocessor.remainder != "drop" or set(preprocessor.named_transformers_) - {"num", "cat", "remainder"}:
+            raise ValueError("Structure de ColumnTransformer non supportée")
+
+        columns = {name: cols for name, _, cols in preprocessor.transformers_}
+        n_features = len(preprocessor.get_feature_names_out())
+
+        num = preprocessor.named_transformers_["num"]
+        imputer, scaler = num.named_steps["imputer"], num.named_steps["scaler"]
+        if not _is_missing(imputer.missing_values):
+            raise ValueError("Imputation numérique non supportée")
+        n_num = len(columns["num"])
+        num_mean = scaler.mean_ if scaler.with_mean else np.zeros(n_num)
+        num_scale = scaler.scale_ if scaler.with_std else np.ones(n_num)
+
+        cat = preprocessor.named_transformers_["cat"]
+        cat_imputer, encoder = cat.named_steps["imputer"], cat.named_steps["encoder"]
+        if encoder.handle_unknown != "ignore" or encoder.drop is not None \
+                or getattr(encoder, "infrequent_categories_", None) is not None:
+            raise ValueError("Encodage one-hot non supporté")
+
+        offset = preprocessor.output_indices_["cat"].start
+        cat_lookups = []
+        for categories in encoder.categories_:
+            cat_lookups.append({c: offset + k for k, c in enumerate(categories)})
+            offset += len(categories)
+
+        return cls(
+            n_features=n_features,
+            numeric_cols=columns["num"],
+            num_slice=preprocessor.output_indices_["num"],
+            num_fill=imputer.statistics_,
+            num_mean=num_mean,
+            num_scale=num_scale,
+            categorical_cols=columns["cat"],
+            cat_fill=cat_imputer.statistics_,
+            cat_lookups=cat_lookups,
+        )
+
+    def encode_records(self, records):
+        """
+        Encode une liste de dictionnaires de features (cf. build_feature_record).
+
+        Returns
+        -------
+        np.ndarray
+            Matrice float32 (n_lignes, n_features), mêmes colonnes que transform().
+        """
+        n = len(records)
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+
+        # Numériques : imputation puis standardisation, en une opération vectorielle
+        num = np.array(
+            [[r.get(c) for c in self.numeric_cols] for r in records], dtype=np.float64
+        ).reshape(n, len(self.numeric_cols))
+        num = np.where(np.isnan(num), self.num_fill, num)
+        X[:, self.num_slice] = (num - self.num_mean) / self.num_scale
+
+        # Catégorielles : table modalité -> indice de colonne
+        for col, fill, lookup in zip(self.categorical_cols, self.cat_fill, self.cat_lookups):
+            for i, r in enumerate(records):
+                value = r.get(col)
+                k = lookup.get(fill if _is_missing(value) else value)
+                if k is not None:
+                    X[i, k] = 1.0
+
+        return X.astype(np.float32)
+
+    def encode_inputs(self, inputs):
+        """
+        Encode une liste de ClientInput.
+        """
+        return self.encode_records([build_feature_record(i.client, i.pret) for i in inputs])
@@ -0,0 +1,164 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Optional
+
+from app.config import app_logger, INFERENCE_EXECUTOR, INFERENCE_WORKERS, MICROBATCH_ENABLED
+
+
+def _init_worker_process():
+    """
+    Initialisation d'un worker "process" : chaque processus garde
+    son propre cache de modèle, rafraîchi par son propre watcher.
+    """
+    from app.modules.model_store import model_store
+    model_store.start_watcher()
+
+
+def _worker_status():
+    """
+    Identifiant du worker et version du modèle qu'il a chargée (None si aucune).
+    """
+    from app.modules.model_store import model_store
+    serving = model_store.loaded
+    return os.getpid(), serving.version if serving is not None else None
+
+
+def _run_in_worker(fn, args, kwargs):
+    """
+    Exécute fn dans un worker "process" et renvoie avec son résultat ce que le
+    processus de l'API ne voit pas : durées d'étapes et compteurs du cache.
+    """
+    from app.modules.metrics import collect_stages
+    from app.modules.prediction_cache import prediction_cache
+
+    with collect_stages() as observations:
+        result = fn(*args, **kwargs)
+    return result, {"worker": os.getpid(), "stages": observations, "cache": prediction_cache.stats()}
+
+
+class InferenceExecutor:
+    """
+    Pool dédié aux calculs d'inférence, séparé du threadpool de Starlette.
+
+    Les routes de prédiction y délèguent leur travail CPU : une rafale de
+    prédictions sature ce pool sans consommer les slots utilisés par les
+    routes CRUD et /health.
+
+    En mode "process", les durées d'étapes et les compteurs du cache de chaque
+    worker sont remontés avec les résultats et agrégés dans ce processus
+    (/metrics, /predict/cache). Le micro-batching est refusé dans ce mode :
+    chaque worker aurait son propre micro-batcher.
+
+    Parameters
+    ----------
+    kind : str
+        "thread" (modèle partagé en mémoire) ou "process" (un modèle par worker).
+    max_workers : int
+        Nombre de workers du pool.
+    microbatch : bool
+        Micro-batching activé (incompatible avec kind="process").
+    """
+
+    def __init__(self, kind=INFERENCE_EXECUTOR, max_workers=INFERENCE_WORKERS, microbatch=MICROBATCH_ENABLED):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Type d'exécuteur inconnu : {kind}")
+        if kind == "process" and microbatch:
+            raise ValueError("MICROBATCH_ENABLED n'est pas compatible avec INFERENCE_EXECUTOR=process")
+        self.kind = kind
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._ready_workers: set = set()
+        self._stop = threading.Event()
+        self._warm_thread: Optional[threading.Thread] = None
+
+    def _get(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    # "spawn" : un fork hériterait des verrous des threads déjà lancés
+                    # (watcher, logger) et pourrait bloquer les workers
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker_process,
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="inference"
+                    )
+                app_logger.info(f"Exécuteur d'inférence : {self.kind} x {self.max_workers}")
+            return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Exécute fn(*args, **kwargs) dans le pool sans bloquer la boucle d'événements.
+        En mode "process", fn et ses arguments doivent être picklables.
+        """
+        loop = asyncio.get_running_loop()
+        if self.kind == "thread":
+            return await loop.run_in_executor(self._get(), functools.partial(fn, *args, **kwargs))
+
+        from app.modules.metrics import replay_stages
+        from app.modules.prediction_cache import prediction_cache
+
+        result, report = await loop.run_in_executor(self._get(), _run_in_worker, fn, args, kwargs)
+        replay_stages(report["stages"])
+        prediction_cache.merge_worker(report["worker"], report["cache"])
+        return result
+
+    # -----------------------------------------------------
+    # Démarrage des workers "process" (readiness)
+    # -----------------------------------------------------
+    def start(self, poll_interval=0.5):
+        """
+        Mode "process" : lance les workers dès le démarrage et suit, en tâche de
+        fond, le chargement du modèle dans chacun d'eux (cf. ready).
+        """
+        if self.kind != "process" or (self._warm_thread is not None and self._warm_thread.is_alive()):
+            return
+        self._get()
+        self._stop.clear()
+        self._warm_thread = threading.Thread(
+            target=self._warm_up, args=(poll_interval,), name="inference-warm-up", daemon=True
+        )
+        self._warm_thread.start()
+
+    def _warm_up(self, poll_interval):
+        while not self._stop.is_set() and len(self._ready_workers) < self.max_workers:
+            try:
+                # Une sonde par worker : le pool démarre tous ses processus
+                futures = [self._get().submit(_worker_status) for _ in range(self.max_workers)]
+                wait(futures)
+                for future in futures:
+                    worker, version = future.result()
+                    if version is not None:
+                        self._ready_workers.add(worker)
+            except Exception as e:
+                app_logger.error(f"Sonde des workers d'inférence en échec : {e}")
+            self._stop.wait(poll_interval)
+        if len(self._ready_workers) >= self.max_workers:
+            app_logger.info(f"{self.max_workers} workers d'inférence prêts")
+
+    def ready(self) -> bool:
+        """
+        Les workers peuvent servir : toujours vrai en mode "thread" (modèle du
+        processus), en mode "process" quand chaque worker a chargé un modèle.
+        """
+        return self.kind == "thread" or len(self._ready_workers) >= self.max_workers
+
+    def shutdown(self):
+        self._stop.set()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            self._ready_workers.clear()
+
+
+# Instance partagée par les routes de prédiction
+inference_executor = InferenceExecutor()
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import joblib
+import numpy as np
+from sqlalchemy import select, func
+
+from app.config import (
+    app_logger, FEATURE_SNAPSHOT_DIR, FEATURE_SNAPSHOT_MAX_BYTES, FEATURE_SNAPSHOT_MAX_AGE
+)
+from app.models import Client, Pret
+
+# À incrémenter quand le prétraitement change : les anciens instantanés deviennent
+# introuvables (clé différente) puis sont évincés par âge / taille.
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def data_fingerprint(db, target="montant_pret", max_pret_id=None, extra=None) -> str:
+    """
+    Empreinte des données d'entraînement : nombre de lignes et plus grand id
+    de clients et prets, bornes de lecture et version du prétraitement.
+
+    Les tables n'ont pas de colonne de date de mise à jour : une modification
+    en place d'une ligne existante (UPDATE) ne change pas l'empreinte. Les
+    chemins qui en font (PUT /clients, PUT /prets, réimport CSV) vident donc
+    le cache (FeatureSnapshotCache.clear).
+    """
+    clients = db.execute(select(func.count(Client.id), func.max(Client.id))).one()
+    prets = db.execute(select(func.count(Pret.id), func.max(Pret.id))).one()
+    payload = {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "clients": list(clients),
+        "prets": list(prets),
+        "target": target,
+        "max_pret_id": max_pret_id,
+        "extra": extra,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+class FeatureSnapshotCache:
+    """
+    Instantanés sur disque du résultat de preprocessing() : X, y (.npy,
+    relus en memmap) et preprocessor entraîné, un dossier par empreinte.
+
+    Parameters
+    ----------
+    directory : str
+        Dossier racine des instantanés.
+    max_bytes : int
+        Taille totale maximale ; au-delà, les moins récemment utilisés sont supprimés.
+    max_age : float
+        Âge maximal (secondes) depuis la dernière utilisation.
+    """
+
+    def __init__(self, directory=FEATURE_SNAPSHOT_DIR, max_bytes=FEATURE_SNAPSHOT_MAX_BYTES,
+                 max_age=FEATURE_SNAPSHOT_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def load(self, key):
+        """
+        Retourne (X, y, preprocessor) ou None si l'instantané n'existe pas.
+        X et y sont ouverts en lecture seule sans être copiés en mémoire.
+        """
+        path = self._path(key)
+        if not os.path.isfile(os.path.join(path, "meta.json")):
+            return None
+        try:
+            X = np.load(os.path.join(path, "X.npy"), mmap_mode="r")
+            y = np.load(os.path.join(path, "y.npy"), mmap_mode="r")
+            preprocessor = joblib.load(os.path.join(path, "preprocessor.pkl"))
+        except Exception as e:
+            app_logger.warning(f"Instantané de features {key} illisible, ignoré : {e}")
+            return None
+        # Date d'utilisation, pour l'éviction par âge / taille
+        os.utime(os.path.join(path, "meta.json"))
+        return X, y, preprocessor
+
+    def save(self, key, X, y, preprocessor):
+        """
+        Écrit l'instantané dans un dossier temporaire puis le renomme :
+        un lecteur ne voit jamais d'instantané partiel.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path(f".{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        os.makedirs(tmp, exist_ok=True)
+        try:
+            np.save(os.path.join(tmp, "X.npy"), np.ascontiguousarray(X))
+            np.save(os.path.join(tmp, "y.npy"), np.ascontiguousarray(y))
+            joblib.dump(preprocessor, os.path.join(tmp, "preprocessor.pkl"))
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump({"key": key, "shape": list(X.shape), "created_at": time.time()}, f)
+            with self._lock:
+                if os.path.isdir(self._path(key)):
+                    shutil.rmtree(self._path(key))
+                os.replace(tmp, self._path(key))
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def clear(self):
+        """
+        Supprime tous les instantanés (données modifiées en place, que
+        l'empreinte ne voit pas : cf. data_fingerprint).
+        """
+        with self._lock:
+            if os.path.isdir(self.directory):
+                shutil.rmtree(self.directory, ignore_errors=True)
+
+    def evict(self):
+        """
+        Supprime les instantanés plus vieux que `max_age`, puis les moins
+        récemment utilisés tant que la taille totale dépasse `max_bytes`.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                path = self._path(name)
+                meta = os.path.join(path, "meta.json")
+                if name.startswith(".") or not os.path.isfile(meta):
+                    continue
+                size = sum(
+                    os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)
+                )
+                entries.append((os.path.getmtime(meta), size, path))
+
+            entries.sort()
+            now = time.time()
+            total = sum(size for _, size, _ in entries)
+            for used_at, size, path in entries:
+                if now - used_at > self.max_age or total > self.max_bytes:
+                    shutil.rmtree(path, ignore_errors=True)
+                    total -= size
+                    app_logger.info(f"Instantané de features évincé : {os.path.basename(path)}")
+
+
+# Instance partagée par l'entraînement
+feature_snapshots = FeatureSnapshotCache()
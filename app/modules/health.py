@@ -0,0 +1,45 @@
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.config import DB_PROBE_INTERVAL
+from app.database import engine
+
+
+class DatabaseProbe:
+    """
+    Vérification de la connexion à la base, mise en cache.
+
+    Un `SELECT 1` est exécuté au plus une fois par `interval` secondes ;
+    entre deux vérifications, le dernier résultat est renvoyé. Les sondes
+    fréquentes de l'orchestrateur ne chargent donc pas la base.
+    """
+
+    def __init__(self, interval=DB_PROBE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._checked_at: Optional[float] = None
+        self._connected = False
+        self._error: Optional[str] = None
+
+    def check(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.interval:
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(text("SELECT 1"))
+                    self._connected, self._error = True, None
+                except Exception as e:
+                    self._connected, self._error = False, str(e)
+                self._checked_at = now
+            return {
+                "connected": self._connected,
+                "error": self._error,
+                "checked_seconds_ago": round(now - self._checked_at, 3),
+            }
+
+
+database_probe = DatabaseProbe()
@@ -0,0 +1,231 @@
+import itertools
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.config import app_logger, TRAIN_SEARCH_WORKERS, TRAIN_PATIENCE
+from app.database import SessionLocal
+from app.modules.metrics import stage_timer
+from app.modules.model_store import MODEL_ARTIFACT_PATH
+
+# Espace de recherche par défaut (le modèle historique : [64, 32], adam 0.001, 50 epochs, batch 32)
+DEFAULT_SEARCH_SPACE = {
+    "hidden_units": [[64, 32], [128, 64], [32, 16], [64, 32, 16]],
+    "learning_rate": [0.001, 0.003, 0.01],
+    "epochs": [50],
+    "batch_size": [32, 64],
+}
+
+SEARCH_PARAMS = set(DEFAULT_SEARCH_SPACE)
+
+
+def build_trials(space=None, strategy="grid", n_trials=None, seed=42):
+    """
+    Liste des combinaisons d'hyperparamètres à essayer.
+
+    Parameters
+    ----------
+    space : dict
+        {paramètre: [valeurs]} ; les paramètres absents gardent les valeurs par défaut.
+    strategy : str
+        "grid" (toutes les combinaisons, tronquées à `n_trials`) ou
+        "random" (`n_trials` combinaisons tirées sans remise, 10 par défaut).
+
+    Raises
+    ------
+    ValueError
+        Paramètre inconnu, liste de valeurs vide ou stratégie inconnue.
+    """
+    space = {**DEFAULT_SEARCH_SPACE, **(space or {})}
+    unknown = set(space) - SEARCH_PARAMS
+    if unknown:
+        raise ValueError(f"Hyperparamètres inconnus : {sorted(unknown)}")
+    empty = [k for k, values in space.items() if not values]
+    if empty:
+        raise ValueError(f"Aucune valeur pour : {sorted(empty)}")
+
+    keys = sorted(space)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+    if strategy == "grid":
+        return grid[:n_trials] if n_trials else grid
+    if strategy == "random":
+        return random.Random(seed).sample(grid, min(n_trials or 10, len(grid)))
+    raise ValueError(f"Stratégie inconnue : {strategy}")
+
+
+# ---------------------------------------------------------
+# Processus d'entraînement (un essai par appel)
+# ---------------------------------------------------------
+
+def _init_trial_worker(threads):
+    """
+    Limite les threads TensorFlow du processus pour éviter la sur-souscription :
+    `workers` processus x `threads` threads <= nombre de cœurs.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    from app.models_ia import import_keras
+    import_keras()
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _run_trial(data_dir, index, params):
+    """
+    Entraîne un modèle avec `params` et l'évalue sur le jeu de validation.
+    Les données sont relues en memmap depuis `data_dir` (pas de copie par essai).
+    """
+    from app.models_ia import create_nn_model, train_model, model_predict
+    from app.modules.evaluate import evaluate_performance
+    from app.modules.numpy_model import NumpyDenseModel
+
+    X_train = np.load(os.path.join(data_dir, "X_train.npy"), mmap_mode="r")
+    y_train = np.load(os.path.join(data_dir, "y_train.npy"), mmap_mode="r")
+    X_val = np.load(os.path.join(data_dir, "X_val.npy"), mmap_mode="r")
+    y_val = np.load(os.path.join(data_dir, "y_val.npy"), mmap_mode="r")
+
+    start = time.time()
+    model = create_nn_model(
+        X_train.shape[1], hidden_units=params["hidden_units"], learning_rate=params["learning_rate"]
+    )
+    model, hist = train_model(
+        model, X_train, y_train, X_val=X_val, y_val=y_val,
+        epochs=params["epochs"], batch_size=params["batch_size"], patience=TRAIN_PATIENCE,
+    )
+    perf = evaluate_performance(y_val, model_predict(model, X_val))
+    return {
+        "index": index,
+        "params": params,
+        "metrics": {f"val_{k}": float(v) for k, v in perf.items()},
+        "duration_seconds": round(time.time() - start, 2),
+        "epochs_run": len(hist.history["loss"]),
+        "history": hist.history,
+        "weights": NumpyDenseModel.from_keras(model),
+    }
+
+
+# ---------------------------------------------------------
+# Orchestration (job de fond)
+# ---------------------------------------------------------
+
+def search_job(job, model_name=MODEL_ARTIFACT_PATH, space=None, strategy="grid", n_trials=None,
+               workers=TRAIN_SEARCH_WORKERS, seed=42):
+    """
+    Recherche d'hyperparamètres en parallèle, puis promotion du meilleur modèle.
+
+    Les données sont prétraitées une fois puis partagées avec les processus
+    via des fichiers .npy. Chaque essai est enregistré comme run MLflow
+    imbriqué ; le meilleur (MSE de validation) est enregistré dans le run
+    parent avec modèle, preprocessor et poids NumPy : c'est ce run que
+    l'API sert ensuite.
+
+    Returns
+    -------
+    dict
+        Meilleurs hyperparamètres et métriques, classement des essais, id du run.
+    """
+    import mlflow
+
+    from app.models_ia import create_nn_model, model_predict
+    from app.modules.preprocess import preprocessing, split, max_pret_id
+    from app.modules.evaluate import evaluate_performance
+    from app.modules.training import log_model_artifacts
+
+    trials = build_trials(space, strategy, n_trials, seed)
+    workers = max(1, min(workers, len(trials)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    start = time.time()
+    data_dir = tempfile.mkdtemp(prefix="hyperparam-search-")
+    db = SessionLocal()
+    try:
+        job.stage = "preprocessing"
+        high_water_mark = max_pret_id(db)
+        X, y, preprocessor = preprocessing(db, max_pret_id=high_water_mark)
+        X_train, X_val, y_train, y_val = split(X, y)
+        for name, array in (("X_train", X_train), ("y_train", y_train), ("X_val", X_val), ("y_val", y_val)):
+            np.save(os.path.join(data_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+        job.stage = "search"
+        job.progress = {"trials_done": 0, "trials_total": len(trials), "best": None}
+        results = []
+
+        with mlflow.start_run() as parent:
+            mlflow.log_params({
+                "mode": "search", "strategy": strategy, "trials": len(trials),
+                "workers": workers, "threads_per_worker": threads,
+                "high_water_mark": high_water_mark, "rows": len(y),
+            })
+
+            context = multiprocessing.get_context("spawn")
+            with stage_timer("train", "hyperparam_search"), ProcessPoolExecutor(
+                max_workers=workers, mp_context=context,
+                initializer=_init_trial_worker, initargs=(threads,),
+            ) as pool:
+                futures = [pool.submit(_run_trial, data_dir, i, p) for i, p in enumerate(trials)]
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        app_logger.error(f"Échec d'un essai de la recherche (job {job.id}) : {e}")
+                        continue
+                    results.append(result)
+
+                    # Un run imbriqué par essai (écrit depuis ce processus, pas depuis les workers)
+                    with mlflow.start_run(run_name=f"trial-{result['index']}", nested=True):
+                        mlflow.log_params(result["params"])
+                        mlflow.log_metrics(result["metrics"])
+                        mlflow.log_metric("duration_seconds", result["duration_seconds"])
+                        mlflow.log_metric("epochs_run", result["epochs_run"])
+
+                    best = min(results, key=lambda r: r["metrics"]["val_MSE"])
+                    job.progress = {
+                        "trials_done": len(results),
+                        "trials_total": len(trials),
+                        "best": {"params": best["params"], "metrics": best["metrics"]},
+                    }
+
+            if not results:
+                raise RuntimeError("Tous les essais de la recherche ont échoué")
+
+            # Promotion du meilleur essai : enregistré dans le run parent (servi par l'API)
+            job.stage = "logging"
+            best = min(results, key=lambda r: r["metrics"]["val_MSE"])
+            model = create_nn_model(
+                X.shape[1], hidden_units=best["params"]["hidden_units"],
+                learning_rate=best["params"]["learning_rate"],
+            )
+            model.set_weights(best["weights"].keras_weights())
+            perf = evaluate_performance(y_val, model_predict(model, X_val))
+
+            mlflow.log_params({f"best_{k}": v for k, v in best["params"].items()})
+            mlflow.log_metrics({**best["metrics"], "epochs_run": best["epochs_run"]})
+            log_model_artifacts(model, preprocessor, SimpleNamespace(history=best["history"]), perf, model_name)
+
+        duration = round(time.time() - start, 2)
+        app_logger.info(f"Recherche terminée en {duration} s : {best['params']} (job {job.id})")
+        ranking = sorted(results, key=lambda r: r["metrics"]["val_MSE"])
+        return {
+            "mode": "search",
+            "best_params": best["params"],
+            "best_metrics": best["metrics"],
+            "trials": [
+                {"params": r["params"], "metrics": r["metrics"], "epochs_run": r["epochs_run"],
+                 "duration_seconds": r["duration_seconds"]}
+                for r in ranking
+            ],
+            "workers": workers,
+            "threads_per_worker": threads,
+            "search_time_seconds": duration,
+            "run_id": parent.info.run_id,
+        }
+    finally:
+        db.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
@@ -0,0 +1,122 @@
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from typing import Any, Optional
+
+from app.config import app_logger
+
+
+class JobInProgressError(Exception):
+    """Un job exclusif de même type et de même clé est déjà en cours."""
+
+    def __init__(self, job_id, message=None):
+        super().__init__(message or f"Job déjà en cours ({job_id})")
+        self.job_id = job_id
+
+
+@dataclass
+class Job:
+    """
+    Tâche de fond suivie par l'API (statut, étape, progression, résultat).
+    """
+    id: str
+    kind: str
+    status: str = "pending"          # pending / running / completed / failed
+    stage: Optional[str] = None
+    progress: dict = field(default_factory=dict)
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class JobRegistry:
+    """
+    Exécute des fonctions longues dans des threads et garde leur état en mémoire.
+
+    La fonction reçoit le Job en premier argument pour publier son étape
+    et sa progression ; sa valeur de retour devient le résultat du job.
+    """
+
+    def __init__(self, max_finished=100):
+        self.max_finished = max_finished
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        # Jobs exclusifs en cours : (type, clé) -> id du job
+        self._active: dict[tuple, str] = {}
+
+    def submit(self, kind, fn, *args, **kwargs) -> Job:
+        job = Job(id=uuid.uuid4().hex, kind=kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        threading.Thread(
+            target=self._run, args=(job, fn, args, kwargs), name=f"job-{kind}", daemon=True
+        ).start()
+        return job
+
+    def submit_exclusive(self, kind, key, fn, *args, **kwargs) -> Job:
+        """
+        Comme submit, mais un seul job à la fois par couple (kind, key).
+
+        Raises
+        ------
+        JobInProgressError
+            Si un job de même type et de même clé est déjà en cours.
+        """
+        with self._lock:
+            running = self._active.get((kind, key))
+            if running is not None:
+                raise JobInProgressError(running)
+            job = Job(id=uuid.uuid4().hex, kind=kind)
+            self._jobs[job.id] = job
+            self._active[(kind, key)] = job.id
+            self._prune()
+        threading.Thread(
+            target=self._run_exclusive, args=(job, key, fn, args, kwargs), name=f"job-{kind}", daemon=True
+        ).start()
+        return job
+
+    def _run_exclusive(self, job, key, fn, args, kwargs):
+        try:
+            self._run(job, fn, args, kwargs)
+        finally:
+            with self._lock:
+                self._active.pop((job.kind, key), None)
+
+    def get(self, job_id) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, kind=None) -> list[Job]:
+        with self._lock:
+            return [j for j in self._jobs.values() if kind is None or j.kind == kind]
+
+    def _run(self, job, fn, args, kwargs):
+        job.status, job.started_at = "running", time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = "completed"
+        except Exception as e:
+            app_logger.error(f"Échec du job {job.kind} {job.id} : {e}")
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        # On ne conserve que les `max_finished` jobs terminés les plus récents
+        finished = sorted(
+            (j for j in self._jobs.values() if j.finished_at is not None),
+            key=lambda j: j.finished_at,
+        )
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+
+
+# Registre partagé par les routes
+job_registry = JobRegistry()
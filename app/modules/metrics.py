@@ -0,0 +1,321 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+
+# =========================================================
+#                   Types de métriques
+# =========================================================
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    )
+    return "{" + inner + "}"
+
+
+class _Family:
+    """
+    Base commune : une métrique nommée, éventuellement déclinée par labels.
+    Sans labels, la métrique s'utilise directement ; avec labels, via .labels(...).
+    """
+    kind = "untyped"
+
+    def __init__(self, name, description="", labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._children_lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._children_lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        """Couples (labels, enfant) à exporter."""
+        if not self.labelnames:
+            return [({}, self)]
+        with self._children_lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.labelnames, key)), child) for key, child in items]
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for labels, child in self._samples():
+            lines.extend(child._lines(self.name, labels))
+        return lines
+
+
+class Counter(_Family):
+    """Compteur monotone."""
+    kind = "counter"
+
+    def __init__(self, name, description="", labelnames=()):
+        super().__init__(name, description, labelnames)
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        return Counter(self.name, self.description)
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def _lines(self, name, labels):
+        return [f"{name}{_format_labels(labels)} {self._value}"]
+
+
+class Gauge(Counter):
+    """Valeur instantanée (peut augmenter ou diminuer)."""
+    kind = "gauge"
+
+    def _new_child(self):
+        return Gauge(self.name, self.description)
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+
+class CallbackGauge(_Family):
+    """
+    Jauges lues à l'export depuis une fonction retournant {valeur_de_label: valeur}
+    (ex. : compteurs du cache de prédiction).
+    """
+    kind = "gauge"
+
+    def __init__(self, name, description, labelname, callback):
+        super().__init__(name, description, (labelname,))
+        self.callback = callback
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for label, value in self.callback().items():
+            lines.append(f"{self.name}{_format_labels({self.labelnames[0]: label})} {value}")
+        return lines
+
+
+class Histogram(_Family):
+    """
+    Histogramme cumulatif minimal (compatible avec le format Prometheus).
+
+    Parameters
+    ----------
+    name : str
+        Nom de la métrique.
+    buckets : list of float
+        Bornes supérieures des classes, triées par ordre croissant.
+    description : str
+        Texte d'aide de la métrique.
+    labelnames : tuple of str
+        Noms des labels (optionnel).
+    """
+    kind = "histogram"
+
+    def __init__(self, name, buckets, description="", labelnames=()):
+        super().__init__(name, description, labelnames)
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # dernière classe : +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        return Histogram(self.name, self.buckets, self.description)
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """
+        Retourne les effectifs cumulés par borne, la somme et le nombre d'observations.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + [float("inf")], counts):
+            running += count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {"buckets": cumulative, "sum": total, "count": running}
+
+    def _lines(self, name, labels):
+        snap = self.snapshot()
+        lines = [
+            f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}"
+            for bound, count in snap["buckets"].items()
+        ]
+        lines.append(f"{name}_sum{_format_labels(labels)} {snap['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {snap['count']}")
+        return lines
+
+
+# =========================================================
+#                       Registre
+# =========================================================
+
+class Registry:
+    """Ensemble des métriques exportées par /metrics."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300]
+
+STAGE_SECONDS = registry.register(Histogram(
+    "stage_duration_seconds", LATENCY_BUCKETS,
+    "Durée de chaque étape des pipelines de prédiction et d'entraînement",
+    labelnames=("pipeline", "stage"),
+))
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "Nombre de requêtes HTTP par route et code retour",
+    labelnames=("method", "route", "status"),
+))
+HTTP_ERRORS = registry.register(Counter(
+    "http_request_errors_total", "Nombre de requêtes HTTP en erreur (5xx) par route",
+    labelnames=("method", "route"),
+))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Requêtes HTTP en cours de traitement par méthode",
+    labelnames=("method",),
+))
+HTTP_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", LATENCY_BUCKETS,
+    "Durée des requêtes HTTP par route", labelnames=("method", "route"),
+))
+
+
+# Observations collectées pour un autre processus (cf. collect_stages)
+_stage_sink: contextvars.ContextVar = contextvars.ContextVar("stage_sink", default=None)
+
+
+@contextmanager
+def stage_timer(pipeline, stage):
+    """
+    Mesure la durée du bloc et l'ajoute à l'histogramme de l'étape.
+    """
+    child = STAGE_SECONDS.labels(pipeline=pipeline, stage=stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        child.observe(seconds)
+        sink = _stage_sink.get()
+        if sink is not None:
+            sink.append((pipeline, stage, seconds))
+
+
+@contextmanager
+def collect_stages():
+    """
+    Relève les durées d'étapes mesurées dans le bloc, sous forme de liste
+    (pipeline, stage, secondes) : un worker "process" les renvoie avec son
+    résultat et le processus de l'API les rejoue (replay_stages) dans son /metrics.
+    """
+    observations = []
+    token = _stage_sink.set(observations)
+    try:
+        yield observations
+    finally:
+        _stage_sink.reset(token)
+
+
+def replay_stages(observations):
+    for pipeline, stage, seconds in observations:
+        STAGE_SECONDS.labels(pipeline=pipeline, stage=stage).observe(seconds)
+
+
+# =========================================================
+#               Middleware ASGI (compteurs HTTP)
+# =========================================================
+
+class MetricsMiddleware:
+    """
+    Compte les requêtes, erreurs et requêtes en cours.
+
+    Middleware ASGI brut (pas de BaseHTTPMiddleware) pour limiter le surcoût ;
+    la route est le gabarit FastAPI (/clients/{client_id}), pas le chemin réel,
+    afin de borner le nombre de séries. Le gabarit n'est connu qu'après le routage
+    (FastAPI le dépose dans scope["route"]) : la jauge des requêtes en cours est
+    donc déclinée par méthode seulement.
+
+    Parameters
+    ----------
+    app : ASGI app
+        Application suivante dans la chaîne.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _route_template(scope):
+        route = scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method=method)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            route = self._route_template(scope)
+            HTTP_REQUESTS.labels(method=method, route=route, status=status["code"]).inc()
+            HTTP_SECONDS.labels(method=method, route=route).observe(time.perf_counter() - start)
+            if status["code"] >= 500:
+                HTTP_ERRORS.labels(method=method, route=route).inc()
@@ -0,0 +1,219 @@
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Optional
+
+import joblib
+
+from app.config import app_logger, MODEL_POLL_INTERVAL, MODEL_ENGINE
+from app.models_ia import import_keras, model_predict
+from app.modules.numpy_model import NumpyDenseModel
+from app.modules.encoder import CompiledEncoder
+from app.modules.metrics import stage_timer
+
+# Chemins des artefacts enregistrés par la route /train
+MODEL_ARTIFACT_PATH = "modele_pret"
+PREPROCESSOR_ARTIFACT_PATH = "preprocessor.pkl"
+WEIGHTS_ARTIFACT_PATH = "model_weights.npz"
+
+# Runs servables : terminés, de premier niveau (les essais d'une recherche
+# d'hyperparamètres sont des runs imbriqués, sans modèle enregistré) et dont
+# les artefacts sont tous envoyés (tag artifacts_pending retiré, cf. artifact_upload)
+SERVING_RUNS_FILTER = (
+    "attributes.status = 'FINISHED' and tags.mlflow.parentRunId IS NULL and tags.artifacts_pending IS NULL"
+)
+
+
+@dataclass(frozen=True)
+class ServingModel:
+    """
+    Couple modèle + preprocessor issus d'un même run MLflow.
+
+    L'objet est immuable : une requête qui a récupéré une instance
+    l'utilise jusqu'au bout, même si un nouveau modèle est publié entre-temps.
+    """
+    version: str
+    model: Any
+    preprocessor: Any
+    loaded_at: float
+    engine: str = "keras"
+    encoder: Optional[CompiledEncoder] = None
+    warmup_seconds: Optional[float] = None
+
+    def encode_records(self, records):
+        """
+        Encode des dictionnaires de features (cf. build_feature_record) :
+        encodeur compilé s'il est disponible, sinon transform du preprocessor.
+        """
+        if self.encoder is not None:
+            with stage_timer("predict", "encode"):
+                return self.encoder.encode_records(records)
+
+        import pandas as pd
+
+        with stage_timer("predict", "dataframe_build"):
+            df = pd.DataFrame(records)
+        with stage_timer("predict", "preprocessor_transform"):
+            return self.preprocessor.transform(df)
+
+
+class ModelStore:
+    """
+    Cache en mémoire du dernier modèle entraîné.
+
+    Un thread de surveillance interroge MLflow périodiquement et remplace
+    le modèle courant dès qu'un nouveau run terminé est disponible.
+    Le remplacement est une simple affectation de référence : les requêtes
+    en cours ne sont jamais bloquées.
+    """
+
+    def __init__(self, poll_interval: float = MODEL_POLL_INTERVAL, engine: str = MODEL_ENGINE):
+        self.poll_interval = poll_interval
+        self.engine = engine
+        self._current: Optional[ServingModel] = None
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # -----------------------------------------------------
+    # Accès au modèle courant
+    # -----------------------------------------------------
+    @property
+    def loaded(self) -> Optional[ServingModel]:
+        """
+        Modèle courant s'il est déjà chargé et préchauffé, sans déclencher de chargement.
+        """
+        return self._current
+
+    def current(self) -> ServingModel:
+        """
+        Retourne le modèle courant, en le chargeant au premier appel.
+        """
+        serving = self._current
+        if serving is None:
+            serving = self.refresh()
+        if serving is None:
+            raise RuntimeError("Aucun modèle entraîné disponible dans MLflow")
+        return serving
+
+    def refresh(self) -> Optional[ServingModel]:
+        """
+        Charge le dernier run MLflow s'il diffère du modèle courant.
+        """
+        with self._load_lock:
+            version = self._latest_version()
+            current = self._current
+            if version is None or (current is not None and current.version == version):
+                return current
+
+            start = time.time()
+            with stage_timer("predict", "model_load"):
+                serving = self._load(version)
+            serving = replace(serving, warmup_seconds=self._warm_up(serving))
+            self._current = serving
+            app_logger.info(
+                f"Modèle {version} ({serving.engine}) chargé en {round(time.time() - start, 2)} s, "
+                f"préchauffage {serving.warmup_seconds} s"
+            )
+            return serving
+
+    @staticmethod
+    def _warm_up(serving: ServingModel) -> float:
+        """
+        Inférence de préchauffage sur une ligne entièrement imputée, avant la
+        mise en service : la première vraie requête ne paie pas l'initialisation.
+        Une erreur ici empêche le remplacement du modèle courant.
+        """
+        columns = getattr(serving.preprocessor, "feature_names_in_", [])
+        start = time.perf_counter()
+        model_predict(serving.model, serving.encode_records([dict.fromkeys(columns)]))
+        return round(time.perf_counter() - start, 4)
+
+    # -----------------------------------------------------
+    # Surveillance des nouveaux runs
+    # -----------------------------------------------------
+    def start_watcher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval)
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                app_logger.error(f"Erreur de rechargement du modèle : {e}")
+            self._stop.wait(self.poll_interval)
+
+    # -----------------------------------------------------
+    # Accès MLflow
+    # -----------------------------------------------------
+    def _latest_version(self) -> Optional[str]:
+        import mlflow
+
+        runs = mlflow.search_runs(
+            filter_string=SERVING_RUNS_FILTER,
+            order_by=["attributes.start_time DESC"],
+            max_results=1,
+        )
+        if runs.empty:
+            return None
+        return runs.iloc[0]["run_id"]
+
+    def _load(self, version: str) -> ServingModel:
+        import mlflow
+        import mlflow.sklearn
+
+        model = self._load_numpy_model(version) if self.engine == "numpy" else None
+        engine = "numpy"
+        if model is None:
+            import_keras()  # TensorFlow initialisé avant le dépicklage du modèle
+            model = mlflow.sklearn.load_model(f"runs:/{version}/{MODEL_ARTIFACT_PATH}")
+            engine = "keras"
+
+        preprocessor_path = mlflow.artifacts.download_artifacts(
+            run_id=version, artifact_path=PREPROCESSOR_ARTIFACT_PATH
+        )
+        preprocessor = joblib.load(preprocessor_path)
+        try:
+            encoder = CompiledEncoder.from_preprocessor(preprocessor)
+        except (ValueError, AttributeError, KeyError) as e:
+            app_logger.warning(f"Encodeur compilé indisponible pour le run {version} : {e}")
+            encoder = None
+
+        return ServingModel(
+            version=version,
+            model=model,
+            preprocessor=preprocessor,
+            loaded_at=time.time(),
+            engine=engine,
+            encoder=encoder,
+        )
+
+    def _load_numpy_model(self, version: str) -> Optional[NumpyDenseModel]:
+        """
+        Charge les poids exportés en .npz ; None si le run n'en contient pas
+        (runs antérieurs à l'export), auquel cas on retombe sur le modèle Keras.
+        """
+        import mlflow
+
+        try:
+            weights_path = mlflow.artifacts.download_artifacts(
+                run_id=version, artifact_path=WEIGHTS_ARTIFACT_PATH
+            )
+        except Exception as e:
+            app_logger.warning(f"Pas de poids NumPy pour le run {version} : {e}")
+            return None
+        return NumpyDenseModel.load(weights_path)
+
+
+# Instance partagée par les routes de prédiction
+model_store = ModelStore()
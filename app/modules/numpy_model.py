@@ -0,0 +1,86 @@
+import numpy as np
+
+# Activations supportées (noms Keras)
+ACTIVATIONS = {
+    "relu": lambda x: np.maximum(x, 0.0),
+    "linear": lambda x: x,
+}
+
+
+class NumpyDenseModel:
+    """
+    Réseau dense (empilement de couches Dense) évalué uniquement avec NumPy.
+
+    Reproduit model.predict() du modèle Keras de create_nn_model sans importer
+    TensorFlow : les poids sont exportés en .npz à la fin de l'entraînement.
+
+    Parameters
+    ----------
+    weights : list of np.ndarray
+        Matrices de poids (n_entrées, n_sorties) de chaque couche.
+    biases : list of np.ndarray
+        Vecteurs de biais de chaque couche.
+    activations : list of str
+        Nom de l'activation Keras de chaque couche ("relu", "linear").
+    """
+
+    def __init__(self, weights, biases, activations):
+        unknown = set(activations) - set(ACTIVATIONS)
+        if unknown:
+            raise ValueError(f"Activations non supportées : {sorted(unknown)}")
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = list(activations)
+
+    @property
+    def input_dim(self):
+        return self.weights[0].shape[0]
+
+    @property
+    def hidden_units(self):
+        """Largeur des couches cachées (argument hidden_units de create_nn_model)."""
+        return tuple(W.shape[1] for W in self.weights[:-1])
+
+    def predict(self, X, **kwargs):
+        """
+        Même contrat que keras.Model.predict : retourne un tableau (n, 1).
+        """
+        out = np.asarray(X, dtype=np.float32)
+        for W, b, activation in zip(self.weights, self.biases, self.activations):
+            out = ACTIVATIONS[activation](out @ W + b)
+        return out
+
+    # -----------------------------------------------------
+    # Export / chargement
+    # -----------------------------------------------------
+    @classmethod
+    def from_keras(cls, model):
+        weights, biases, activations = [], [], []
+        for layer in model.layers:
+            W, b = layer.get_weights()
+            weights.append(W)
+            biases.append(b)
+            activations.append(layer.get_config()["activation"])
+        return cls(weights, biases, activations)
+
+    def keras_weights(self):
+        """
+        Poids au format de keras.Model.set_weights ([W0, b0, W1, b1, ...]),
+        pour repartir d'un modèle exporté (entraînement incrémental).
+        """
+        return [array for pair in zip(self.weights, self.biases) for array in pair]
+
+    def save(self, path):
+        arrays = {}
+        for i, (W, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f"W{i}"] = W
+            arrays[f"b{i}"] = b
+        np.savez_compressed(path, activations=np.array(self.activations), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            activations = [str(a) for a in data["activations"]]
+            weights = [data[f"W{i}"] for i in range(len(activations))]
+            biases = [data[f"b{i}"] for i in range(len(activations))]
+        return cls(weights, biases, activations)
@@ -0,0 +1,214 @@
+from collections import Counter
+
+import numpy as np
+from sqlalchemy import select
+
+from app.database import engine
+from app.models import Client, Pret
+from app.modules.preprocess import (
+    feature_columns, column_arrays, build_preprocessor, NUMERIC_COLUMNS, CATEGORICAL_COLUMNS
+)
+
+TARGET = "montant_pret"
+
+# Estimation de la mémoire d'une ligne en cours de traitement (octets) : ligne SQL et
+# DataFrame (chaînes Python des catégorielles) + matrice encodée, et nombre de paquets
+# présents en même temps (brut, encodé, mélangé, paquet suivant préchargé par tf.data)
+ROW_BYTES = 2048
+FEATURE_BYTES = 12
+CHUNKS_IN_FLIGHT = 4
+
+
+def chunk_size_for(memory_limit_mb, n_features=len(NUMERIC_COLUMNS) + 32):
+    """
+    Nombre de lignes par paquet pour rester sous `memory_limit_mb` Mo de données,
+    quelle que soit la taille de la table.
+    """
+    per_row = (ROW_BYTES + FEATURE_BYTES * n_features) * CHUNKS_IN_FLIGHT
+    return max(1000, int(memory_limit_mb * 1024 ** 2 // per_row))
+
+
+def validation_mask(pret_ids, fraction):
+    """
+    Découpage train / validation déterministe : un prêt est en validation
+    si le hachage (multiplicatif, 64 bits) de son id tombe sous `fraction`.
+    Stable d'un run à l'autre et indépendant de l'ordre de lecture.
+    """
+    ids = np.asarray(pret_ids, dtype=np.uint64)
+    hashed = (ids * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(40)
+    return (hashed % np.uint64(10000)) < np.uint64(round(fraction * 10000))
+
+
+def iter_chunks(chunk_size, max_pret_id=None):
+    """
+    Parcourt la jointure Client / Pret par paquets de `chunk_size` lignes
+    (pagination sur prets.id), chaque paquet en DataFrame typé avec pret_id.
+    Une connexion par paquet : le générateur peut être relu à chaque epoch.
+    """
+    import pandas as pd
+
+    stmt = select(Pret.id.label("pret_id"), *feature_columns()).join(Client, Pret.client_id == Client.id)
+    if max_pret_id is not None:
+        stmt = stmt.where(Pret.id <= max_pret_id)
+
+    last_id = 0
+    while True:
+        with engine.connect() as conn:
+            result = conn.execute(stmt.where(Pret.id > last_id).order_by(Pret.id).limit(chunk_size))
+            names = list(result.keys())
+            rows = result.all()
+        if not rows:
+            return
+        yield pd.DataFrame(column_arrays(names, rows))
+        last_id = rows[-1][0]
+
+
+class StreamingPreprocessorFit:
+    """
+    Statistiques du preprocessor accumulées paquet par paquet :
+    valeurs manquantes, moyenne et variance (Welford / Chan) des numériques,
+    effectifs des modalités des catégorielles.
+
+    finalize() retourne un ColumnTransformer de build_preprocessor entraîné
+    avec ces statistiques, identique à un fit sur la table entière.
+
+    Avec `validation_fraction`, le même passage compte les lignes de chaque côté
+    du découpage train / validation (validation_mask sur pret_id) : finalize()
+    refuse un découpage dont un côté est vide (table de quelques prêts).
+    """
+
+    def __init__(self, target=TARGET, missing_threshold=0.40, validation_fraction=None):
+        self.target = target
+        self.missing_threshold = missing_threshold
+        self.validation_fraction = validation_fraction
+        self.rows = 0
+        self.validation_rows = 0
+        self.missing = Counter()
+        self.count = {c: 0 for c in NUMERIC_COLUMNS}
+        self.mean = {c: 0.0 for c in NUMERIC_COLUMNS}
+        self.m2 = {c: 0.0 for c in NUMERIC_COLUMNS}
+        self.values = {c: Counter() for c in CATEGORICAL_COLUMNS}
+
+    def update(self, df):
+        # Mêmes lignes que preprocessing() : cible renseignée
+        df = df.dropna(subset=[self.target])
+        self.rows += len(df)
+        if self.validation_fraction is not None:
+            self.validation_rows += int(validation_mask(df["pret_id"].values, self.validation_fraction).sum())
+        for col in NUMERIC_COLUMNS:
+            values = df[col].astype(float).dropna().values
+            self.missing[col] += len(df) - len(values)
+            if len(values) == 0:
+                continue
+            # Fusion de la moyenne / somme des carrés des écarts du paquet (Chan et al.)
+            n_a, n_b = self.count[col], len(values)
+            mean_b = values.mean()
+            delta = mean_b - self.mean[col]
+            total = n_a + n_b
+            self.mean[col] += delta * n_b / total
+            self.m2[col] += ((values - mean_b) ** 2).sum() + delta ** 2 * n_a * n_b / total
+            self.count[col] = total
+        for col in CATEGORICAL_COLUMNS:
+            values = df[col].dropna()
+            self.missing[col] += len(df) - len(values)
+            self.values[col].update(values.tolist())
+
+    def finalize(self):
+        import pandas as pd
+
+        if self.rows == 0:
+            raise ValueError("Aucune ligne d'entraînement")
+        if self.validation_fraction is not None and not 0 < self.validation_rows < self.rows:
+            side = "de validation" if self.validation_rows == 0 else "d'entraînement"
+            raise ValueError(
+                f"Découpage train / validation sans ligne {side} ({self.rows} lignes, "
+                f"validation_fraction={self.validation_fraction}) : trop peu de prêts pour le mode out_of_core"
+            )
+
+        # Même règle que preprocessing() : colonnes avec plus de 40 % de valeurs manquantes écartées
+        kept = lambda cols: [c for c in cols if self.missing[c] / self.rows <= self.missing_threshold]
+        numeric_cols, categorical_cols = kept(NUMERIC_COLUMNS), kept(CATEGORICAL_COLUMNS)
+
+        # Le fit sur un petit DataFrame contenant toutes les modalités donne la structure
+        # et les catégories du OneHotEncoder ; les statistiques sont ensuite remplacées
+        # par celles de la table entière
+        categories = {c: sorted(self.values[c]) for c in categorical_cols}
+        n = max([len(v) for v in categories.values()] + [1])
+        summary = pd.DataFrame({
+            **{c: [self.mean[c]] * n for c in numeric_cols},
+            **{c: [v[i % len(v)] for i in range(n)] for c, v in categories.items()},
+        })
+        preprocessor = build_preprocessor(numeric_cols, categorical_cols).fit(summary)
+
+        if numeric_cols:
+            means = np.array([self.mean[c] for c in numeric_cols])
+            # Variance après imputation par la moyenne : les valeurs imputées n'ajoutent aucun écart
+            var = np.array([self.m2[c] / self.rows for c in numeric_cols])
+            num = preprocessor.named_transformers_["num"]
+            num.named_steps["imputer"].statistics_ = means
+            scaler = num.named_steps["scaler"]
+            scaler.mean_, scaler.var_ = means, var
+            scaler.scale_ = np.where(var > 0, np.sqrt(var), 1.0)
+            scaler.n_samples_seen_ = self.rows
+
+        if categorical_cols:
+            # Modalité la plus fréquente, la plus petite en cas d'égalité (comme SimpleImputer)
+            modes = [
+                min(v for v, k in self.values[c].items() if k == max(self.values[c].values()))
+                for c in categorical_cols
+            ]
+            cat = preprocessor.named_transformers_["cat"]
+            cat.named_steps["imputer"].statistics_ = np.array(modes, dtype=object)
+
+        return preprocessor
+
+
+def iter_batches(preprocessor, chunk_size, batch_size, validation, fraction, max_pret_id=None, rng=None):
+    """
+    Batchs (X float32, y float32) encodés paquet par paquet, restreints au
+    côté train ou validation du découpage par hachage. Les lignes d'entraînement
+    sont mélangées à l'intérieur de chaque paquet (`rng`).
+    """
+    features = list(preprocessor.feature_names_in_)
+    for df in iter_chunks(chunk_size, max_pret_id):
+        df = df.dropna(subset=[TARGET])
+        part = df[validation_mask(df["pret_id"].values, fraction) == validation]
+        if part.empty:
+            continue
+        X = preprocessor.transform(part[features]).astype(np.float32)
+        y = part[TARGET].values.astype(np.float32)
+        if rng is not None:
+            order = rng.permutation(len(y))
+            X, y = X[order], y[order]
+        for start in range(0, len(y), batch_size):
+            yield X[start:start + batch_size], y[start:start + batch_size]
+
+
+class StreamingMetrics:
+    """
+    MSE, MAE et R² accumulés batch par batch (sommes, sans garder les prédictions).
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.sse = self.sae = self.sum_y = self.sum_y2 = 0.0
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=float)
+        errors = y_true - np.asarray(y_pred, dtype=float)
+        self.n += len(y_true)
+        self.sse += float((errors ** 2).sum())
+        self.sae += float(np.abs(errors).sum())
+        self.sum_y += float(y_true.sum())
+        self.sum_y2 += float((y_true ** 2).sum())
+
+    def result(self):
+        # Aucune ligne reçue : métriques indéfinies plutôt qu'une division par zéro
+        if self.n == 0:
+            return {"MSE": float("nan"), "MAE": float("nan"), "R²": float("nan")}
+        total = self.sum_y2 - self.sum_y ** 2 / self.n
+        return {
+            "MSE": self.sse / self.n,
+            "MAE": self.sae / self.n,
+            "R²": 1.0 - self.sse / total if total > 0 else 0.0,
+        }
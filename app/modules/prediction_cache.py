@@ -0,0 +1,109 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_TTL
+from app.modules.preprocess import build_feature_record
+from app.modules.metrics import CallbackGauge, registry
+
+
+class PredictionCache:
+    """
+    Cache LRU + TTL des prédictions unitaires.
+
+    La clé combine une empreinte canonique des features de l'entrée et
+    la version du modèle : un nouvel entraînement invalide donc
+    naturellement les anciennes entrées.
+
+    Parameters
+    ----------
+    max_entries : int
+        Nombre maximal d'entrées (les moins récemment utilisées sont évincées).
+    ttl : float
+        Durée de vie d'une entrée, en secondes.
+    """
+
+    def __init__(self, max_entries=PREDICTION_CACHE_MAX_ENTRIES, ttl=PREDICTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # Derniers compteurs remontés par chaque worker "process" (un cache par processus)
+        self._workers: dict = {}
+
+    @staticmethod
+    def key(input_data, version):
+        """
+        Empreinte SHA-256 des features (hors cible) et de la version du modèle.
+        """
+        record = build_feature_record(input_data.client, input_data.pret)
+        record.pop("montant_pret", None)
+        canonical = json.dumps(record, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(f"{version}|{canonical}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def merge_worker(self, worker, stats):
+        """
+        Enregistre les compteurs du cache d'un worker "process" ;
+        stats() les additionne à ceux de ce processus.
+        """
+        with self._lock:
+            self._workers[worker] = stats
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+            for worker in self._workers.values():
+                for name in ("size", "hits", "misses", "evictions", "expirations"):
+                    stats[name] += worker[name]
+            return stats
+
+
+# Instance partagée par les routes de prédiction
+prediction_cache = PredictionCache()
+registry.register(CallbackGauge(
+    "prediction_cache", "Compteurs du cache de prédiction", "counter",
+    lambda: {k: v for k, v in prediction_cache.stats().items() if k != "ttl_seconds"},
+))
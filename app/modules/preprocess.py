@@ -1,70 +1,235 @@
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.impute import SimpleImputer
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
+from app.config import app_logger, TRAIN_EXTRACT_CHUNK_SIZE, FEATURE_SNAPSHOT_ENABLED
 from app.models import Client, Pret
-import pandas as pd
+from app.modules.metrics import stage_timer
+
+# scikit-learn et pandas sont importés dans les fonctions d'entraînement :
+# le service de prédiction n'utilise que build_feature_record.
+
+# Colonnes numériques / catégorielles des features (hors cible)
+NUMERIC_COLUMNS = [
+    "age",
+    "taille",
+    "poids",
+    "historique_credits",
+    "risque_personnel_client",
+    "score_credit_client",
+    "revenu_estime_mois",
+    "loyer_mensuel",
+    "score_credit_pret",
+    "risque_personnel_pret",
+]
+
+CATEGORICAL_COLUMNS = [
+    "sport_licence",
+    "smoker",
+    "niveau_etude",
+    "region",
+    "situation_familiale",
+]
 
 def split(X, y, test_size=0.2, random_state=42):
+    from sklearn.model_selection import train_test_split
+
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
     return X_train, X_test, y_train, y_test
 
-def load_training_dataframe(db: Session) -> pd.DataFrame:
+def build_feature_record(client, pret) -> dict:
+    """
+    Construit le dictionnaire de features d'un couple Client / Pret.
+
+    Fonctionne indifféremment avec les objets ORM (entraînement)
+    et les schémas Pydantic ClientBase / PretBase (prédiction),
+    qui partagent les mêmes noms d'attributs.
+    """
+    return {
+        # Cibles et features numériques
+        "montant_pret": pret.montant_pret,
+        "age": client.age,
+        "taille": client.taille,
+        "poids": client.poids,
+        "historique_credits": client.historique_credits,
+        "risque_personnel_client": client.risque_personnel,
+        "score_credit_client": client.score_credit,
+        "revenu_estime_mois": pret.revenu_estime_mois,
+        "loyer_mensuel": pret.loyer_mensuel,
+        "score_credit_pret": pret.score_credit,
+        "risque_personnel_pret": pret.risque_personnel,
+
+        # Catégorielles
+        "sport_licence": client.sport_licence,
+        "smoker": client.smoker,
+        "niveau_etude": client.niveau_etude,
+        "region": client.region,
+        "situation_familiale": client.situation_familiale,
+    }
+
+
+def feature_columns():
+    """
+    Colonnes SQL de la jointure Client / Pret, nommées comme les clés
+    de build_feature_record (pour les lectures en masse sans ORM).
+    """
+    return [
+        # Cibles et features numériques
+        Pret.montant_pret.label("montant_pret"),
+        Client.age.label("age"),
+        Client.taille.label("taille"),
+        Client.poids.label("poids"),
+        Client.historique_credits.label("historique_credits"),
+        Client.risque_personnel.label("risque_personnel_client"),
+        Client.score_credit.label("score_credit_client"),
+        Pret.revenu_estime_mois.label("revenu_estime_mois"),
+        Pret.loyer_mensuel.label("loyer_mensuel"),
+        Pret.score_credit.label("score_credit_pret"),
+        Pret.risque_personnel.label("risque_personnel_pret"),
+
+        # Catégorielles
+        Client.sport_licence.label("sport_licence"),
+        Client.smoker.label("smoker"),
+        Client.niveau_etude.label("niveau_etude"),
+        Client.region.label("region"),
+        Client.situation_familiale.label("situation_familiale"),
+    ]
+
+
+def max_pret_id(db: Session):
+    """
+    Plus grand identifiant de prêt en base (marqueur de reprise de l'entraînement
+    incrémental), None si la table est vide.
+    """
+    return db.execute(select(func.max(Pret.id))).scalar()
+
+
+def load_training_dataframe(db: Session, chunk_size: int = TRAIN_EXTRACT_CHUNK_SIZE,
+                            min_pret_id=None, max_pret_id=None):
     """
     Lit les données Client + Pret en base de données
     et retourne un DataFrame pandas.
+
+    `min_pret_id` (exclu) et `max_pret_id` (inclus) bornent les prêts lus :
+    l'entraînement incrémental ne lit que les prêts ajoutés depuis le dernier run.
+
+    Seules les colonnes utiles sont sélectionnées (requête Core, sans objets ORM)
+    et les lignes sont lues par paquets de `chunk_size`, convertis aussitôt en
+    tableaux NumPy par colonne : float64 pour les numériques (NULL -> NaN),
+    object pour les catégorielles.
     """
+    import numpy as np
+    import pandas as pd
+
     # Jointure Client / Pret sur client_id
-    rows = (
-        db.query(Client, Pret)
-        .join(Pret, Pret.client_id == Client.id)
-        .all()
-    )
-
-    data = []
-    for client, pret in rows:
-        data.append(
-            {
-                # Cibles et features numériques
-                "montant_pret": pret.montant_pret,
-                "age": client.age,
-                "taille": client.taille,
-                "poids": client.poids,
-                "historique_credits": client.historique_credits,
-                "risque_personnel_client": client.risque_personnel,
-                "score_credit_client": client.score_credit,
-                "revenu_estime_mois": pret.revenu_estime_mois,
-                "loyer_mensuel": pret.loyer_mensuel,
-                "score_credit_pret": pret.score_credit,
-                "risque_personnel_pret": pret.risque_personnel,
-
-                # Catégorielles
-                "sport_licence": client.sport_licence,
-                "smoker": client.smoker,
-                "niveau_etude": client.niveau_etude,
-                "region": client.region,
-                "situation_familiale": client.situation_familiale,
-            }
-        )
-
-    df = pd.DataFrame(data)
+    stmt = select(*feature_columns()).join(Pret, Pret.client_id == Client.id)
+    if min_pret_id is not None:
+        stmt = stmt.where(Pret.id > min_pret_id)
+    if max_pret_id is not None:
+        stmt = stmt.where(Pret.id <= max_pret_id)
+    # Exécution sur la connexion de la session : pas de traitement ORM des lignes
+    result = db.connection().execute(stmt.execution_options(yield_per=chunk_size))
+
+    names = list(result.keys())
+    chunks = {name: [] for name in names}
+
+    for partition in result.partitions():
+        for name, array in column_arrays(names, partition).items():
+            chunks[name].append(array)
+
+    empty = column_arrays(names, [])
+    df = pd.DataFrame({
+        name: np.concatenate(arrays) if arrays else empty[name]
+        for name, arrays in chunks.items()
+    })
 
     return df
 
 
-def preprocessing(db: Session, target: str = "montant_pret"):
+def column_arrays(names, rows):
+    """
+    Convertit des lignes SQL (tuples) en un tableau NumPy par colonne :
+    float64 pour les numériques et les identifiants (NULL -> NaN), object sinon.
+    """
+    import numpy as np
+
+    numeric = {"montant_pret", "pret_id", *NUMERIC_COLUMNS}
+    columns = zip(*rows) if rows else [()] * len(names)
+    return {
+        name: np.array(values, dtype=float if name in numeric else object)
+        for name, values in zip(names, columns)
+    }
+
+
+def build_preprocessor(numeric_cols, categorical_cols):
+    """
+    Construit le ColumnTransformer (non entraîné) :
+    - numériques : imputation par la moyenne puis standardisation ;
+    - catégorielles : imputation par la modalité la plus fréquente puis one-hot.
+    """
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder
+    from sklearn.impute import SimpleImputer
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+
+    num_pipeline = Pipeline([
+        ("imputer", SimpleImputer(strategy="mean")),
+        ("scaler", StandardScaler())
+    ])
+
+    cat_pipeline = Pipeline([
+        ("imputer", SimpleImputer(strategy="most_frequent")),
+        ("encoder", OneHotEncoder(handle_unknown="ignore", sparse_output=False))
+    ])
+
+    return ColumnTransformer([
+        ("num", num_pipeline, numeric_cols),
+        ("cat", cat_pipeline, categorical_cols)
+    ])
+
+
+def preprocessing(db: Session, target: str = "montant_pret", max_pret_id=None,
+                  use_snapshot: bool = FEATURE_SNAPSHOT_ENABLED):
     """
     Fonction pour effectuer le prétraitement des données :
     - Imputation des valeurs manquantes.
     - Standardisation des variables numériques.
     - Encodage des variables catégorielles.
+
+    Avec `use_snapshot`, le résultat est mis en cache sur disque sous l'empreinte
+    des données (voir feature_snapshot) : tant que clients et prets n'ont pas
+    changé, X, y et le preprocessor sont relus sans jointure ni fit_transform.
     """
+    key = None
+    if use_snapshot:
+        from app.modules.feature_snapshot import feature_snapshots, data_fingerprint
+
+        with stage_timer("train", "snapshot_load"):
+            key = data_fingerprint(db, target=target, max_pret_id=max_pret_id)
+            snapshot = feature_snapshots.load(key)
+        if snapshot is not None:
+            app_logger.info(f"Features relues depuis l'instantané {key}")
+            return snapshot
 
-    df = load_training_dataframe(db)
+    X_processed, y, preprocessor = _preprocess(db, target, max_pret_id)
 
+    if key is not None:
+        with stage_timer("train", "snapshot_save"):
+            feature_snapshots.save(key, X_processed, y, preprocessor)
+
+    return X_processed, y, preprocessor
+
+
+def _preprocess(db: Session, target: str, max_pret_id):
+    with stage_timer("train", "load_training_dataframe"):
+        df = load_training_dataframe(db, max_pret_id=max_pret_id)
+    return fit_preprocessor(df, target)
+
+
+def fit_preprocessor(df, target: str = "montant_pret"):
+    """
+    Entraîne un preprocessor sur `df` (lignes d'entraînement) et retourne
+    (X_processed, y, preprocessor). Utilisé aussi par la validation croisée,
+    avec un preprocessor par fold.
+    """
     # On supprime les lignes où la cible est manquante
     df = df.dropna(subset=[target])
 
@@ -80,52 +245,56 @@ def preprocessing(db: Session, target: str = "montant_pret"):
     print(f"Nb colonnes avant nettoyage : {cols_before}, nb colonnes après : {cols_after}")
 
     # Colonnes numériques / catégorielles
-    numeric_cols = [
-        "age",
-        "taille",
-        "poids",
-        "historique_credits",
-        "risque_personnel_client",
-        "score_credit_client",
-        "revenu_estime_mois",
-        "loyer_mensuel",
-        "score_credit_pret",
-        "risque_personnel_pret",
-    ]
-
-    categorical_cols = [
-        "sport_licence",
-        "smoker",
-        "niveau_etude",
-        "region",
-        "situation_familiale",
-    ]
-
     # On garde seulement celles qui existent réellement (au cas où)
-    numeric_cols = [c for c in numeric_cols if c in df_clean.columns]
-    categorical_cols = [c for c in categorical_cols if c in df_clean.columns]
+    numeric_cols = [c for c in NUMERIC_COLUMNS if c in df_clean.columns]
+    categorical_cols = [c for c in CATEGORICAL_COLUMNS if c in df_clean.columns]
 
-    num_pipeline = Pipeline([
-        ("imputer", SimpleImputer(strategy="mean")),
-        ("scaler", StandardScaler())
-    ])
-
-    cat_pipeline = Pipeline([
-        ("imputer", SimpleImputer(strategy="most_frequent")),
-        ("encoder", OneHotEncoder(handle_unknown="ignore", sparse_output=False))
-    ])
-
-    preprocessor = ColumnTransformer([
-        ("num", num_pipeline, numeric_cols),
-        ("cat", cat_pipeline, categorical_cols)
-    ])
+    preprocessor = build_preprocessor(numeric_cols, categorical_cols)
 
     X = df_clean.drop(columns=[target])
-    X_processed = preprocessor.fit_transform(X)
+    with stage_timer("train", "fit_transform"):
+        X_processed = preprocessor.fit_transform(X)
 
     return X_processed, y, preprocessor
 
 
+def transform_with(preprocessor, df, target: str = "montant_pret"):
+    """
+    Prépare de nouvelles lignes avec un preprocessor déjà entraîné
+    (entraînement incrémental) : mêmes colonnes d'entrée, pas de nouveau fit.
+    """
+    df = df.dropna(subset=[target])
+    y = df[target].astype(float).values
+    X = df[list(preprocessor.feature_names_in_)]
+    with stage_timer("train", "transform"):
+        X_processed = preprocessor.transform(X)
+    return X_processed, y
+
+
+def scaler_drift(preprocessor, df):
+    """
+    Écart entre les statistiques du StandardScaler entraîné et celles
+    des nouvelles données, par colonne numérique :
+    max(|moyenne_nouvelle - moyenne| / écart-type, |écart-type_nouveau / écart-type - 1|).
 
+    Returns
+    -------
+    dict
+        {colonne: score} ; un score élevé indique que le preprocessor
+        ne représente plus les données (refit complet nécessaire).
+    """
+    import numpy as np
 
+    transformer = preprocessor.named_transformers_["num"]
+    scaler = transformer.named_steps["scaler"]
+    columns = preprocessor.transformers_[0][2]
 
+    drift = {}
+    for col, mean, scale in zip(columns, scaler.mean_, scaler.scale_):
+        values = df[col].astype(float).dropna().values
+        if len(values) == 0 or scale == 0:
+            continue
+        shift = abs(values.mean() - mean) / scale
+        spread = abs(values.std() / scale - 1.0)
+        drift[col] = float(np.nan_to_num(max(shift, spread)))
+    return drift
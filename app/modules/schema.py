@@ -0,0 +1,68 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+
+from app.config import app_logger
+from app.database import engine
+from app.models import Client, Pret
+
+
+def _create_model_index(conn, table, name):
+    """
+    Crée l'index déclaré par le modèle (un nouvel Index(...) sur ses colonnes
+    s'ajouterait à la table de Base.metadata : doublon au prochain create_all).
+    IF NOT EXISTS : sous SQLite, une connexion du pool peut relire une liste
+    d'index périmée après la recréation des tables.
+    """
+    index = next(index for index in table.indexes if index.name == name)
+    conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def upgrade_schema(bind=engine):
+    """
+    Met à niveau une base créée avant le réimport incrémental du CSV :
+    colonnes clients.source_key / row_hash et prets.source_key (et leurs index
+    uniques), index prets.client_id. create_all ne modifie pas une table existante : sans
+    cette étape, les requêtes ORM échouent ("no such column").
+
+    Sans effet sur une base déjà à jour. Appelée au démarrage de l'API et
+    par scripts/import_csv.py. À l'ajout de prets.source_key, le premier prêt de
+    chaque client déjà importé reçoit la clé de son client (prêt issu de la ligne CSV).
+
+    Returns
+    -------
+    list[str]
+        Modifications appliquées.
+    """
+    inspector = inspect(bind)
+    client_columns = {c["name"] for c in inspector.get_columns("clients")}
+    client_indexes = {i["name"] for i in inspector.get_indexes("clients")}
+    pret_columns = {c["name"] for c in inspector.get_columns("prets")}
+    pret_indexes = {i["name"] for i in inspector.get_indexes("prets")}
+
+    changes = []
+    with bind.begin() as conn:
+        for column in ("source_key", "row_hash"):
+            if column not in client_columns:
+                conn.execute(text(f"ALTER TABLE clients ADD COLUMN {column} VARCHAR(64)"))
+                changes.append(f"colonne clients.{column}")
+        if "ix_clients_source_key" not in client_indexes:
+            _create_model_index(conn, Client.__table__, "ix_clients_source_key")
+            changes.append("index clients.source_key")
+        if "source_key" not in pret_columns:
+            conn.execute(text("ALTER TABLE prets ADD COLUMN source_key VARCHAR(64)"))
+            conn.execute(text(
+                "UPDATE prets SET source_key = (SELECT source_key FROM clients WHERE clients.id = prets.client_id) "
+                "WHERE id IN (SELECT MIN(prets.id) FROM prets JOIN clients ON clients.id = prets.client_id "
+                "WHERE clients.source_key IS NOT NULL GROUP BY prets.client_id)"
+            ))
+            changes.append("colonne prets.source_key")
+        if "ix_prets_source_key" not in pret_indexes:
+            _create_model_index(conn, Pret.__table__, "ix_prets_source_key")
+            changes.append("index prets.source_key")
+        if "ix_prets_client_id" not in pret_indexes:
+            _create_model_index(conn, Pret.__table__, "ix_prets_client_id")
+            changes.append("index prets.client_id")
+
+    if changes:
+        app_logger.info(f"Schéma mis à niveau : {', '.join(changes)}")
+    return changes
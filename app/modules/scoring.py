@@ -0,0 +1,69 @@
+import time
+
+from sqlalchemy import select, func, delete, insert
+
+from app.config import app_logger, SCORE_ALL_CHUNK_SIZE
+from app.database import engine
+from app.models import Client, Pret, Prediction
+from app.models_ia import model_predict
+from app.modules.preprocess import feature_columns
+
+
+def score_all_loans(job, serving, chunk_size=SCORE_ALL_CHUNK_SIZE):
+    """
+    Recalcule la prédiction de chaque prêt en base avec le modèle `serving`.
+
+    La jointure Client / Pret est parcourue par paquets de `chunk_size` lignes
+    (pagination sur prets.id) : chaque paquet est encodé et prédit en une
+    seule passe, puis écrit en masse dans la table predictions, dans sa propre
+    transaction. La mémoire utilisée ne dépend que de `chunk_size`.
+
+    Parameters
+    ----------
+    job : Job
+        Job de suivi, mis à jour avec la progression.
+    serving : ServingModel
+        Modèle figé pour toute la durée du traitement.
+    chunk_size : int
+        Nombre de lignes par paquet.
+    """
+    start = time.time()
+    join = select(Pret.id.label("pret_id"), *feature_columns()).join(Client, Pret.client_id == Client.id)
+
+    with engine.begin() as conn:
+        total = conn.execute(
+            select(func.count()).select_from(Pret).join(Client, Pret.client_id == Client.id)
+        ).scalar_one()
+        # Un nouveau passage remplace les prédictions existantes de cette version
+        conn.execute(delete(Prediction).where(Prediction.model_version == serving.version))
+
+    job.stage = "scoring"
+    job.progress = {"total": total, "processed": 0, "model_version": serving.version}
+
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = [dict(row) for row in conn.execute(
+                join.where(Pret.id > last_id).order_by(Pret.id).limit(chunk_size)
+            ).mappings()]
+            if not rows:
+                break
+
+            y_pred = model_predict(serving.model, serving.encode_records(rows))
+            conn.execute(insert(Prediction), [
+                {
+                    "pret_id": row["pret_id"],
+                    "montant_pret_predit": float(y),
+                    "model_version": serving.version,
+                }
+                for row, y in zip(rows, y_pred)
+            ])
+
+        last_id = rows[-1]["pret_id"]
+        job.progress["processed"] += len(rows)
+
+    duration = round(time.time() - start, 2)
+    app_logger.info(
+        f"Scoring de {job.progress['processed']} prêts terminé en {duration} s (modèle {serving.version})"
+    )
+    return {"scored": job.progress["processed"], "model_version": serving.version, "duration_seconds": duration}
@@ -0,0 +1,34 @@
+import time
+from contextlib import contextmanager
+
+from app.config import app_logger
+
+
+class StartupTimings:
+    """
+    Durées des phases de démarrage de l'API, journalisées au boot
+    pour rendre visibles les régressions de temps de démarrage.
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - start, 4)
+
+    def record(self, name, seconds):
+        self.phases[name] = round(seconds, 4)
+
+    def report(self):
+        total = round(sum(self.phases.values()), 4)
+        detail = ", ".join(f"{name}={seconds}s" for name, seconds in self.phases.items())
+        app_logger.info(f"Démarrage en {total}s ({detail})")
+        return {"total_seconds": total, "phases": dict(self.phases)}
+
+
+startup_timings = StartupTimings()
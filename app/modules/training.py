@@ -0,0 +1,462 @@
+import time
+
+import joblib
+import numpy as np
+
+from app.config import (
+    app_logger, TRAIN_INCREMENTAL_EPOCHS, TRAIN_INCREMENTAL_MIN_ROWS, TRAIN_DRIFT_THRESHOLD, TRAIN_PATIENCE,
+    TRAIN_MEMORY_LIMIT_MB, TRAIN_VALIDATION_FRACTION, ARTIFACT_ASYNC_UPLOAD
+)
+from app.database import SessionLocal
+from app.modules.jobs import job_registry, JobInProgressError
+from app.modules.metrics import stage_timer
+from app.modules.model_store import MODEL_ARTIFACT_PATH, SERVING_RUNS_FILTER
+
+
+class TrainingInProgressError(JobInProgressError):
+    """Un entraînement du même modèle est déjà en cours."""
+
+    def __init__(self, job_id):
+        super().__init__(job_id, f"Entraînement déjà en cours (job {job_id})")
+
+
+def submit_training(model_name=MODEL_ARTIFACT_PATH, fn=None, **params):
+    """
+    Lance l'entraînement en tâche de fond et retourne le Job créé.
+
+    `fn` (défaut : train_model_job) reçoit (job, model_name, **params) ;
+    la recherche d'hyperparamètres passe par le même verrou.
+
+    Raises
+    ------
+    TrainingInProgressError
+        Si un entraînement de ce modèle est déjà en cours.
+    """
+    # Un seul entraînement à la fois par modèle
+    try:
+        return job_registry.submit_exclusive("train", model_name, fn or train_model_job, model_name, **params)
+    except JobInProgressError as e:
+        raise TrainingInProgressError(e.job_id)
+
+
+def _epoch_progress(job, epochs):
+    """
+    Callback Keras publiant l'epoch courante et la loss dans le job.
+    """
+    from app.models_ia import import_keras
+    import_keras()
+    from tensorflow.keras.callbacks import LambdaCallback
+
+    def on_epoch_end(epoch, logs):
+        logs = logs or {}
+        job.progress = {
+            "epoch": epoch + 1,
+            "epochs": epochs,
+            "loss": float(logs["loss"]) if "loss" in logs else None,
+            "val_loss": float(logs["val_loss"]) if "val_loss" in logs else None,
+        }
+
+    return LambdaCallback(on_epoch_end=on_epoch_end)
+
+
+def _previous_run():
+    """
+    Dernier run terminé (celui servi par l'API) : id, high-water mark
+    (None pour les runs antérieurs à l'entraînement incrémental).
+    """
+    import mlflow
+
+    runs = mlflow.search_runs(
+        filter_string=SERVING_RUNS_FILTER,
+        order_by=["attributes.start_time DESC"],
+        max_results=1,
+    )
+    if runs.empty:
+        return None
+    run = runs.iloc[0]
+    high_water_mark = run.get("params.high_water_mark")
+    return {
+        "run_id": run["run_id"],
+        "high_water_mark": int(high_water_mark) if isinstance(high_water_mark, str) else None,
+    }
+
+
+def _load_previous(run_id):
+    """
+    Preprocessor entraîné et poids exportés (.npz) d'un run MLflow.
+    """
+    import mlflow
+    from app.modules.model_store import PREPROCESSOR_ARTIFACT_PATH, WEIGHTS_ARTIFACT_PATH
+    from app.modules.numpy_model import NumpyDenseModel
+
+    preprocessor = joblib.load(mlflow.artifacts.download_artifacts(
+        run_id=run_id, artifact_path=PREPROCESSOR_ARTIFACT_PATH
+    ))
+    weights = NumpyDenseModel.load(mlflow.artifacts.download_artifacts(
+        run_id=run_id, artifact_path=WEIGHTS_ARTIFACT_PATH
+    ))
+    return preprocessor, weights
+
+
+def _plan_incremental(db, job, high_water_mark):
+    """
+    Prépare un entraînement incrémental, ou retourne la raison d'un refit complet.
+
+    Returns
+    -------
+    (plan, raison) : plan est None si un entraînement complet est nécessaire.
+    """
+    from app.modules.preprocess import load_training_dataframe, scaler_drift
+
+    previous = _previous_run()
+    if previous is None or previous["high_water_mark"] is None:
+        return None, "aucun run précédent avec high-water mark"
+
+    job.stage = "loading"
+    with stage_timer("train", "load_training_dataframe"):
+        df = load_training_dataframe(
+            db, min_pret_id=previous["high_water_mark"], max_pret_id=high_water_mark
+        )
+
+    df = df.dropna(subset=["montant_pret"])
+    plan = {"previous": previous, "df": df, "drift": {}}
+    # Trop peu de lignes pour les découpages test / validation : rien à entraîner
+    if len(df) < TRAIN_INCREMENTAL_MIN_ROWS:
+        return plan, None
+
+    try:
+        preprocessor, weights = _load_previous(previous["run_id"])
+    except Exception as e:
+        app_logger.warning(f"Run précédent {previous['run_id']} inutilisable : {e}")
+        return None, "artefacts du run précédent indisponibles"
+
+    # Les poids ne sont repris que dans le même réseau que celui de create_nn_model
+    # (couches cachées relu, sortie linéaire, mêmes features en entrée)
+    hidden = len(weights.activations) - 1
+    if (weights.activations != ["relu"] * hidden + ["linear"]
+            or weights.input_dim != len(preprocessor.get_feature_names_out())):
+        return None, "architecture du run précédent incompatible"
+
+    drift = scaler_drift(preprocessor, df)
+    worst = max(drift.values(), default=0.0)
+    if worst > TRAIN_DRIFT_THRESHOLD:
+        column = max(drift, key=drift.get)
+        return None, f"dérive des données ({column} : {worst:.2f} > {TRAIN_DRIFT_THRESHOLD})"
+
+    plan.update(preprocessor=preprocessor, weights=weights, drift=drift)
+    return plan, None
+
+
+def train_model_job(job, model_name=MODEL_ARTIFACT_PATH, epochs=None, batch_size=32, mode="full",
+                    patience=TRAIN_PATIENCE):
+    """
+    Pipeline complet d'entraînement (données, modèle, évaluation, MLflow),
+    exécuté hors requête HTTP.
+
+    Chaque run enregistre son high-water mark (plus grand prets.id vu).
+    En mode "incremental", seuls les prêts au-delà du high-water mark du run
+    précédent sont lus, et l'entraînement repart de ses poids et de son
+    preprocessor. On bascule sur un entraînement complet s'il n'y a pas de
+    run précédent exploitable ou si les nouvelles données s'écartent trop des
+    statistiques du scaler (TRAIN_DRIFT_THRESHOLD). Avec moins de
+    TRAIN_INCREMENTAL_MIN_ROWS nouveaux prêts, le job se termine sans run.
+
+    Parameters
+    ----------
+    job : Job
+        Job de suivi : `stage` et `progress` sont mis à jour au fil de l'eau.
+    model_name : str
+        Chemin d'artefact MLflow du modèle.
+    epochs : int
+        Nombre maximal d'epochs (défaut : 50 en complet, TRAIN_INCREMENTAL_EPOCHS en incrémental).
+    batch_size : int
+        Taille des batchs de model.fit.
+    patience : int
+        Arrêt anticipé après `patience` epochs sans amélioration de val_loss
+        (meilleurs poids restaurés) ; 0 désactive l'arrêt anticipé.
+    mode : str
+        "full", "incremental" ou "out_of_core" (voir train_out_of_core).
+
+    Returns
+    -------
+    dict
+        Mode effectif, métriques et durée d'entraînement, id du run MLflow.
+    """
+    if mode == "out_of_core":
+        return train_out_of_core(job, model_name, epochs or 50, batch_size, patience)
+
+    # Imports lourds (MLflow, TensorFlow, scikit-learn, matplotlib) chargés
+    # au premier entraînement seulement, pas au démarrage de l'API
+    import mlflow
+
+    from app.models_ia import create_nn_model
+    from app.modules.preprocess import preprocessing, transform_with, max_pret_id
+
+    db = SessionLocal()
+    try:
+        # Message de début
+        app_logger.info(f"Training model (job {job.id}, mode {mode})")
+        start = time.time()
+        high_water_mark = max_pret_id(db)
+
+        plan, full_refit_reason = None, None
+        if mode == "incremental":
+            plan, full_refit_reason = _plan_incremental(db, job, high_water_mark)
+            if plan is None:
+                app_logger.info(f"Entraînement complet forcé : {full_refit_reason}")
+            elif len(plan["df"]) < TRAIN_INCREMENTAL_MIN_ROWS:
+                # Pas de run : le high-water mark n'avance pas, ces prêts seront repris au run suivant
+                message = (
+                    f"{len(plan['df'])} nouveau(x) prêt(s) depuis le dernier run "
+                    f"(minimum {TRAIN_INCREMENTAL_MIN_ROWS})"
+                )
+                app_logger.info(message)
+                return {
+                    "mode": "incremental",
+                    "skipped": True,
+                    "message": message,
+                    "new_rows": len(plan["df"]),
+                    "high_water_mark": plan["previous"]["high_water_mark"],
+                    "run_id": plan["previous"]["run_id"],
+                }
+
+        params = {"high_water_mark": high_water_mark, "batch_size": batch_size, "patience": patience}
+
+        if plan is not None:
+            # Incrémental : preprocessor du run précédent, poids repris
+            job.stage = "preprocessing"
+            preprocessor = plan["preprocessor"]
+            X, y = transform_with(preprocessor, plan["df"])
+            # Même architecture que le run précédent (largeurs promues par /train/search par exemple)
+            model = create_nn_model(X.shape[1], hidden_units=plan["weights"].hidden_units)
+            model.set_weights(plan["weights"].keras_weights())
+            epochs = epochs or TRAIN_INCREMENTAL_EPOCHS
+            params.update(
+                mode="incremental",
+                previous_run_id=plan["previous"]["run_id"],
+                previous_high_water_mark=plan["previous"]["high_water_mark"],
+                max_drift=round(max(plan["drift"].values(), default=0.0), 4),
+                hidden_units=list(plan["weights"].hidden_units),
+            )
+        else:
+            # preprocesser les data
+            job.stage = "preprocessing"
+            X, y, preprocessor = preprocessing(db, max_pret_id=high_water_mark)
+
+            # create a new model
+            model = create_nn_model(X.shape[1])
+            epochs = epochs or 50
+            params["mode"] = "full"
+            if full_refit_reason is not None:
+                params["full_refit_reason"] = full_refit_reason
+
+        params.update(epochs=epochs, rows=len(y))
+
+        with mlflow.start_run() as run:
+            mlflow.log_params(params)
+            perf, epochs_run = _fit_and_log(
+                job, model, X, y, preprocessor, model_name, epochs, batch_size, patience
+            )
+
+        duration = round(time.time() - start, 2)
+        app_logger.info(f"Entraînement {params['mode']} terminé en {duration} s (job {job.id})")
+        return {
+            "mode": params["mode"],
+            "full_refit_reason": full_refit_reason,
+            "rows": len(y),
+            "high_water_mark": high_water_mark,
+            "epochs_run": epochs_run,
+            "training_time_seconds": duration,
+            "metrics": {k: float(v) for k, v in perf.items()},
+            "run_id": run.info.run_id,
+        }
+    finally:
+        db.close()
+
+
+def train_out_of_core(job, model_name=MODEL_ARTIFACT_PATH, epochs=50, batch_size=32, patience=TRAIN_PATIENCE,
+                      memory_limit_mb=TRAIN_MEMORY_LIMIT_MB, validation_fraction=TRAIN_VALIDATION_FRACTION):
+    """
+    Entraînement hors mémoire : la table n'est jamais chargée en entier.
+
+    - le preprocessor est entraîné en un passage sur la base, paquet par paquet
+      (StreamingPreprocessorFit) ;
+    - les batchs sont générés paquet par paquet à chaque epoch (tf.data.from_generator),
+      avec un découpage train / validation déterministe par hachage de prets.id ;
+    - les métriques sont calculées en un dernier passage, sans garder les prédictions :
+      celles du run (MSE, MAE, R²) sur la validation, comme le mode full sur son jeu de test.
+
+    La taille des paquets découle de `memory_limit_mb` : la mémoire occupée par
+    les données ne dépend pas du nombre de lignes.
+    """
+    import mlflow
+    import tensorflow as tf
+
+    from app.models_ia import create_nn_model, fit_dataset, import_keras, model_predict
+    from app.modules.out_of_core import (
+        TARGET, StreamingPreprocessorFit, StreamingMetrics, chunk_size_for, iter_batches, iter_chunks,
+        validation_mask,
+    )
+    from app.modules.preprocess import max_pret_id
+
+    import_keras()
+    start = time.time()
+    db = SessionLocal()
+    try:
+        high_water_mark = max_pret_id(db)
+    finally:
+        db.close()
+
+    # Passage 1 : statistiques du preprocessor
+    job.stage = "fitting_preprocessor"
+    chunk_size = chunk_size_for(memory_limit_mb)
+    stats = StreamingPreprocessorFit(validation_fraction=validation_fraction)
+    with stage_timer("train", "streamed_preprocessor_fit"):
+        for df in iter_chunks(chunk_size, high_water_mark):
+            stats.update(df)
+        preprocessor = stats.finalize()
+    n_features = len(preprocessor.get_feature_names_out())
+    chunk_size = chunk_size_for(memory_limit_mb, n_features)
+
+    # Passages suivants : batchs générés à la demande, mélangés différemment à chaque epoch
+    seeds = iter(range(10 ** 9))
+    signature = (
+        tf.TensorSpec(shape=(None, n_features), dtype=tf.float32),
+        tf.TensorSpec(shape=(None,), dtype=tf.float32),
+    )
+    train_ds = tf.data.Dataset.from_generator(
+        lambda: iter_batches(preprocessor, chunk_size, batch_size, False, validation_fraction,
+                             high_water_mark, rng=np.random.default_rng(next(seeds))),
+        output_signature=signature,
+    ).prefetch(tf.data.AUTOTUNE)
+    val_ds = tf.data.Dataset.from_generator(
+        lambda: iter_batches(preprocessor, chunk_size, batch_size, True, validation_fraction, high_water_mark),
+        output_signature=signature,
+    ).prefetch(tf.data.AUTOTUNE)
+
+    with mlflow.start_run() as run:
+        mlflow.log_params({
+            "mode": "out_of_core", "high_water_mark": high_water_mark, "rows": stats.rows,
+            "epochs": epochs, "batch_size": batch_size, "patience": patience,
+            "memory_limit_mb": memory_limit_mb, "chunk_size": chunk_size,
+            "validation_fraction": validation_fraction,
+        })
+
+        model = create_nn_model(n_features)
+        job.stage = "training"
+        job.progress = {"epoch": 0, "epochs": epochs, "loss": None, "val_loss": None}
+        with stage_timer("train", "model_fit"):
+            hist = fit_dataset(
+                model, train_ds, validation_data=val_ds, epochs=epochs, patience=patience,
+                callbacks=[_epoch_progress(job, epochs)],
+            )
+        epochs_run = len(hist.history["loss"])
+        mlflow.log_metric("epochs_run", epochs_run)
+
+        # Dernier passage : métriques de validation (MSE / MAE / R² du run, comparables
+        # au mode full évalué sur le jeu de test) et d'entraînement (train_*)
+        job.stage = "evaluation"
+        train_metrics, val_metrics = StreamingMetrics(), StreamingMetrics()
+        features = list(preprocessor.feature_names_in_)
+        with stage_timer("train", "evaluation"):
+            for df in iter_chunks(chunk_size, high_water_mark):
+                df = df.dropna(subset=[TARGET])
+                if df.empty:
+                    continue
+                y_pred = model_predict(model, preprocessor.transform(df[features]).astype(np.float32))
+                is_val = validation_mask(df["pret_id"].values, validation_fraction)
+                y_true = df[TARGET].values
+                train_metrics.update(y_true[~is_val], y_pred[~is_val])
+                val_metrics.update(y_true[is_val], y_pred[is_val])
+        perf = val_metrics.result()
+        mlflow.log_metrics({f"train_{k}": v for k, v in train_metrics.result().items()})
+
+        job.stage = "logging"
+        log_model_artifacts(model, preprocessor, hist, perf, model_name)
+
+    duration = round(time.time() - start, 2)
+    app_logger.info(f"Entraînement out_of_core terminé en {duration} s (job {job.id})")
+    return {
+        "mode": "out_of_core",
+        "rows": stats.rows,
+        "chunk_size": chunk_size,
+        "high_water_mark": high_water_mark,
+        "epochs_run": epochs_run,
+        "training_time_seconds": duration,
+        "metrics": {k: float(v) for k, v in perf.items()},
+        "train_metrics": {k: float(v) for k, v in train_metrics.result().items()},
+        "run_id": run.info.run_id,
+    }
+
+
+def _fit_and_log(job, model, X, y, preprocessor, model_name, epochs, batch_size, patience=TRAIN_PATIENCE):
+    """
+    Entraîne `model` (découpage train / test), l'évalue et enregistre
+    modèle, preprocessor, courbe de loss et poids NumPy dans le run MLflow actif.
+
+    Returns
+    -------
+    (perf, epochs_run) : métriques et nombre d'epochs réellement effectuées.
+    """
+    import mlflow
+
+    from app.models_ia import train_model, model_predict
+    from app.modules.preprocess import split
+    from app.modules.evaluate import evaluate_performance
+
+    # split data in train and test dataset
+    with stage_timer("train", "split"):
+        X_train, X_test, y_train, y_test = split(X, y)
+
+    # entraîner le modèle
+    job.stage = "training"
+    job.progress = {"epoch": 0, "epochs": epochs, "loss": None, "val_loss": None}
+    with stage_timer("train", "model_fit"):
+        model, hist = train_model(
+            model, X_train, y_train, X_val=X_test, y_val=y_test,
+            epochs=epochs, batch_size=batch_size, patience=patience,
+            callbacks=[_epoch_progress(job, epochs)],
+        )
+    epochs_run = len(hist.history["loss"])
+    mlflow.log_metric("epochs_run", epochs_run)
+
+    job.stage = "evaluation"
+    with stage_timer("train", "evaluation"):
+        # predire sur le jeu de test (lignes non vues à l'entraînement)
+        y_pred = model_predict(model, X_test)
+
+        # mesurer les performances MSE, MAE et R²
+        perf = evaluate_performance(y_test, y_pred)
+
+    job.stage = "logging"
+    log_model_artifacts(model, preprocessor, hist, perf, model_name)
+    return perf, epochs_run
+
+
+def log_model_artifacts(model, preprocessor, hist, perf, model_name=MODEL_ARTIFACT_PATH):
+    """
+    Enregistre dans le run MLflow actif les métriques, puis confie le modèle
+    Keras, le preprocessor, les poids NumPy servis par l'API et la courbe de
+    loss à artifact_uploader : écrits dans le spool local, ils sont envoyés à
+    MLflow en tâche de fond (ARTIFACT_ASYNC_UPLOAD) et l'entraînement se termine
+    sans attendre. Le run porte le tag PENDING_TAG, et n'est donc pas servi,
+    jusqu'à la fin de l'envoi.
+    """
+    import mlflow
+
+    from app.modules.artifact_upload import artifact_uploader, upload_spooled, PENDING_TAG
+
+    with stage_timer("train", "mlflow_logging"):
+        # Logging MLflow
+        mlflow.log_metric("MSE", perf["MSE"])
+        mlflow.log_metric("MAE", perf["MAE"])
+        mlflow.log_metric("R²", perf["R²"])
+        mlflow.set_tag(PENDING_TAG, "true")
+
+        run_id = mlflow.active_run().info.run_id
+        path = artifact_uploader.spool(run_id, model, preprocessor, hist.history, model_name)
+
+    if ARTIFACT_ASYNC_UPLOAD:
+        artifact_uploader.submit(path)
+    else:
+        upload_spooled(path)
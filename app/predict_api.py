@@ -1,16 +1,55 @@
+import time
+_import_start = time.perf_counter()
+
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
 from loguru import logger
 from app.database import Base, engine
 from app.models import Client, Pret
 from app.schemas import ClientBase, PretBase
+from app.modules.model_store import model_store
+from app.modules.batching import micro_batcher
+from app.modules.executor import inference_executor
+from app.modules.artifact_upload import artifact_uploader
+from app.modules.startup import startup_timings
+from app.modules.schema import upgrade_schema
+from app.modules.metrics import MetricsMiddleware
 
 # Routers
-from app.routers import clients, prets, train, predict, healthcheck
+from app.routers import clients, prets, train, predict, healthcheck, metrics
+
+startup_timings.record("imports", time.perf_counter() - _import_start)
 
 # ---------------------------------------------------------
-# Création des tables (si elles n'existent pas déjà)
+# Cycle de vie : création des tables et surveillance des nouveaux modèles
 # ---------------------------------------------------------
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Création des tables (si elles n'existent pas déjà) puis ajout des colonnes
+    # et index manquants d'une base plus ancienne (create_all ne modifie rien)
+    with startup_timings.phase("create_schema"):
+        Base.metadata.create_all(bind=engine)
+        upgrade_schema(engine)
+
+    with startup_timings.phase("start_model_watcher"):
+        model_store.start_watcher()
+
+    # Mode "process" : workers lancés dès le démarrage, readiness quand chacun a chargé le modèle
+    with startup_timings.phase("start_inference_workers"):
+        inference_executor.start()
+
+    # Artefacts d'entraînement restés dans le spool (arrêt avant la fin de l'envoi)
+    with startup_timings.phase("resume_artifact_uploads"):
+        artifact_uploader.resume()
+
+    startup_timings.report()
+    yield
+    inference_executor.shutdown()
+    micro_batcher.stop()
+    model_store.stop_watcher()
+    artifact_uploader.stop()
+
 
 # ---------------------------------------------------------
 # Initialisation FastAPI
@@ -18,7 +57,8 @@ Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title="FastIA - API Prêts",
     description="API exposant les données Client et Pret pour le projet OPCA Atlas Module 3.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # ---------------------------------------------------------
@@ -29,6 +69,7 @@ app.include_router(prets.router)
 app.include_router(train.router)
 app.include_router(predict.router)
 app.include_router(healthcheck.router)
+app.include_router(metrics.router)
 
-
-
+# Compteurs / durées / requêtes en cours par route (exportés sur /metrics)
+app.add_middleware(MetricsMiddleware)
@@ -1,5 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from app.config import app_logger
+from app.modules.health import database_probe
+from app.modules.model_store import model_store
+from app.modules.executor import inference_executor
 
 router = APIRouter(
     prefix="/health",
@@ -7,7 +11,7 @@ router = APIRouter(
 )
 
 # ---------------------------------------------------------
-# Route de vérification
+# Route de vérification (liveness : aucune dépendance vérifiée)
 # ---------------------------------------------------------
 @router.get("/", tags=["system"])
 async def health():
@@ -23,3 +27,37 @@ async def health():
     except Exception as e:
         app_logger.error(f"Erreur healthcheck : {e}")
         raise HTTPException(status_code=500, detail="API non fonctionnelle")
+
+
+# ---------------------------------------------------------
+# Route de disponibilité (readiness)
+# ---------------------------------------------------------
+@router.get("/ready", tags=["system"])
+def ready():
+    """
+    Prêt à recevoir du trafic : modèle chargé et préchauffé (dans chaque worker
+    en mode INFERENCE_EXECUTOR=process), base joignable.
+    Retourne 503 tant que ce n'est pas le cas.
+    """
+    serving = model_store.loaded
+    database = database_probe.check()
+
+    model = {"loaded": serving is not None}
+    if serving is not None:
+        model.update(
+            version=serving.version,
+            engine=serving.engine,
+            warmup_seconds=serving.warmup_seconds,
+        )
+
+    workers = {"kind": inference_executor.kind, "ready": inference_executor.ready()}
+
+    is_ready = serving is not None and workers["ready"] and database["connected"]
+    body = {
+        "status": "ready" if is_ready else "not ready",
+        "model": model, "inference_workers": workers, "database": database,
+    }
+    if not is_ready:
+        app_logger.warning(f"readiness : {body}")
+        return JSONResponse(status_code=503, content=body)
+    return body
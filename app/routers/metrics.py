@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.modules.metrics import registry
+
+router = APIRouter(
+    tags=["Health Check"]
+)
+
+# ---------------------------------------------------------
+# Export des métriques au format texte Prometheus
+# ---------------------------------------------------------
+@router.get("/metrics", response_class=PlainTextResponse, tags=["system"])
+def metrics():
+    """
+    Histogrammes de latence par étape, compteurs et requêtes en cours par route
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,53 +1,299 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, HTTPException, Request
+from fastapi.responses import JSONResponse
+from typing import Any
 
-from app.database import get_db
-import time
-
-from app.config import app_logger
+from app.config import (
+    app_logger, PREDICT_BATCH_MAX_SIZE, PREDICT_BATCH_MAX_BYTES, MICROBATCH_ENABLED, PREDICTION_CACHE_ENABLED,
+    SCORE_ALL_CHUNK_SIZE
+)
 from app.schemas import ClientInput
-from app.modules.preprocess import preprocessing
-import joblib
-import pandas as pd
-
-import mlflow
-import mlflow.sklearn
-
-# Charger le preprocessor
-preprocessor_loaded = joblib.load("models/preprocessor.pkl")
+from app.models_ia import model_predict
+from app.modules.preprocess import build_feature_record
+from app.modules.model_store import model_store, ServingModel
+from app.modules.batch_input import parse_csv, parse_ndjson, validate_rows
+from app.modules.batching import micro_batcher, QueueFullError
+from app.modules.prediction_cache import prediction_cache
+from app.modules.executor import inference_executor
+from app.modules.jobs import job_registry, JobInProgressError
+from app.modules.scoring import score_all_loans
+from app.modules.metrics import stage_timer
 
 router = APIRouter(
     prefix="/predict",
     tags=["IA / Prédiction"]
 )
 
+
+def predict_inputs(serving: ServingModel, inputs: list[ClientInput]):
+    """
+    Prédit un lot d'entrées en une seule passe :
+    un encodage et un appel au modèle.
+    """
+    X_processed = serving.encode_records([build_feature_record(i.client, i.pret) for i in inputs])
+    with stage_timer("predict", "model_predict"):
+        return model_predict(serving.model, X_processed)
+
+
+def prepare_prediction(input_data: ClientInput, use_cache: bool = True):
+    """
+    Première partie d'une prédiction unitaire (modèle courant, cache, encodage),
+    exécutée dans l'exécuteur d'inférence.
+
+    Returns
+    -------
+    (serving, cache_key, cached, X) : `cached` est la réponse si l'entrée est
+    déjà en cache (X vaut alors None).
+    """
+    app_logger.info(f"Requête reçue : {input_data}")
+
+    # Modèle + preprocessor courants (référence figée pour toute la requête)
+    with stage_timer("predict", "model_lookup"):
+        serving = model_store.current()
+
+    cache_key = None
+    if PREDICTION_CACHE_ENABLED and use_cache:
+        cache_key = prediction_cache.key(input_data, serving.version)
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            app_logger.info(f"Prédiction (cache) : {cached} (modèle {serving.version})")
+            return serving, cache_key, {"montant_pret": cached, "model_version": serving.version, "cached": True}, None
+
+    X_processed = serving.encode_records([build_feature_record(input_data.client, input_data.pret)])
+    return serving, cache_key, None, X_processed
+
+
+def prediction_response(serving: ServingModel, cache_key, y_pred) -> dict:
+    montant = float(y_pred[0])
+    if cache_key is not None:
+        prediction_cache.put(cache_key, montant)
+
+    app_logger.info(f"Prédiction : {y_pred} (modèle {serving.version})")
+
+    return {"montant_pret": montant, "model_version": serving.version, "cached": False}
+
+
+def run_prediction(input_data: ClientInput, use_cache: bool = True) -> dict:
+    """
+    Prédiction unitaire complète (cache, encodage, modèle).
+    Exécutée dans l'exécuteur d'inférence, hors de la boucle d'événements.
+    """
+    serving, cache_key, cached, X_processed = prepare_prediction(input_data, use_cache)
+    if cached is not None:
+        return cached
+    with stage_timer("predict", "model_predict"):
+        y_pred = model_predict(serving.model, X_processed)
+    return prediction_response(serving, cache_key, y_pred)
+
+
+async def run_microbatched_prediction(input_data: ClientInput, use_cache: bool = True) -> dict:
+    """
+    Prédiction unitaire avec micro-batching : l'encodage passe par l'exécuteur,
+    l'appel au modèle est soumis au micro-batcher depuis la boucle d'événements
+    (aucun worker n'est bloqué pendant l'attente du lot).
+    """
+    serving, cache_key, cached, X_processed = await inference_executor.run(prepare_prediction, input_data, use_cache)
+    if cached is not None:
+        return cached
+    with stage_timer("predict", "model_predict"):
+        y_pred = await micro_batcher.submit(serving, X_processed)
+    return prediction_response(serving, cache_key, y_pred)
+
+
 # ---------------------------------------------------------
 # ROUTE PREDICTION DU PRET
 # ---------------------------------------------------------
 
 @router.post("/")
-def predict(input_data: ClientInput):
+async def predict(input_data: ClientInput, use_cache: bool = True):
     """
     Lance la prédiction du montant de prêt
+
+    `use_cache=false` force le calcul même si le cache de prédiction est actif.
+    """
+    try:
+        if MICROBATCH_ENABLED:
+            return await run_microbatched_prediction(input_data, use_cache)
+        return await inference_executor.run(run_prediction, input_data, use_cache)
+
+    except QueueFullError as e:
+        app_logger.warning(f"Prédiction rejetée : {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+
+    except Exception as e:
+        app_logger.error(f"Erreur d'analyse : {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ---------------------------------------------------------
+# STATISTIQUES DU MICRO-BATCHING
+# ---------------------------------------------------------
+
+@router.get("/microbatch")
+def microbatch_stats():
+    """
+    Histogrammes de taille de lot et de temps d'attente du micro-batcher
+    """
+    return {"enabled": MICROBATCH_ENABLED, **micro_batcher.stats()}
+
+
+# ---------------------------------------------------------
+# STATISTIQUES DU CACHE DE PRÉDICTION
+# ---------------------------------------------------------
+
+@router.get("/cache")
+def cache_stats():
+    """
+    Compteurs hits / misses / évictions du cache de prédiction
+    """
+    return {"enabled": PREDICTION_CACHE_ENABLED, **prediction_cache.stats()}
+
+
+# ---------------------------------------------------------
+# ROUTES PREDICTION PAR LOT
+# ---------------------------------------------------------
+
+def run_batch_prediction(rows: list[Any]) -> dict:
+    """
+    Valide chaque ligne, prédit les lignes valides en un seul lot
+    et restitue les résultats dans l'ordre d'entrée.
     """
+    with stage_timer("predict", "validation"):
+        valid, errors = validate_rows(rows)
+    app_logger.info(f"Lot reçu : {len(rows)} lignes, {len(errors)} invalides")
+
+    with stage_timer("predict", "model_lookup"):
+        serving = model_store.current()
+    y_pred = predict_inputs(serving, [i for _, i in valid]) if valid else []
+
+    predictions = {idx: float(y) for (idx, _), y in zip(valid, y_pred)}
+    results = []
+    for idx in range(len(rows)):
+        if idx in errors:
+            results.append({"index": idx, "montant_pret": None, "error": errors[idx]})
+        else:
+            results.append({"index": idx, "montant_pret": predictions[idx], "error": None})
+
+    return {
+        "model_version": serving.version,
+        "count": len(rows),
+        "errors": len(errors),
+        "predictions": results,
+    }
+
+
+async def _predict_batch(rows: list[Any]):
+    if len(rows) > PREDICT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lot trop volumineux : {len(rows)} lignes (max {PREDICT_BATCH_MAX_SIZE})"
+        )
+
     try:
-        app_logger.info(f"Requête reçue : {input_data}")
+        return await inference_executor.run(run_batch_prediction, rows)
+    except Exception as e:
+        app_logger.error(f"Erreur d'analyse du lot : {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Convertir DataFrame pour preprocessing
-        df = pd.DataFrame([input_data.model_dump()])
 
-        X_processed = preprocessor_loaded.transform(df)
+@router.post("/batch")
+async def predict_batch(rows: list[Any] = Body(...)):
+    """
+    Prédiction par lot à partir d'un tableau JSON de ClientInput.
+    Les lignes invalides (y compris un élément qui n'est pas un objet) sont
+    signalées individuellement sans faire échouer le lot.
+    """
+    return await _predict_batch(rows)
 
-        # Charger le dernier modèle entraîné depuis MLFlow
-        run_id = mlflow.search_runs(order_by=["attributes.start_time DESC"]).iloc[0]["run_id"]
-        model = mlflow.sklearn.load_model(f"runs:/{run_id}/model")
 
-        y_pred = model_predict(model, X_processed)
+async def _read_upload(request: Request) -> bytes:
+    """
+    Lit le corps de la requête en refusant (413) au-delà de PREDICT_BATCH_MAX_BYTES :
+    d'après Content-Length avant toute lecture, puis en comptant les octets reçus
+    (corps envoyé par morceaux ou en-tête absent).
+    """
+    too_large = HTTPException(
+        status_code=413, detail=f"Fichier trop volumineux (max {PREDICT_BATCH_MAX_BYTES} octets)"
+    )
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > PREDICT_BATCH_MAX_BYTES:
+        raise too_large
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > PREDICT_BATCH_MAX_BYTES:
+            raise too_large
+    return bytes(body)
+
+
+@router.post("/batch/upload")
+async def predict_batch_upload(request: Request):
+    """
+    Prédiction par lot à partir d'un fichier brut :
+    - application/x-ndjson : un ClientInput JSON par ligne
+    - text/csv : colonnes au format de data/data.csv
+    Un fichier non UTF-8 ou illisible en CSV est refusé (HTTP 400) ; les lignes
+    invalides sont signalées individuellement.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in ("application/x-ndjson", "application/jsonl"):
+        parse = parse_ndjson
+    elif content_type == "text/csv":
+        parse = parse_csv
+    else:
+        raise HTTPException(status_code=415, detail=f"Format non supporté : {content_type}")
 
-        app_logger.info(f"Prédiction : {y_pred}")
+    body = await _read_upload(request)
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Fichier non UTF-8")
+    try:
+        rows = parse(text)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await _predict_batch(rows)
+
+
+# ---------------------------------------------------------
+# RE-SCORING DE TOUS LES PRÊTS EN BASE
+# ---------------------------------------------------------
 
-        return {"montant_pret": float(y_pred[0])}
+@router.post("/score-all", status_code=202)
+def score_all(chunk_size: int = SCORE_ALL_CHUNK_SIZE):
+    """
+    Lance en tâche de fond la prédiction de tous les prêts en base,
+    écrite dans la table predictions avec la version du modèle.
+    Un seul re-scoring à la fois par version (HTTP 409 sinon).
+    """
+    if chunk_size <= 0:
+        raise HTTPException(status_code=422, detail="chunk_size doit être positif")
 
+    try:
+        serving = model_store.current()
     except Exception as e:
-        app_logger.error(f"Erreur d'analyse : {e}")
+        app_logger.error(f"Erreur de chargement du modèle : {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+    try:
+        # Un seul re-scoring à la fois par version : deux passages entrelaceraient
+        # leurs suppressions et insertions dans predictions
+        job = job_registry.submit_exclusive("score-all", serving.version, score_all_loans, serving, chunk_size)
+    except JobInProgressError as e:
+        return JSONResponse(
+            status_code=409,
+            content={"detail": f"Re-scoring déjà en cours pour le modèle {serving.version}", "job_id": e.job_id},
+        )
+    app_logger.info(f"Scoring de tous les prêts lancé (job {job.id}, modèle {serving.version})")
+    return {"job_id": job.id, "status": job.status, "model_version": serving.version}
+
+
+@router.get("/score-all/{job_id}")
+def score_all_status(job_id: str):
+    """
+    Progression d'un re-scoring lancé par POST /predict/score-all
+    """
+    job = job_registry.get(job_id)
+    if job is None or job.kind != "score-all":
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
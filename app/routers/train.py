@@ -1,19 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-import time
-from app.config import app_logger
+from typing import Optional
 
-import mlflow
-import mlflow.sklearn
-
-from app.models_ia import create_nn_model, train_model, model_predict
-from app.modules.preprocess import preprocessing, split
-from app.modules.evaluate import evaluate_performance
-from app.modules.draw import draw_loss
-import matplotlib.pyplot as plt
-
-import joblib, os
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from app.config import app_logger, TRAIN_SEARCH_WORKERS, TRAIN_PATIENCE, TRAIN_CV_FOLDS, TRAIN_CV_WORKERS
+from app.schemas import HyperparamSearch
+from app.modules.jobs import job_registry
+from app.modules.training import submit_training, TrainingInProgressError
+from app.modules.hyperparam_search import build_trials, search_job
+from app.modules.cross_validation import cross_validation_job
 
 
 router = APIRouter(
@@ -25,65 +19,105 @@ router = APIRouter(
 # ROUTE D'ENTRAÎNEMENT DU MODÈLE IA
 # ---------------------------------------------------------
 
-@router.post("/")
-def train(db: Session = Depends(get_db)):
+@router.post("/", status_code=202)
+def train(mode: str = "full", epochs: Optional[int] = None, batch_size: int = 32,
+          patience: int = TRAIN_PATIENCE):
     """
-    Lance un entraînement du modèle IA
+    Lance un entraînement du modèle IA en tâche de fond.
+    La progression se suit avec GET /train/{job_id}.
+
+    `mode=incremental` ne lit que les prêts ajoutés depuis le dernier run
+    et repart de ses poids (entraînement complet si les données ont dérivé).
+    `mode=out_of_core` entraîne paquet par paquet depuis la base, sans charger
+    la table en mémoire (TRAIN_MEMORY_LIMIT_MB).
+    `epochs` est un maximum : l'entraînement s'arrête après `patience` epochs
+    sans amélioration de val_loss (0 : pas d'arrêt anticipé).
     """
+    if mode not in ("full", "incremental", "out_of_core"):
+        raise HTTPException(status_code=422, detail="mode doit valoir 'full', 'incremental' ou 'out_of_core'")
+    if (epochs is not None and epochs <= 0) or batch_size <= 0:
+        raise HTTPException(status_code=422, detail="epochs et batch_size doivent être positifs")
+    if patience < 0:
+        raise HTTPException(status_code=422, detail="patience doit être positive ou nulle")
 
     try:
+        job = submit_training(mode=mode, epochs=epochs, batch_size=batch_size, patience=patience)
+    except TrainingInProgressError as e:
+        # Un seul entraînement à la fois : on renvoie le job déjà en cours
+        return JSONResponse(
+            status_code=409,
+            content={"detail": str(e), "job_id": e.job_id},
+        )
 
-        with mlflow.start_run():
-
-            # Message de début
-            app_logger.info(f"Training model")
-            start = time.time()
-
-            # preprocesser les data
-            X, y, preprocessor = preprocessing(db)
-
-            # sauvegarde du preprocessor localement
-            os.makedirs("models", exist_ok=True)
-            joblib.dump(preprocessor, "models/preprocessor.pkl")
-
-            # split data in train and test dataset
-            X_train, X_test, y_train, y_test = split(X, y)
-
-            # # create a new model
-            model = create_nn_model(X_train.shape[1])
-
-            # # entraîner le modèle
-            model, hist = train_model(model, X_train, y_train, X_val=X_test, y_val=y_test)
-
-            duration = round(time.time() - start, 2)
-
-            #%% predire sur les valeurs de train
-            y_pred = model_predict(model, X_train)
-
-            # mesurer les performances MSE, MAE et R²
-            perf = evaluate_performance(y_train, y_pred)
+    app_logger.info(f"Entraînement {mode} lancé (job {job.id})")
+    return {"job_id": job.id, "status": job.status}
 
-            # génération de la figure de la loss
-            fig = draw_loss(hist)
 
-            # Logging MLflow
-            mlflow.log_metric("MSE", perf["MSE"])
-            mlflow.log_metric("MAE", perf["MAE"])
-            mlflow.log_metric("R²", perf["R²"])
-            mlflow.sklearn.log_model(model, "modele_pret") # Enregistrement du modèle dans MLFlow
-            mlflow.log_artifact("models/preprocessor.pkl") # Enregistrement du preprocessor
-            mlflow.log_figure(fig, "loss.png")
-
-            # fermeture propre pour éviter fuites mémoire
-            plt.close(fig)
+@router.post("/search", status_code=202)
+def train_search(search: HyperparamSearch = HyperparamSearch()):
+    """
+    Lance en tâche de fond une recherche d'hyperparamètres (grille ou aléatoire)
+    sur les largeurs de couches, le learning rate, les epochs et la taille de batch.
+    Les essais tournent en parallèle ; le meilleur modèle devient le modèle servi.
+    """
+    try:
+        trials = build_trials(search.space, search.strategy, search.n_trials)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    workers = search.workers or TRAIN_SEARCH_WORKERS
+    if workers <= 0:
+        raise HTTPException(status_code=422, detail="workers doit être positif")
 
-            # Résultat
-            return {
-                "status": "training completed",
-                "training_time_seconds": duration,
-                "message": "Modèle entraîné avec succès"
-            }
+    try:
+        job = submit_training(
+            fn=search_job, space=search.space, strategy=search.strategy,
+            n_trials=search.n_trials, workers=workers,
+        )
+    except TrainingInProgressError as e:
+        return JSONResponse(
+            status_code=409,
+            content={"detail": str(e), "job_id": e.job_id},
+        )
+
+    app_logger.info(f"Recherche d'hyperparamètres lancée : {len(trials)} essais (job {job.id})")
+    return {"job_id": job.id, "status": job.status, "trials": len(trials)}
+
+
+@router.post("/cv", status_code=202)
+def train_cv(folds: int = TRAIN_CV_FOLDS, workers: Optional[int] = None, epochs: int = 50,
+             batch_size: int = 32, patience: int = TRAIN_PATIENCE):
+    """
+    Lance en tâche de fond une validation croisée en `folds` folds (en parallèle,
+    un preprocessor par fold) et un modèle final évalué sur un jeu de test
+    mis de côté ; le modèle final devient le modèle servi.
+    """
+    if folds < 2:
+        raise HTTPException(status_code=422, detail="folds doit valoir au moins 2")
+    workers = workers or TRAIN_CV_WORKERS
+    if workers <= 0 or epochs <= 0 or batch_size <= 0 or patience < 0:
+        raise HTTPException(status_code=422, detail="workers, epochs et batch_size doivent être positifs")
 
-    except Exception as e:
-        app_logger.error(f"Erreur à l'entraînement : {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    try:
+        job = submit_training(
+            fn=cross_validation_job, folds=folds, workers=workers,
+            epochs=epochs, batch_size=batch_size, patience=patience,
+        )
+    except TrainingInProgressError as e:
+        return JSONResponse(
+            status_code=409,
+            content={"detail": str(e), "job_id": e.job_id},
+        )
+
+    app_logger.info(f"Validation croisée lancée : {folds} folds (job {job.id})")
+    return {"job_id": job.id, "status": job.status, "folds": folds}
+
+
+@router.get("/{job_id}")
+def train_status(job_id: str):
+    """
+    Statut, étape, progression (epoch, loss) et métriques finales d'un entraînement
+    """
+    job = job_registry.get(job_id)
+    if job is None or job.kind != "train":
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
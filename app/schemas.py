@@ -61,3 +61,13 @@ class Pret(PretBase):
 class ClientInput(BaseModel):
     client: ClientBase
     pret: PretBase
+
+
+# =========================================================
+#      Schema de contrôle pour la recherche d'hyperparamètres
+# =========================================================
+class HyperparamSearch(BaseModel):
+    strategy: str = "grid"                      # grid / random
+    n_trials: Optional[int] = None              # défaut : toute la grille (grid) ou 10 (random)
+    workers: Optional[int] = None               # défaut : TRAIN_SEARCH_WORKERS
+    space: Optional[dict[str, list]] = None     # ex. {"hidden_units": [[64, 32]], "learning_rate": [0.001]}
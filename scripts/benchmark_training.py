@@ -0,0 +1,153 @@
+"""
+Benchmark du pipeline d'entraînement sur données synthétiques.
+
+Pour chaque taille (10k, 100k, 1M lignes par défaut), un processus séparé :
+remplit la base (scripts/synthetic_data.py, base SQLite dédiée sauf --database-url),
+lance un entraînement complet (train_model_job, comme POST /train) et relève la durée
+de chaque étape dans l'histogramme stage_duration_seconds : extraction, prétraitement,
+split, model.fit, évaluation, logging des artefacts. Une ligne JSON par taille est
+ajoutée au fichier de résultats, avec le commit git, pour comparer les versions.
+
+Usage :
+    PYTHONPATH=. python scripts/benchmark_training.py --rows 10000 100000 --epochs 5
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_ROWS = [10000, 100000, 1000000]
+DEFAULT_OUTPUT = "benchmarks/training_results.jsonl"
+
+# Étapes relevées (labels stage de stage_duration_seconds{pipeline="train"})
+STAGES = {
+    "db_extraction": "load_training_dataframe",
+    "preprocessing": "fit_transform",
+    "split": "split",
+    "model_fit": "model_fit",
+    "evaluation": "evaluation",
+    "artifact_logging": "mlflow_logging",
+}
+# Envoi des artefacts à MLflow, en tâche de fond : hors du temps d'entraînement
+UPLOAD_STAGE = "artifact_upload"
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_single(rows, epochs, batch_size, seed):
+    """
+    Mesure d'une taille, dans le processus courant (DATABASE_URL déjà positionnée).
+    """
+    from sqlalchemy import select, func
+
+    from app.database import Base, engine
+    from app.models import Pret
+    from app.modules.artifact_upload import artifact_uploader
+    from app.modules.jobs import Job
+    from app.modules.metrics import STAGE_SECONDS
+    from app.modules.training import train_model_job
+    from scripts.synthetic_data import populate
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count(Pret.id))).scalar_one()
+    generation_seconds = None
+    if existing != rows:
+        start = time.perf_counter()
+        populate(engine, rows, seed=seed)
+        generation_seconds = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    result = train_model_job(Job(id=f"bench-{rows}", kind="train"), epochs=epochs, batch_size=batch_size,
+                             patience=0)
+    total = time.perf_counter() - start
+    artifact_uploader.flush()
+
+    stages = {
+        name: round(STAGE_SECONDS.labels(pipeline="train", stage=stage).snapshot()["sum"], 4)
+        for name, stage in STAGES.items()
+    }
+    # Reste : création du run MLflow, construction du modèle, sessions...
+    stages["other"] = round(total - sum(stages.values()), 4)
+    stages["artifact_upload_background"] = round(
+        STAGE_SECONDS.labels(pipeline="train", stage=UPLOAD_STAGE).snapshot()["sum"], 4
+    )
+    return {
+        "rows": rows,
+        "epochs": epochs,
+        "batch_size": batch_size,
+        "stages_seconds": stages,
+        "total_seconds": round(total, 4),
+        "generation_seconds": generation_seconds,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "metrics": result["metrics"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline d'entraînement")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--database-url", help="Base à utiliser (vidée et remplie) ; défaut : une base SQLite par taille")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "training-benchmark"),
+                        help="Bases SQLite (réutilisées d'un lancement à l'autre) et suivi MLflow du benchmark")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.single, args.epochs, args.batch_size, args.seed)))
+        return
+
+    os.makedirs(args.workdir, exist_ok=True)
+    context = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+    }
+
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    for rows in args.rows:
+        env = {
+            **os.environ,
+            "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(args.workdir, f'bench_{rows}.db')}",
+            "MLFLOW_TRACKING_URI": os.environ.get(
+                "MLFLOW_TRACKING_URI", f"sqlite:///{os.path.join(args.workdir, 'mlflow.db')}"
+            ),
+            # On mesure le pipeline complet, pas la relecture d'un instantané
+            "FEATURE_SNAPSHOT_ENABLED": "false",
+            "ARTIFACT_SPOOL_DIR": os.path.join(args.workdir, "spool"),
+        }
+        command = [sys.executable, os.path.abspath(__file__), "--single", str(rows),
+                   "--epochs", str(args.epochs), "--batch-size", str(args.batch_size), "--seed", str(args.seed)]
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(completed.stderr[-2000:], file=sys.stderr)
+            sys.exit(f"Échec du benchmark pour {rows} lignes")
+
+        record = {**context, **json.loads(completed.stdout.strip().splitlines()[-1])}
+        with open(args.output, "a") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        stages = ", ".join(f"{k}={v:.2f}s" for k, v in record["stages_seconds"].items())
+        print(f"{rows} lignes : {record['total_seconds']:.1f} s ({stages}), pic mémoire {record['peak_rss_mb']} Mo")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,564 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import resource
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
 import pandas as pd
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from sqlalchemy import insert, update, select, bindparam
+from app.config import IMPORT_BATCH_SIZE, IMPORT_WORKERS, IMPORT_KEY_COLUMNS
+from app.database import engine
 from app.models import Client, Pret
-from datetime import datetime
+from app.modules.schema import upgrade_schema
 
 CSV_PATH = "data/data.csv"
 
+# Schéma du CSV : colonnes importées et type attendu. Les autres colonnes (nom, prenom,
+# sexe, nationalité : RGPD / raisons éthiques) ne sont pas importées ; nom et prenom
+# ne servent qu'à l'empreinte d'identité de la ligne (IMPORT_KEY_COLUMNS).
+# float : virgule décimale ("62,5") ; date : AAAA-MM-JJ ; category : modalités texte
+CSV_SCHEMA = {
+    "age": "int",
+    "taille": "float",
+    "poids": "float",
+    "sport_licence": "category",
+    "smoker": "category",
+    "niveau_etude": "category",
+    "region": "category",
+    "situation_familiale": "category",
+    "historique_credits": "float",
+    "risque_personnel": "float",
+    "score_credit": "float",
+    "date_creation_compte": "date",
+    "revenu_estime_mois": "int",
+    "loyer_mensuel": "float",
+    "montant_pret": "float",
+}
 
-def convert_comma_float(x):
-    """Convertit '62,5' -> 62.5, retourne None si vide."""
-    if pd.isna(x):
-        return None
-    if isinstance(x, str):
-        return float(x.replace(",", "."))
-    return float(x)
+# Ligne rejetée si l'une de ces colonnes est vide
+REQUIRED_COLUMNS = ["age", "revenu_estime_mois"]
 
+# score_credit et risque_personnel alimentent à la fois le client et le prêt
+CLIENT_COLUMNS = [
+    "age", "taille", "poids", "sport_licence", "smoker", "niveau_etude", "region", "situation_familiale",
+    "historique_credits", "risque_personnel", "score_credit", "date_creation_compte",
+]
+PRET_COLUMNS = ["montant_pret", "revenu_estime_mois", "loyer_mensuel", "score_credit", "risque_personnel"]
 
-def import_csv():
-    print("Lecture du CSV : {CSV_PATH}")
-    df = pd.read_csv(CSV_PATH)
+# Nombre d'exemples de lignes rejetées gardés dans le rapport
+MAX_REJECT_EXAMPLES = 10
 
-    db: Session = SessionLocal()
 
-    for idx, row in df.iterrows():
-        print(f" => Import ligne {idx+1}/{len(df)} : {row['nom']}")
+def read_csv(path, chunksize=None):
+    """
+    Lit les colonnes du schéma et de la clé source en texte brut (la conversion
+    est faite par parse_frame). Avec `chunksize`, retourne un itérateur de DataFrames.
+    """
+    columns = list(CSV_SCHEMA) + [c for c in IMPORT_KEY_COLUMNS if c not in CSV_SCHEMA]
+    return pd.read_csv(path, usecols=columns, dtype=str, chunksize=chunksize)
 
-        # ---------------------------
-        # Création du Client
-        # ---------------------------
-        client = Client(
-            # Pas d'import des données protégées par la RGPD
-            # nom=row["nom"],
-            # prenom=row["prenom"],
-            age=int(row["age"]),
 
-            # valeurs string comme dans CSV
-            taille=convert_comma_float(row["taille"]),
-            poids=convert_comma_float(row["poids"]),
-            # sexe=row["sexe"], # Ecartée pour des raisons éthiques
-            sport_licence=row["sport_licence"],
-            smoker=row["smoker"],
-            niveau_etude=row["niveau_etude"],
-            region=row["region"],
+def _sha256(raw, columns):
+    # Cellules d'une ligne jointes par un séparateur hors texte, puis une empreinte par ligne
+    cells = [raw[col].str.strip().fillna("").tolist() for col in columns]
+    return pd.Series(
+        [hashlib.sha256("\x1f".join(row).encode()).hexdigest() for row in zip(*cells)],
+        index=raw.index, dtype=object,
+    )
 
-            # Ecartée pour des raisons éthiques
-            # nationalite_francaise=row["nationalité_francaise"],
 
-            situation_familiale=row.get("situation_familiale"),
+def fingerprint_rows(raw):
+    """
+    Empreintes de chaque ligne brute : clé source (colonnes IMPORT_KEY_COLUMNS,
+    None si elles sont toutes vides) et contenu importé (colonnes CSV_SCHEMA).
+    """
+    keys = _sha256(raw, IMPORT_KEY_COLUMNS).where(raw[IMPORT_KEY_COLUMNS].notna().any(axis=1), None)
+    return keys, _sha256(raw, list(CSV_SCHEMA))
 
-            historique_credits=convert_comma_float(row["historique_credits"]),
-            risque_personnel=convert_comma_float(row["risque_personnel"]),
-            score_credit=convert_comma_float(row["score_credit"]),
 
-            date_creation_compte=(
-                None if pd.isna(row["date_creation_compte"])
-                else datetime.strptime(row["date_creation_compte"], "%Y-%m-%d").date()
-            ),
-        )
+def _to_float(values):
+    """
+    Texte (point décimal) -> float64, cellules invalides à NaN. La conversion
+    numpy arrondit comme float() ; pd.to_numeric, plus tolérant mais parfois
+    décalé d'un ulp, ne sert qu'à repérer les cellules invalides.
+    """
+    try:
+        return values.astype("float64")
+    except ValueError:
+        valid = pd.to_numeric(values, errors="coerce").notna()
+        parsed = pd.Series(np.nan, index=values.index)
+        parsed[valid] = values[valid].astype("float64")
+        return parsed
+
+
+def parse_frame(raw):
+    """
+    Conversion vectorisée, colonne par colonne, des cellules texte selon CSV_SCHEMA.
+
+    Parameters
+    ----------
+    raw : pd.DataFrame
+        Colonnes du schéma en texte (read_csv) ; l'index est la position de la
+        ligne dans le fichier (ligne du CSV = index + 2).
+
+    Returns
+    -------
+    (frame, rejects) : lignes valides typées (Int64, float64, datetime64,
+    category), prêtes pour insert_batch, et liste des rejets
+    (ligne du CSV, colonne, valeur, motif).
+    """
+    typed, rejects = {}, []
+    rejected = pd.Series(False, index=raw.index)
+    for col, kind in CSV_SCHEMA.items():
+        values = raw[col].str.strip().replace("", None)
+        present = values.notna()
+        if kind in ("int", "float"):
+            parsed = _to_float(values.str.replace(",", ".", regex=False))
+            invalid = present & ~np.isfinite(parsed)
+            if kind == "int":
+                invalid |= present & (parsed % 1 != 0)
+                parsed = parsed.where(~invalid).astype("Int64")
+            reason = "entier invalide" if kind == "int" else "nombre invalide"
+        elif kind == "date":
+            parsed = pd.to_datetime(values, format="%Y-%m-%d", errors="coerce")
+            invalid = present & parsed.isna()
+            reason = "date invalide (AAAA-MM-JJ)"
+        else:
+            parsed = values.astype("category")
+            invalid = pd.Series(False, index=raw.index)
+            reason = None
+
+        # Seules les lignes en erreur sont parcourues une à une, pour le rapport
+        for idx in raw.index[invalid]:
+            rejects.append((int(idx) + 2, col, raw.at[idx, col], reason))
+        if col in REQUIRED_COLUMNS:
+            for idx in raw.index[~present]:
+                rejects.append((int(idx) + 2, col, None, "valeur manquante"))
+            invalid = invalid | ~present
+
+        rejected |= invalid
+        typed[col] = parsed
+
+    frame = pd.DataFrame(typed, index=raw.index)[~rejected]
+    return frame, rejects
+
+
+class RejectReport:
+    """
+    Rapport compact des lignes rejetées : nombre de lignes, effectif par
+    (colonne, motif) et premiers exemples.
+    """
+
+    def __init__(self, max_examples=MAX_REJECT_EXAMPLES):
+        self.max_examples = max_examples
+        self.lines = set()
+        self.reasons = Counter()
+        self.examples = []
+
+    def add(self, rejects):
+        for line, column, value, reason in rejects:
+            self.lines.add(line)
+            self.reasons[f"{column} : {reason}"] += 1
+            if len(self.examples) < self.max_examples:
+                self.examples.append({"line": line, "column": column, "value": value, "reason": reason})
+
+    def summary(self):
+        return {
+            "rows": len(self.lines),
+            "reasons": dict(self.reasons.most_common()),
+            "examples": sorted(self.examples, key=lambda e: e["line"]),
+        }
+
+    def print(self):
+        if not self.lines:
+            return
+        print(f"{len(self.lines)} ligne(s) rejetée(s) :")
+        for reason, count in self.reasons.most_common():
+            print(f"  - {reason} : {count}")
+        for e in sorted(self.examples, key=lambda e: e["line"]):
+            print(f"    ligne {e['line']}, {e['column']} = {e['value']!r} ({e['reason']})")
+
+
+def _records(frame, columns):
+    """
+    Colonnes typées -> dictionnaires pour l'INSERT (types Python, None pour les vides).
+    Conversion colonne par colonne puis assemblage par zip, plus rapide que to_dict("records").
+    """
+    arrays = []
+    for col in columns:
+        values = frame[col]
+        if CSV_SCHEMA.get(col) == "date":
+            values = values.dt.date
+        values = values.astype(object)
+        arrays.append(values.where(values.notna(), None).tolist())
+    return [dict(zip(columns, row)) for row in zip(*arrays)]
+
+
+def insert_batch(conn, frame):
+    """
+    Insère clients et prêts d'un paquet de lignes typées (parse_frame, avec
+    source_key et row_hash) sur la connexion `conn`.
+
+    Les clients sont insérés en un INSERT ... RETURNING id multi-lignes
+    (ids rendus dans l'ordre des lignes), puis les prêts, reliés à leur client
+    et marqués de la clé source de la ligne, en un seul INSERT multi-lignes.
+    """
+    if frame.empty:
+        return 0
+    client_ids = conn.execute(
+        insert(Client).returning(Client.id, sort_by_parameter_order=True),
+        _records(frame, CLIENT_COLUMNS + ["source_key", "row_hash"]),
+    ).scalars().all()
+    insert_prets(conn, frame, client_ids)
+    return len(client_ids)
+
+
+def insert_prets(conn, frame, client_ids):
+    """
+    Insère les prêts importés des lignes de `frame` pour les clients `client_ids` (même ordre).
+    """
+    prets = _records(frame, PRET_COLUMNS + ["source_key"])
+    for pret, client_id in zip(prets, client_ids):
+        pret["client_id"] = int(client_id)
+    conn.execute(insert(Pret), prets)
+
+
+def update_batch(conn, frame, client_ids, pret_ids):
+    """
+    Met à jour en place les clients `client_ids` et le prêt importé de chacun
+    (`pret_ids`, même ordre que les lignes typées de `frame`) en deux UPDATE
+    exécutés en lot. Les autres prêts du client (créés par l'API) ne sont pas
+    touchés ; un prêt importé supprimé depuis est recréé.
+    """
+    if frame.empty:
+        return 0
+    clients = _records(frame, CLIENT_COLUMNS + ["row_hash"])
+    for client, client_id in zip(clients, client_ids):
+        client["b_id"] = int(client_id)
+    conn.execute(update(Client).where(Client.id == bindparam("b_id")), clients)
+
+    imported = pret_ids.notna().to_numpy()
+    prets = _records(frame[imported], PRET_COLUMNS)
+    for pret, pret_id in zip(prets, pret_ids[imported]):
+        pret["b_id"] = int(pret_id)
+    if prets:
+        conn.execute(update(Pret).where(Pret.id == bindparam("b_id")), prets)
+    if not imported.all():
+        insert_prets(conn, frame[~imported], client_ids[~imported])
+    return len(clients)
+
+
+def duplicate_key_rejects(positions):
+    """
+    Rejets des lignes (positions dans le fichier) écartées au profit d'une ligne
+    plus loin dans le fichier ayant la même clé source.
+    """
+    key_label = "+".join(IMPORT_KEY_COLUMNS)
+    return [(int(idx) + 2, key_label, None, "clé source en double (dernière ligne gardée)") for idx in positions]
+
+
+def upsert_batch(conn, raw):
+    """
+    Import incrémental d'un paquet de lignes brutes (read_csv) sur la connexion `conn`.
+
+    Chaque ligne est identifiée par l'empreinte de sa clé source et comparée, par
+    l'empreinte de son contenu, au client déjà importé : les lignes inchangées
+    sont ignorées avant toute conversion, les lignes modifiées mises à jour en
+    place, les nouvelles insérées en masse. Une clé présente plusieurs fois :
+    la dernière ligne l'emporte.
+
+    Returns
+    -------
+    (counts, rejets) : effectifs inserted / updated / unchanged, rejets (cf. parse_frame).
+    """
+    counts, rejects = Counter(), []
+    keys, hashes = fingerprint_rows(raw)
+    raw = raw.assign(source_key=keys, row_hash=hashes)
+
+    key_label = "+".join(IMPORT_KEY_COLUMNS)
+    no_key = raw["source_key"].isna()
+    duplicate = raw.duplicated("source_key", keep="last") & ~no_key
+    for idx in raw.index[no_key]:
+        rejects.append((int(idx) + 2, key_label, None, "clé source vide"))
+    rejects += duplicate_key_rejects(raw.index[duplicate])
+    raw = raw[~no_key & ~duplicate]
+
+    existing = conn.execute(
+        select(Client.source_key, Client.id, Client.row_hash, Pret.id)
+        .outerjoin(Pret, Pret.source_key == Client.source_key)
+        .where(Client.source_key.in_(raw["source_key"].tolist()))
+    ).all()
+    ids = raw["source_key"].map({key: client_id for key, client_id, _, _ in existing})
+    pret_ids = raw["source_key"].map({key: pret_id for key, _, _, pret_id in existing})
+    unchanged = raw["source_key"].map({key: row_hash for key, _, row_hash, _ in existing}) == raw["row_hash"]
+    counts["unchanged"] = int(unchanged.sum())
 
-        db.add(client)
-        db.commit()
-        db.refresh(client)  # récupère l'id généré pour le Pret
-
-        # ---------------------------
-        # Création du Pret
-        # ---------------------------
-        pret = Pret(
-            client_id=client.id,
-            montant_pret=convert_comma_float(row["montant_pret"]),
-            revenu_estime_mois=int(row["revenu_estime_mois"]),
-            loyer_mensuel=convert_comma_float(row["loyer_mensuel"]),
-            score_credit=convert_comma_float(row["score_credit"]),
-            risque_personnel=convert_comma_float(row["risque_personnel"]),
+    todo = raw[~unchanged]
+    frame, parse_rejects = parse_frame(todo)
+    rejects += parse_rejects
+    frame = frame.join(todo[["source_key", "row_hash"]])
+
+    known = ids[frame.index].notna()
+    counts["inserted"] = insert_batch(conn, frame[~known])
+    counts["updated"] = update_batch(
+        conn, frame[known], ids[frame.index][known], pret_ids[frame.index][known]
+    )
+    return counts, rejects
+
+
+def _finish(counts, report, start, **extra):
+    """
+    Résumé commun aux deux modes ; si des lignes ont été modifiées en place,
+    les instantanés de features (dont l'empreinte ne voit pas les UPDATE) sont supprimés.
+    """
+    from app.modules.feature_snapshot import feature_snapshots
+
+    if counts["updated"]:
+        feature_snapshots.clear()
+
+    duration = time.time() - start
+    processed = counts["inserted"] + counts["updated"] + counts["unchanged"]
+    summary = {
+        "rows": counts["inserted"] + counts["updated"],
+        "inserted": counts["inserted"],
+        "updated": counts["updated"],
+        "unchanged": counts["unchanged"],
+        **extra,
+        "duration_seconds": round(duration, 2),
+        "rows_per_second": round(processed / duration, 1) if duration > 0 else None,
+        "rejected": report.summary(),
+    }
+    print(
+        f"Import terminé en {summary['duration_seconds']} s : {counts['inserted']} ajoutées, "
+        f"{counts['updated']} modifiées, {counts['unchanged']} inchangées ({summary['rows_per_second']} lignes/s)"
+    )
+    report.print()
+    return summary
+
+
+def import_csv(path=CSV_PATH, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import incrémental du CSV (upsert_batch) : une transaction par paquet de
+    `batch_size` lignes (clients et prêts du paquet validés ensemble). Réimporter
+    un export déjà chargé n'écrit que les lignes nouvelles ou modifiées ; les
+    lignes invalides sont écartées et résumées dans le rapport de rejets.
+
+    Returns
+    -------
+    dict
+        Lignes ajoutées / modifiées / inchangées, paquets, durée, débit (lignes/s) et rejets.
+    """
+    upgrade_schema()
+    print(f"Lecture du CSV : {path}")
+    start = time.time()
+    raw = read_csv(path)
+    counts, report = Counter(), RejectReport()
+
+    batches = 0
+    for offset in range(0, len(raw), batch_size):
+        with engine.begin() as conn:
+            batch_counts, rejects = upsert_batch(conn, raw.iloc[offset:offset + batch_size])
+        counts.update(batch_counts)
+        report.add(rejects)
+        batches += 1
+
+    return _finish(counts, report, start, batches=batches, batch_size=batch_size)
+
+
+# ---------------------------------------------------------
+# Import en flux : paquets répartis sur des processus, reprise sur checkpoint
+# ---------------------------------------------------------
+
+def file_identity(path, chunk_size):
+    """
+    Identité du fichier importé (taille, empreinte du début) et découpage :
+    un checkpoint n'est repris que pour le même fichier et la même taille de paquet.
+    """
+    with open(path, "rb") as f:
+        head = hashlib.sha256(f.read(1024 ** 2)).hexdigest()
+    return {"path": os.path.abspath(path), "size": os.path.getsize(path), "head_sha256": head,
+            "chunk_size": chunk_size}
+
+
+def read_checkpoint(checkpoint_path, identity):
+    """
+    Paquets déjà importés d'après le checkpoint (première ligne : identité du
+    fichier, puis une ligne JSON par paquet validé, et une ligne "completed"
+    quand l'import est allé au bout).
+
+    Un checkpoint absent ou terminé démarre un nouvel import (nouvel export
+    déposé au même chemin, par exemple) : il est réécrit avec `identity`.
+
+    Raises
+    ------
+    ValueError
+        Le checkpoint d'un import interrompu appartient à un autre fichier ou à un autre découpage.
+    """
+    header, done, completed = None, set(), False
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = None  # checkpoint vide : arrêt avant l'écriture de l'en-tête
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # dernière ligne tronquée par un arrêt brutal
+                if entry.get("completed"):
+                    completed = True
+                elif "chunk" in entry:
+                    done.add(entry["chunk"])
+
+    if header is None or completed:
+        with open(checkpoint_path, "w") as f:
+            f.write(json.dumps(identity) + "\n")
+        return set()
+    if header != identity:
+        raise ValueError(
+            f"Le checkpoint {checkpoint_path} correspond à un autre fichier ou une autre taille de paquet"
         )
+    return done
+
+
+def complete_checkpoint(checkpoint_path, counts):
+    """
+    Marque le checkpoint comme terminé : le prochain lancement repart de zéro
+    au lieu de le reprendre (ou de le refuser si le fichier a changé).
+    """
+    with open(checkpoint_path, "a") as f:
+        f.write(json.dumps({"completed": True, **counts}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def superseded_rows(path, chunk_size):
+    """
+    Positions des lignes dont la clé source réapparaît plus loin dans le fichier,
+    repérées en un premier passage sur les seules colonnes de la clé.
+
+    Écartées avant l'envoi aux processus, elles ne peuvent pas entrer en
+    concurrence d'un paquet à l'autre : comme dans un paquet (upsert_batch), la
+    dernière ligne l'emporte, quel que soit l'ordre des commits. Les clés sont
+    gardées sous forme de 16 premiers octets de leur empreinte (16 octets par ligne).
+    """
+    digests, positions = [], []
+    for chunk in pd.read_csv(path, usecols=IMPORT_KEY_COLUMNS, dtype=str, chunksize=chunk_size):
+        keys = _sha256(chunk, IMPORT_KEY_COLUMNS)[chunk.notna().any(axis=1)]
+        digests.append(np.array([bytes.fromhex(key[:32]) for key in keys], dtype="S16"))
+        positions.append(keys.index.to_numpy())
+    if not digests:
+        return np.array([], dtype=np.int64)
+
+    # Parcours à rebours : la première occurrence trouvée est la dernière du fichier
+    digests, positions = np.concatenate(digests)[::-1], np.concatenate(positions)[::-1]
+    _, last = np.unique(digests, return_index=True)
+    superseded = np.ones(len(digests), dtype=bool)
+    superseded[last] = False
+    return np.sort(positions[superseded])
+
+
+def _import_chunk(index, raw, checkpoint_path):
+    """
+    Importe un paquet (upsert_batch) dans sa propre transaction (connexion du
+    processus), puis l'inscrit au checkpoint. Un paquet réimporté après un arrêt
+    entre le commit et l'écriture de cette ligne ne crée pas de doublon : ses
+    lignes sont reconnues par leur empreinte. Les paquets ne partagent aucune
+    clé source (superseded_rows) : pas de conflit d'insertion entre processus.
+
+    Returns
+    -------
+    (effectifs, rejets)
+    """
+    with engine.begin() as conn:
+        counts, rejects = upsert_batch(conn, raw)
+    with open(checkpoint_path, "a") as f:
+        f.write(json.dumps({"chunk": index, **counts}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return counts, rejects
+
+
+def import_csv_streaming(path=CSV_PATH, chunk_size=IMPORT_BATCH_SIZE, workers=IMPORT_WORKERS,
+                         checkpoint_path=None):
+    """
+    Import en flux d'un gros CSV : lecture par paquets de `chunk_size` lignes,
+    répartis sur `workers` processus (chacun avec sa connexion à la base ;
+    au plus 2 paquets en attente par processus pour borner la mémoire).
+
+    Chaque paquet validé est inscrit dans `checkpoint_path` (défaut :
+    <fichier>.checkpoint) ; relancer un import interrompu saute les paquets
+    déjà validés. Un import terminé marque le checkpoint (complete_checkpoint) :
+    le lancement suivant, sur le même fichier ou un nouvel export, repart de zéro.
+    Les lignes sont importées de façon incrémentale (upsert_batch) ; une clé
+    source présente dans plusieurs paquets n'est importée que depuis sa dernière
+    ligne (superseded_rows), les autres sont rejetées.
+
+    Returns
+    -------
+    dict
+        Lignes ajoutées / modifiées / inchangées, paquets, durée, débit et pic mémoire.
+    """
+    upgrade_schema()
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint"
+    done = read_checkpoint(checkpoint_path, file_identity(path, chunk_size))
+    print(f"Lecture du CSV : {path} ({len(done)} paquet(s) déjà importé(s))")
+
+    start = time.time()
+    batches = 0
+    counts, report = Counter(), RejectReport()
+    superseded = superseded_rows(path, chunk_size)
+
+    def collect(future):
+        nonlocal batches
+        batch_counts, rejects = future.result()
+        counts.update(batch_counts)
+        batches += 1
+        report.add(rejects)
 
-        db.add(pret)
-        db.commit()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = set()
+        for index, chunk in enumerate(read_csv(path, chunksize=chunk_size)):
+            if index in done:
+                continue
+            duplicate = chunk.index.isin(superseded)
+            if duplicate.any():
+                report.add(duplicate_key_rejects(chunk.index[duplicate]))
+                chunk = chunk[~duplicate]
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collect(future)
+            pending.add(pool.submit(_import_chunk, index, chunk, checkpoint_path))
+        for future in pending:
+            collect(future)
 
-    db.close()
-    print("Import terminé avec succès !")
+    complete_checkpoint(checkpoint_path, counts)
+    return _finish(
+        counts, report, start, batches=batches, skipped_batches=len(done), batch_size=chunk_size, workers=workers,
+        # ru_maxrss en Ko (Linux) ; pour les processus : le plus gros d'entre eux
+        peak_memory_mb=round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        peak_worker_memory_mb=round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    )
 
 
 if __name__ == "__main__":
-    import_csv()
+    parser = argparse.ArgumentParser(description="Import du CSV clients / prêts dans la base")
+    parser.add_argument("--path", default=CSV_PATH)
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--stream", action="store_true",
+                        help="Lecture par paquets répartis sur plusieurs processus, avec reprise sur checkpoint")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS)
+    parser.add_argument("--checkpoint", help="Fichier de checkpoint (défaut : <path>.checkpoint)")
+    args = parser.parse_args()
+    if args.stream:
+        import_csv_streaming(args.path, args.batch_size, args.workers, args.checkpoint)
+    else:
+        import_csv(args.path, args.batch_size)
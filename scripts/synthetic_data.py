@@ -0,0 +1,118 @@
+"""
+Générateur de données synthétiques clients / prets (benchmarks d'entraînement).
+
+Les lignes sont tirées avec remise dans data/data.csv, ce qui conserve les
+distributions des catégorielles, les taux de valeurs manquantes et les
+corrélations entre colonnes ; les numériques sont ensuite bruitées
+(NUMERIC_NOISE x écart-type) pour ne pas dupliquer exactement les lignes.
+
+Usage :
+    DATABASE_URL=... PYTHONPATH=. python scripts/synthetic_data.py --rows 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, delete
+
+CSV_PATH = "data/data.csv"
+
+# Bruit ajouté aux numériques, en fraction de l'écart-type de la colonne source
+NUMERIC_NOISE = 0.05
+
+CLIENT_COLUMNS = [
+    "age", "taille", "poids", "sport_licence", "smoker", "niveau_etude", "region",
+    "situation_familiale", "historique_credits", "risque_personnel", "score_credit",
+    "date_creation_compte",
+]
+PRET_COLUMNS = ["montant_pret", "revenu_estime_mois", "loyer_mensuel", "score_credit", "risque_personnel"]
+
+FLOAT_COLUMNS = ["taille", "poids", "historique_credits", "risque_personnel", "score_credit",
+                 "loyer_mensuel", "montant_pret"]
+INT_COLUMNS = ["age", "revenu_estime_mois"]
+
+
+def load_source(path=CSV_PATH):
+    """
+    Lit data.csv (virgule décimale) avec les colonnes utilisées par la base.
+    """
+    df = pd.read_csv(path, decimal=",")
+    df["date_creation_compte"] = pd.to_datetime(df["date_creation_compte"], errors="coerce").dt.date
+    return df[list(dict.fromkeys(CLIENT_COLUMNS + PRET_COLUMNS))]
+
+
+def generate(n, seed=0, source=None):
+    """
+    Génère `n` lignes au format de data.csv (une ligne = un client et son prêt).
+
+    Parameters
+    ----------
+    n : int
+        Nombre de lignes.
+    seed : int
+        Graine du générateur (mêmes données pour une même graine).
+    source : pd.DataFrame
+        Données de référence (défaut : data/data.csv).
+    """
+    source = load_source() if source is None else source
+    rng = np.random.default_rng(seed)
+
+    df = source.iloc[rng.integers(0, len(source), n)].reset_index(drop=True)
+    for col in FLOAT_COLUMNS + INT_COLUMNS:
+        values = df[col].astype(float)
+        std = source[col].astype(float).std()
+        noisy = values + rng.normal(0.0, NUMERIC_NOISE * std, n)
+        # On reste dans l'intervalle observé (pas d'âge ou de montant négatif)
+        noisy = noisy.clip(source[col].min(), source[col].max())
+        if col in INT_COLUMNS:
+            noisy = noisy.round()
+        df[col] = noisy.where(values.notna())
+    return df
+
+
+def _records(df, columns):
+    # NaN / NaT -> None pour l'insertion SQL
+    part = df[columns].astype(object)
+    return part.where(part.notna(), None).to_dict("records")
+
+
+def populate(engine, n, seed=0, batch_size=50000):
+    """
+    Remplace le contenu des tables clients / prets par `n` lignes synthétiques,
+    insérées par paquets de `batch_size` (un prêt par client, mêmes ids).
+    """
+    from app.models import Client, Pret
+
+    source = load_source()
+    with engine.begin() as conn:
+        conn.execute(delete(Pret))
+        conn.execute(delete(Client))
+
+    for start in range(0, n, batch_size):
+        size = min(batch_size, n - start)
+        df = generate(size, seed=seed + start, source=source)
+        ids = range(start + 1, start + size + 1)
+        clients = _records(df, CLIENT_COLUMNS)
+        prets = _records(df, PRET_COLUMNS)
+        for i, client, pret in zip(ids, clients, prets):
+            client["id"] = i
+            pret["id"] = i
+            pret["client_id"] = i
+        with engine.begin() as conn:
+            conn.execute(insert(Client), clients)
+            conn.execute(insert(Pret), prets)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remplit la base avec des données synthétiques")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    start = time.time()
+    populate(engine, args.rows, seed=args.seed)
+    print(f"{args.rows} lignes générées en {time.time() - start:.1f} s")
@@ -11,6 +11,15 @@ def test_health():
     assert response.status_code == 200
     assert response.json()["status"] == "OK"
 
+def test_ready_without_model():
+    # Aucun modèle chargé : l'API est vivante mais pas prête
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    data = response.json()
+    assert data["status"] == "not ready"
+    assert data["model"]["loaded"] is False
+    assert data["database"]["connected"] is True
+
 def test_predict():
     payload = {
         "nom": "Dupond",
@@ -132,6 +141,58 @@ def test_delete_client():
     assert get_res.status_code == 404
 
 
+def test_update_client_invalidates_feature_snapshots(tmp_path, monkeypatch):
+    from app.modules.feature_snapshot import feature_snapshots
+
+    payload = {
+        "age": 40, "taille": 170.0, "poids": 65.0, "sport_licence": "non", "smoker": "non",
+        "niveau_etude": "bac", "region": "Bretagne", "situation_familiale": "marié",
+        "historique_credits": 1.0, "risque_personnel": 0.2, "score_credit": 0.6,
+        "date_creation_compte": "2023-06-01"
+    }
+    client_id = client.post("/clients/", json=payload).json()["id"]
+
+    snapshots = tmp_path / "snapshots"
+    (snapshots / "abc").mkdir(parents=True)
+    monkeypatch.setattr(feature_snapshots, "directory", str(snapshots))
+
+    # Modification en place : l'empreinte des données ne change pas, les instantanés sont vidés
+    res = client.put(f"/clients/{client_id}", json={**payload, "age": 41})
+    assert res.status_code == 200
+    assert not snapshots.exists()
+
+    client.delete(f"/clients/{client_id}")
+
+
+def test_startup_upgrades_schema_of_older_database(monkeypatch):
+    from sqlalchemy import MetaData, Table, inspect
+    from app.modules.artifact_upload import artifact_uploader
+    from app.modules.model_store import model_store
+
+    # Base créée avant le réimport incrémental : ni source_key / row_hash, ni index prets.client_id
+    Base.metadata.drop_all(bind=engine)
+    baseline = MetaData()
+    for table in Base.metadata.sorted_tables:
+        columns = [c._copy() for c in table.columns if c.name not in ("source_key", "row_hash")]
+        for column in columns:
+            column.index = None
+            column.unique = None
+        Table(table.name, baseline, *columns)
+    baseline.create_all(bind=engine)
+
+    monkeypatch.setattr(model_store, "start_watcher", lambda: None)
+    monkeypatch.setattr(artifact_uploader, "resume", lambda: None)
+
+    with TestClient(app) as started:
+        response = started.get("/clients/")
+        assert response.status_code == 200
+        assert response.json() == []
+
+    inspector = inspect(engine)
+    assert {"source_key", "row_hash"} <= {c["name"] for c in inspector.get_columns("clients")}
+    assert "ix_prets_client_id" in {i["name"] for i in inspector.get_indexes("prets")}
+
+
 # ---------------------------------------------------------
 # TEST API: Prets
 # ---------------------------------------------------------
@@ -256,3 +317,98 @@ def test_delete_pret():
     # Ensure deleted
     get_res = client.get(f"/prets/{pret_id}")
     assert get_res.status_code == 404
+
+
+# ---------------------------------------------------------
+# TEST API: Prédiction par lot
+# ---------------------------------------------------------
+
+def test_batch_upload_rejects_oversized_body(monkeypatch):
+    from app.routers import predict
+
+    monkeypatch.setattr(predict, "PREDICT_BATCH_MAX_BYTES", 64)
+    body = b"age,revenu_estime_mois\n" + b"30,2000\n" * 20
+    headers = {"content-type": "text/csv"}
+
+    # Refus d'après Content-Length, puis en cours de lecture (corps envoyé par morceaux)
+    assert client.post("/predict/batch/upload", content=body, headers=headers).status_code == 413
+    chunks = (body[i:i + 16] for i in range(0, len(body), 16))
+    assert client.post("/predict/batch/upload", content=chunks, headers=headers).status_code == 413
+
+
+def test_batch_upload_rejects_unreadable_file():
+    for content_type in ("text/csv", "application/x-ndjson"):
+        res = client.post("/predict/batch/upload", content=b"\xff\xfe", headers={"content-type": content_type})
+        assert res.status_code == 400
+        assert res.json()["detail"] == "Fichier non UTF-8"
+
+    # Champ au-delà de la limite du module csv : fichier entier refusé, pas d'erreur 500
+    body = "age,revenu_estime_mois\n30,2000\n\"" + "x" * 200_000 + "\",1\n"
+    res = client.post("/predict/batch/upload", content=body.encode(), headers={"content-type": "text/csv"})
+    assert res.status_code == 400
+    assert res.json()["detail"].startswith("CSV invalide (ligne 3)")
+
+
+# ---------------------------------------------------------
+# TEST API: Métriques
+# ---------------------------------------------------------
+
+def test_metrics_counts_requests_by_route():
+    client.get("/clients/1")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/clients/{client_id}",status="404"}' in body
+    assert "# TYPE stage_duration_seconds histogram" in body
+
+
+# ---------------------------------------------------------
+# TEST API: Entraînement en tâche de fond
+# ---------------------------------------------------------
+
+def test_train_runs_as_single_background_job(monkeypatch):
+    import threading
+    import time
+    from app.modules import training
+
+    release = threading.Event()
+
+    def fake_training(job, model_name, epochs, batch_size, mode, patience):
+        job.stage = "training"
+        job.progress = {"epoch": 1, "epochs": epochs, "loss": 0.5, "val_loss": None}
+        release.wait(5)
+        return {"metrics": {"MSE": 1.0}}
+
+    monkeypatch.setattr(training, "train_model_job", fake_training)
+
+    response = client.post("/train/", params={"epochs": 3})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    # Un seul entraînement à la fois
+    busy = client.post("/train/")
+    assert busy.status_code == 409
+    assert busy.json()["job_id"] == job_id
+
+    release.set()
+    for _ in range(50):
+        status = client.get(f"/train/{job_id}").json()
+        if status["status"] == "completed":
+            break
+        time.sleep(0.05)
+    assert status["status"] == "completed"
+    assert status["progress"]["epochs"] == 3
+    assert status["result"]["metrics"]["MSE"] == 1.0
+
+    assert client.get("/train/unknown").status_code == 404
+
+
+def test_train_search_rejects_unknown_hyperparameter():
+    response = client.post("/train/search", json={"space": {"dropout": [0.1]}})
+    assert response.status_code == 422
+
+
+def test_train_cv_rejects_single_fold():
+    response = client.post("/train/cv", params={"folds": 1})
+    assert response.status_code == 422
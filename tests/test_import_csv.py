@@ -0,0 +1,204 @@
+# ---------------------------------------------------------
+# TEST : import CSV en masse
+# ---------------------------------------------------------
+
+def _write_import_csv(path, n):
+    header = ("nom,prenom,age,taille,poids,sexe,sport_licence,niveau_etude,region,smoker,nationalité_francaise,"
+              "revenu_estime_mois,situation_familiale,historique_credits,risque_personnel,date_creation_compte,"
+              "score_credit,loyer_mensuel,montant_pret")
+    lines = [
+        f'N{i},P,{20 + i},175,"62,5",H,non,bac,Corse,oui,oui,{1000 + i},,,"0,5",2021-04-04,,,"{i}00,5"'
+        for i in range(n)
+    ]
+    path.write_text("\n".join([header] + lines) + "\n")
+    return path
+
+
+def test_import_csv_links_loans_to_their_clients(tmp_path):
+    from app.database import Base, engine, SessionLocal
+    from app.models import Client, Pret
+    from scripts.import_csv import import_csv
+
+    path = _write_import_csv(tmp_path / "data.csv", 5)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        summary = import_csv(str(path), batch_size=2)
+        assert summary["rows"] == 5 and summary["batches"] == 3
+
+        prets = db.query(Pret).join(Client).all()
+        assert len(prets) == 5
+        # Chaque prêt est rattaché au client de la même ligne
+        assert sorted((p.client.age - 20, p.revenu_estime_mois - 1000, p.montant_pret) for p in prets) == [
+            (i, i, float(f"{i}00.5")) for i in range(5)
+        ]
+        assert {p.client.situation_familiale for p in prets} == {None}
+        assert prets[0].client.poids == 62.5
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def test_reimport_only_writes_new_and_changed_rows(tmp_path):
+    from app.database import Base, engine, SessionLocal
+    from app.models import Client, Pret
+    from scripts.import_csv import import_csv
+
+    path = _write_import_csv(tmp_path / "data.csv", 5)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        import_csv(str(path), batch_size=2)
+
+        # Même fichier : aucune écriture
+        summary = import_csv(str(path), batch_size=2)
+        assert (summary["inserted"], summary["updated"], summary["unchanged"]) == (0, 0, 5)
+
+        # Une ligne modifiée (montant du prêt) et une nouvelle ligne
+        lines = path.read_text().splitlines()
+        lines[2] = lines[2].replace('"100,5"', '"999,5"')
+        lines.append(lines[1].replace("N0,", "N5,", 1))
+        path.write_text("\n".join(lines) + "\n")
+
+        summary = import_csv(str(path), batch_size=2)
+        assert (summary["inserted"], summary["updated"], summary["unchanged"]) == (1, 1, 4)
+        assert db.query(Client).count() == 6 and db.query(Pret).count() == 6
+        assert sorted(p.montant_pret for p in db.query(Pret)) == [0.5, 0.5, 200.5, 300.5, 400.5, 999.5]
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def test_reimport_only_updates_the_imported_loan(tmp_path):
+    from app.database import Base, engine, SessionLocal
+    from app.models import Client, Pret
+    from scripts.import_csv import import_csv
+
+    path = _write_import_csv(tmp_path / "data.csv", 3)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        import_csv(str(path), batch_size=2)
+
+        # Prêt ajouté par l'API au client de la ligne N1 ; prêt importé de N2 supprimé
+        n1 = db.query(Pret).filter(Pret.revenu_estime_mois == 1001).one().client_id
+        db.add(Pret(client_id=n1, montant_pret=5000.0, revenu_estime_mois=3000))
+        db.query(Pret).filter(Pret.revenu_estime_mois == 1002).delete()
+        db.commit()
+
+        lines = path.read_text().splitlines()
+        lines[2] = lines[2].replace('"100,5"', '"999,5"')
+        lines[3] = lines[3].replace('"200,5"', '"888,5"')
+        path.write_text("\n".join(lines) + "\n")
+
+        summary = import_csv(str(path), batch_size=2)
+        assert (summary["inserted"], summary["updated"], summary["unchanged"]) == (0, 2, 1)
+        db.expire_all()
+        assert sorted((p.revenu_estime_mois, p.montant_pret) for p in db.query(Pret).filter(Pret.client_id == n1)) == [
+            (1001, 999.5), (3000, 5000.0)
+        ]
+        # Prêt importé supprimé depuis : recréé pour son client
+        assert db.query(Pret).filter(Pret.revenu_estime_mois == 1002).one().montant_pret == 888.5
+        assert db.query(Client).count() == 3 and db.query(Pret).count() == 4
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def test_streaming_import_resumes_from_checkpoint(tmp_path):
+    import json
+    import pytest
+    from app.database import Base, engine, SessionLocal
+    from app.models import Pret
+    from scripts.import_csv import import_csv_streaming, file_identity
+
+    path = _write_import_csv(tmp_path / "data.csv", 5)
+    checkpoint = tmp_path / "import.checkpoint"
+    # Import interrompu après le premier paquet (lignes 0 et 1)
+    checkpoint.write_text(
+        json.dumps(file_identity(str(path), 2)) + "\n" + json.dumps({"chunk": 0, "rows": 2}) + "\n"
+    )
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        summary = import_csv_streaming(str(path), chunk_size=2, workers=1, checkpoint_path=str(checkpoint))
+        assert (summary["rows"], summary["batches"], summary["skipped_batches"]) == (3, 2, 1)
+        assert sorted(p.revenu_estime_mois for p in db.query(Pret)) == [1002, 1003, 1004]
+
+        # Import terminé : checkpoint marqué, le prochain lancement repart de zéro
+        assert json.loads(checkpoint.read_text().splitlines()[-1])["completed"] is True
+
+        # Nouvel export au même chemin : pas de refus, seules les lignes absentes de la base sont écrites
+        _write_import_csv(path, 6)
+        summary = import_csv_streaming(str(path), 2, 1, str(checkpoint))
+        assert (summary["inserted"], summary["unchanged"], summary["skipped_batches"]) == (3, 3, 0)
+        assert db.query(Pret).count() == 6
+
+        # Import interrompu puis relancé avec un autre découpage : le checkpoint n'est pas réutilisé
+        checkpoint.write_text(json.dumps(file_identity(str(path), 2)) + "\n")
+        with pytest.raises(ValueError):
+            import_csv_streaming(str(path), 3, 1, str(checkpoint))
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def test_streaming_import_keeps_last_row_of_a_key_across_chunks(tmp_path):
+    from app.database import Base, engine, SessionLocal
+    from app.models import Client, Pret
+    from scripts.import_csv import import_csv_streaming
+
+    # N0 dans les paquets 0 (deux fois) et 2 : seule sa dernière ligne est importée
+    path = _write_import_csv(tmp_path / "data.csv", 4)
+    lines = path.read_text().splitlines()
+    lines = [lines[0], lines[1], lines[1].replace('"000,5"', '"10,5"'), lines[2], lines[3],
+             lines[1].replace('"000,5"', '"20,5"'), lines[4]]
+    path.write_text("\n".join(lines) + "\n")
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        summary = import_csv_streaming(str(path), 2, 1, str(tmp_path / "import.checkpoint"))
+        assert (summary["inserted"], summary["updated"], summary["batches"]) == (4, 0, 3)
+        assert summary["rejected"]["rows"] == 2
+        assert summary["rejected"]["reasons"] == {"nom+prenom+date_creation_compte : clé source en double (dernière ligne gardée)": 2}
+        assert db.query(Client).count() == 4
+        assert sorted(p.montant_pret for p in db.query(Pret)) == [20.5, 100.5, 200.5, 300.5]
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def test_parse_frame_rejects_bad_rows_with_reasons(tmp_path):
+    from scripts.import_csv import read_csv, parse_frame, RejectReport
+
+    path = _write_import_csv(tmp_path / "data.csv", 3)
+    with open(path, "a") as f:
+        f.write('N,P,abc,175,"62,5",H,non,bac,Corse,oui,oui,1000,,,"0,5",2021-04-04,,,100\n')    # ligne 5
+        f.write('N,P,30,175,"6x,5",H,non,bac,Corse,oui,oui,1000,,,"0,5",2021-13-45,,,100\n')    # ligne 6
+        f.write('N,P,30,175,"62,5",H,non,bac,Corse,oui,oui,,,,"0,5",2021-04-04,,,100\n')        # ligne 7
+
+    frame, rejects = parse_frame(read_csv(str(path)))
+    assert len(frame) == 3
+    assert str(frame["age"].dtype) == "Int64" and str(frame["region"].dtype) == "category"
+    assert frame["poids"].tolist() == [62.5] * 3
+    assert frame["montant_pret"].tolist() == [0.5, 100.5, 200.5]
+
+    report = RejectReport()
+    report.add(rejects)
+    summary = report.summary()
+    assert summary["rows"] == 3
+    assert summary["reasons"] == {
+        "age : entier invalide": 1, "poids : nombre invalide": 1,
+        "date_creation_compte : date invalide (AAAA-MM-JJ)": 1, "revenu_estime_mois : valeur manquante": 1,
+    }
+    assert summary["examples"][0] == {"line": 5, "column": "age", "value": "abc", "reason": "entier invalide"}
@@ -0,0 +1,374 @@
+from app.modules.model_store import ModelStore, ServingModel
+
+
+# ---------------------------------------------------------
+# TEST : cache du modèle et remplacement à chaud
+# ---------------------------------------------------------
+
+def test_model_store_hot_swap(monkeypatch):
+    store = ModelStore(poll_interval=0.01)
+    versions = ["run-1"]
+    loads = []
+
+    def fake_load(version):
+        loads.append(version)
+        return ServingModel(version=version, model=object(), preprocessor=object(), loaded_at=0.0)
+
+    monkeypatch.setattr(store, "_latest_version", lambda: versions[-1])
+    monkeypatch.setattr(store, "_load", fake_load)
+    monkeypatch.setattr(store, "_warm_up", lambda serving: 0.001)
+
+    assert store.loaded is None
+    first = store.current()
+    assert first.version == "run-1"
+    assert first.warmup_seconds == 0.001
+
+    # Pas de rechargement tant que la version n'a pas changé
+    store.refresh()
+    assert loads == ["run-1"]
+
+    # Un nouveau run remplace le modèle courant, l'ancienne référence reste intacte
+    versions.append("run-2")
+    store.refresh()
+    assert store.current().version == "run-2"
+    assert first.version == "run-1"
+    assert loads == ["run-1", "run-2"]
+
+
+# ---------------------------------------------------------
+# TEST : lecture et validation des lots
+# ---------------------------------------------------------
+
+def test_parse_csv_decimal_comma_and_shared_fields():
+    from app.modules.batch_input import parse_csv, validate_rows
+
+    text = (
+        "nom,age,taille,poids,sport_licence,niveau_etude,region,smoker,"
+        "revenu_estime_mois,risque_personnel,score_credit,montant_pret\n"
+        'Foster,19,175,"62,5",non,bac,Corse,oui,4958,"0,19",,500\n'
+        "Tapia,abc,190,63,oui,bac+2,Corse,non,3001,,,700\n"
+    )
+    valid, errors = validate_rows(parse_csv(text))
+
+    assert [idx for idx, _ in valid] == [0]
+    assert list(errors) == [1]
+    row = valid[0][1]
+    assert row.client.poids == 62.5
+    assert row.client.risque_personnel == row.pret.risque_personnel == 0.19
+    assert row.client.score_credit is None
+
+
+def test_parse_ndjson_keeps_order_of_invalid_lines():
+    from app.modules.batch_input import parse_ndjson, validate_rows
+
+    # Entier trop long et imbrication trop profonde : erreurs de ligne, pas d'exception
+    rows = parse_ndjson('{"client": {}}\n\n{bad\n[1]\n' + "1" * 5000 + "\n" + "[" * 100_000 + "\n")
+    valid, errors = validate_rows(rows)
+
+    assert valid == []
+    assert sorted(errors) == [0, 1, 2, 3, 4]
+    assert errors[1].startswith("JSON invalide")
+    assert errors[3].startswith("JSON invalide") and errors[4].startswith("JSON invalide")
+    # Élément qui n'est pas un objet : erreur propre à la ligne
+    assert errors[2].startswith("Input should be a valid dictionary")
+
+
+# ---------------------------------------------------------
+# TEST : micro-batching des appels concurrents
+# ---------------------------------------------------------
+
+class _SumModel:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, X, **kwargs):
+        self.calls.append(X.shape[0])
+        return X.sum(axis=1, keepdims=True)
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    from concurrent.futures import ThreadPoolExecutor
+    import numpy as np
+    from app.modules.batching import MicroBatcher
+
+    model = _SumModel()
+    serving = ServingModel(version="v1", model=model, preprocessor=None, loaded_at=0.0)
+    batcher = MicroBatcher(window_ms=50, max_batch_size=8, queue_depth=64)
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(
+                lambda i: batcher.predict(serving, np.array([[i, 1.0]])), range(8)
+            ))
+    finally:
+        batcher.stop()
+
+    assert [float(r[0]) for r in results] == [i + 1.0 for i in range(8)]
+    assert sum(model.calls) == 8
+    assert len(model.calls) < 8
+    assert batcher.stats()["batch_size"]["count"] == len(model.calls)
+
+
+def test_microbatch_is_not_bounded_by_executor_workers(monkeypatch):
+    import asyncio
+    import numpy as np
+    from app.routers import predict
+    from app.modules.batching import MicroBatcher
+    from app.modules.executor import InferenceExecutor
+
+    model = _SumModel()
+    serving = ServingModel(version="v1", model=model, preprocessor=None, loaded_at=0.0)
+    batcher = MicroBatcher(window_ms=100, max_batch_size=64, queue_depth=64)
+    executor = InferenceExecutor(kind="thread", max_workers=2)
+    monkeypatch.setattr(predict, "micro_batcher", batcher)
+    monkeypatch.setattr(predict, "inference_executor", executor)
+    monkeypatch.setattr(predict, "prepare_prediction", lambda i, use_cache: (serving, None, None, np.array([[i, 1.0]])))
+
+    async def main():
+        return await asyncio.gather(*[predict.run_microbatched_prediction(i) for i in range(16)])
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        batcher.stop()
+        executor.shutdown()
+
+    assert [r["montant_pret"] for r in results] == [i + 1.0 for i in range(16)]
+    # L'attente du lot n'occupe pas les 2 workers : les 16 requêtes peuvent être regroupées
+    assert max(model.calls) > 2
+
+
+# ---------------------------------------------------------
+# TEST : parité du moteur NumPy avec le modèle Keras
+# ---------------------------------------------------------
+
+def test_numpy_model_matches_keras(tmp_path):
+    import numpy as np
+    from app.models_ia import create_nn_model, model_predict
+    from app.modules.numpy_model import NumpyDenseModel
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(256, 12))
+    y = X @ rng.normal(size=12) + 3.0
+
+    model = create_nn_model(X.shape[1])
+    model.fit(X, y, epochs=2, batch_size=32, verbose=0)
+
+    path = tmp_path / "model_weights.npz"
+    NumpyDenseModel.from_keras(model).save(path)
+    numpy_model = NumpyDenseModel.load(path)
+
+    assert numpy_model.input_dim == X.shape[1]
+    np.testing.assert_allclose(
+        model_predict(numpy_model, X), model_predict(model, X), rtol=1e-5, atol=1e-5
+    )
+
+
+# ---------------------------------------------------------
+# TEST : encodeur compilé identique au ColumnTransformer
+# ---------------------------------------------------------
+
+def test_compiled_encoder_matches_transform():
+    import numpy as np
+    import pandas as pd
+    from app.modules.preprocess import build_preprocessor
+    from app.modules.encoder import CompiledEncoder
+
+    numeric_cols = ["age", "taille", "loyer_mensuel"]
+    categorical_cols = ["smoker", "region", "situation_familiale"]
+
+    train = pd.DataFrame({
+        "age": [25, 40, None, 61, 33],
+        "taille": [170.0, 182.5, 165.0, None, 190.0],
+        "loyer_mensuel": [None, 650.0, 800.0, None, 500.0],
+        "smoker": ["oui", "non", "non", "non", "oui"],
+        "region": ["Corse", "Bretagne", "Corse", "Normandie", "Corse"],
+        "situation_familiale": ["marié", None, "veuf", "marié", "célibataire"],
+    })
+    preprocessor = build_preprocessor(numeric_cols, categorical_cols).fit(train)
+    encoder = CompiledEncoder.from_preprocessor(preprocessor)
+
+    # Valeurs manquantes, modalités inconnues et colonne supplémentaire (cible)
+    records = [
+        {"age": 50, "taille": None, "loyer_mensuel": 700.0, "smoker": "non",
+         "region": "Occitanie", "situation_familiale": None, "montant_pret": 1.0},
+        {"age": None, "taille": 175.0, "loyer_mensuel": None, "smoker": "oui",
+         "region": "Corse", "situation_familiale": "divorcé", "montant_pret": 2.0},
+        {"age": 19, "taille": 160.0, "loyer_mensuel": 300.0, "smoker": "non",
+         "region": "Bretagne", "situation_familiale": "veuf", "montant_pret": 3.0},
+    ]
+    expected = preprocessor.transform(pd.DataFrame(records))
+    encoded = encoder.encode_records(records)
+
+    assert encoded.dtype == np.float32
+    assert encoded.shape == expected.shape
+    np.testing.assert_allclose(encoded, expected.astype(np.float32), rtol=1e-6, atol=1e-6)
+
+
+# ---------------------------------------------------------
+# TEST : cache des prédictions
+# ---------------------------------------------------------
+
+def _client_input(**client_overrides):
+    from app.schemas import ClientInput
+
+    client = {"age": 48, "taille": 172, "poids": 75, "sport_licence": "non", "smoker": "non",
+              "niveau_etude": "bac+2", "region": "Occitanie", **client_overrides}
+    return ClientInput(client=client, pret={"montant_pret": 0, "revenu_estime_mois": 2100})
+
+
+def test_prediction_cache_key_and_eviction():
+    from app.modules.prediction_cache import PredictionCache
+
+    cache = PredictionCache(max_entries=2, ttl=60)
+    key_v1 = cache.key(_client_input(), "v1")
+
+    assert key_v1 == cache.key(_client_input(), "v1")
+    assert key_v1 != cache.key(_client_input(), "v2")
+    assert key_v1 != cache.key(_client_input(age=49), "v1")
+
+    assert cache.get(key_v1) is None
+    cache.put(key_v1, 1000.0)
+    assert cache.get(key_v1) == 1000.0
+
+    cache.put("b", 2.0)
+    cache.put("c", 3.0)  # évince l'entrée la moins récemment utilisée
+    assert cache.get(key_v1) is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_prediction_cache_ttl():
+    from app.modules.prediction_cache import PredictionCache
+
+    cache = PredictionCache(max_entries=10, ttl=0)
+    cache.put("a", 1.0)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+# ---------------------------------------------------------
+# TEST : exécuteur d'inférence dédié
+# ---------------------------------------------------------
+
+def test_inference_executor_runs_off_event_loop():
+    import asyncio
+    import threading
+    import pytest
+    from app.modules.executor import InferenceExecutor
+
+    executor = InferenceExecutor(kind="thread", max_workers=2)
+
+    async def main():
+        loop_thread = threading.current_thread().name
+        names = await asyncio.gather(*[
+            executor.run(lambda: threading.current_thread().name) for _ in range(4)
+        ])
+        return loop_thread, names
+
+    try:
+        loop_thread, names = asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+    assert all(name.startswith("inference") for name in names)
+    assert loop_thread not in names
+
+    with pytest.raises(ValueError):
+        InferenceExecutor(kind="gpu")
+    with pytest.raises(ValueError):
+        InferenceExecutor(kind="process", microbatch=True)
+
+
+def _timed_in_worker(value):
+    from app.modules.metrics import stage_timer
+    with stage_timer("predict", "worker_test"):
+        return value * 2
+
+
+def test_process_executor_reports_worker_metrics():
+    import asyncio
+    from app.modules.executor import InferenceExecutor
+    from app.modules.metrics import STAGE_SECONDS
+
+    executor = InferenceExecutor(kind="process", max_workers=1, microbatch=False)
+    try:
+        assert asyncio.run(executor.run(_timed_in_worker, 21)) == 42
+    finally:
+        executor.shutdown()
+
+    # Durée mesurée dans le worker, rejouée dans ce processus
+    assert STAGE_SECONDS.labels(pipeline="predict", stage="worker_test").snapshot()["count"] == 1
+
+
+# ---------------------------------------------------------
+# TEST : re-scoring de tous les prêts par paquets
+# ---------------------------------------------------------
+
+def test_score_all_loans_writes_predictions_by_chunk():
+    import pandas as pd
+    from app.database import Base, engine, SessionLocal
+    from app.models import Client, Pret, Prediction
+    from app.modules.encoder import CompiledEncoder
+    from app.modules.jobs import Job
+    from app.modules.preprocess import build_preprocessor
+    from app.modules.scoring import score_all_loans
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for age in range(20, 25):
+            client = Client(age=age, taille=170.0, poids=70.0, sport_licence="non", smoker="non",
+                            niveau_etude="bac", region="Corse")
+            client.prets = [Pret(montant_pret=1000.0, revenu_estime_mois=2000)]
+            db.add(client)
+        db.commit()
+
+        train = pd.DataFrame({"age": [20, 30], "revenu_estime_mois": [1000, 3000], "smoker": ["oui", "non"]})
+        preprocessor = build_preprocessor(["age", "revenu_estime_mois"], ["smoker"]).fit(train)
+        serving = ServingModel(version="v1", model=_SumModel(), preprocessor=preprocessor, loaded_at=0.0,
+                               encoder=CompiledEncoder.from_preprocessor(preprocessor))
+
+        job = Job(id="test", kind="score-all")
+        result = score_all_loans(job, serving, chunk_size=2)
+        # Un second passage remplace les prédictions de la même version
+        score_all_loans(job, serving, chunk_size=2)
+
+        assert result["scored"] == 5
+        assert job.progress == {"total": 5, "processed": 5, "model_version": "v1"}
+        assert serving.model.calls == [2, 2, 1, 2, 2, 1]
+        predictions = db.query(Prediction).all()
+        assert len(predictions) == 5
+        assert {p.model_version for p in predictions} == {"v1"}
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def test_exclusive_jobs_are_keyed_on_kind_and_key():
+    import threading
+    import time
+    import pytest
+    from app.modules.jobs import JobRegistry, JobInProgressError
+
+    registry = JobRegistry()
+    release = threading.Event()
+    first = registry.submit_exclusive("score-all", "v1", lambda job: release.wait(5))
+
+    with pytest.raises(JobInProgressError) as exc:
+        registry.submit_exclusive("score-all", "v1", lambda job: None)
+    assert exc.value.job_id == first.id
+    # Autre version, ou autre type de job : pas de conflit
+    registry.submit_exclusive("score-all", "v2", lambda job: None)
+    registry.submit_exclusive("train", "v1", lambda job: None)
+
+    # Le job terminé libère la clé
+    release.set()
+    for _ in range(50):
+        try:
+            assert registry.submit_exclusive("score-all", "v1", lambda job: None).id != first.id
+            break
+        except JobInProgressError:
+            time.sleep(0.02)
+    assert first.status == "completed"
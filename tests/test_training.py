@@ -0,0 +1,444 @@
+# ---------------------------------------------------------
+# TEST : extraction des données d'entraînement par paquets
+# ---------------------------------------------------------
+
+def test_load_training_dataframe_matches_feature_records():
+    import numpy as np
+    from app.database import Base, engine, SessionLocal
+    from app.models import Client, Pret
+    from app.modules.preprocess import load_training_dataframe, build_feature_record
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for age in range(20, 25):
+            client = Client(age=age, taille=170.0, poids=70.0, sport_licence="non", smoker="oui",
+                            niveau_etude="bac", region="Corse")
+            client.prets = [Pret(montant_pret=1000.0 * age, revenu_estime_mois=2000, loyer_mensuel=None)]
+            db.add(client)
+        db.commit()
+
+        # Paquets plus petits que le nombre de lignes
+        df = load_training_dataframe(db, chunk_size=2)
+        expected = [build_feature_record(c, p) for c, p in db.query(Client, Pret).join(Pret).all()]
+
+        assert len(df) == 5
+        assert list(df.columns) == list(expected[0].keys())
+        assert df["age"].dtype == np.float64
+        assert df["loyer_mensuel"].isna().all()
+        assert df["montant_pret"].tolist() == [r["montant_pret"] for r in expected]
+        assert df["region"].tolist() == ["Corse"] * 5
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+# ---------------------------------------------------------
+# TEST : dérive des statistiques du scaler (entraînement incrémental)
+# ---------------------------------------------------------
+
+def test_scaler_drift_flags_shifted_columns():
+    import pandas as pd
+    from app.modules.preprocess import build_preprocessor, scaler_drift
+
+    train = pd.DataFrame({"age": [20, 30, 40, 50], "revenu_estime_mois": [1000, 2000, 3000, 4000],
+                          "smoker": ["oui", "non", "oui", "non"]})
+    preprocessor = build_preprocessor(["age", "revenu_estime_mois"], ["smoker"]).fit(train)
+
+    same = scaler_drift(preprocessor, train)
+    assert max(same.values()) < 1e-9
+
+    shifted = train.assign(revenu_estime_mois=train["revenu_estime_mois"] + 5000)
+    drift = scaler_drift(preprocessor, shifted)
+    assert drift["age"] < 1e-9
+    assert drift["revenu_estime_mois"] > 4
+
+
+def test_incremental_training_skips_too_few_new_rows(monkeypatch):
+    import pandas as pd
+    from app.database import Base, engine
+    from app.modules import training, preprocess
+    from app.modules.jobs import Job
+
+    monkeypatch.setattr(training, "_previous_run", lambda: {"run_id": "run-1", "high_water_mark": 10})
+    monkeypatch.setattr(
+        preprocess, "load_training_dataframe",
+        lambda db, **kwargs: pd.DataFrame({"age": [30, 40], "montant_pret": [100.0, 200.0]}),
+    )
+    Base.metadata.create_all(bind=engine)
+
+    result = training.train_model_job(Job(id="test", kind="train"), mode="incremental")
+    assert result["skipped"] is True and result["new_rows"] == 2
+    # Le run précédent reste la référence : les 2 prêts seront repris au run suivant
+    assert (result["run_id"], result["high_water_mark"]) == ("run-1", 10)
+
+
+def test_incremental_training_keeps_previous_architecture(monkeypatch):
+    import contextlib
+    from types import SimpleNamespace
+    import mlflow
+    import numpy as np
+    import pandas as pd
+    from app.database import Base, engine
+    from app.models_ia import create_nn_model
+    from app.modules import training, preprocess
+    from app.modules.jobs import Job
+    from app.modules.numpy_model import NumpyDenseModel
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "age": rng.integers(20, 60, 80).astype(float), "revenu_estime_mois": rng.normal(2000, 300, 80),
+        "smoker": rng.choice(["oui", "non"], 80), "montant_pret": rng.normal(5000, 500, 80),
+    })
+    X, _, preprocessor = preprocess.fit_preprocessor(df)
+    # Run précédent promu par /train/search avec d'autres largeurs que (64, 32)
+    previous = NumpyDenseModel.from_keras(create_nn_model(X.shape[1], hidden_units=(16, 8)))
+    assert previous.hidden_units == (16, 8)
+
+    fitted = {}
+
+    def fake_fit(job, model, *args, **kwargs):
+        fitted["hidden_units"] = NumpyDenseModel.from_keras(model).hidden_units
+        return {"MSE": 1.0}, 1
+
+    monkeypatch.setattr(training, "_previous_run", lambda: {"run_id": "run-1", "high_water_mark": 10})
+    monkeypatch.setattr(training, "_load_previous", lambda run_id: (preprocessor, previous))
+    monkeypatch.setattr(training, "_fit_and_log", fake_fit)
+    monkeypatch.setattr(preprocess, "load_training_dataframe", lambda db, **kwargs: df)
+    run = SimpleNamespace(info=SimpleNamespace(run_id="run-2"))
+    monkeypatch.setattr(mlflow, "start_run", lambda: contextlib.nullcontext(run))
+    monkeypatch.setattr(mlflow, "log_params", lambda params: None)
+    Base.metadata.create_all(bind=engine)
+
+    result = training.train_model_job(Job(id="test", kind="train"), mode="incremental")
+    assert result["mode"] == "incremental"
+    assert fitted["hidden_units"] == (16, 8)
+
+
+# ---------------------------------------------------------
+# TEST : instantanés de features d'entraînement
+# ---------------------------------------------------------
+
+def test_feature_snapshot_roundtrip_and_eviction(tmp_path):
+    import os
+    import time
+    import numpy as np
+    import pandas as pd
+    from app.modules.feature_snapshot import FeatureSnapshotCache
+    from app.modules.preprocess import build_preprocessor
+
+    train = pd.DataFrame({"age": [20, 30], "revenu_estime_mois": [1000, 3000], "smoker": ["oui", "non"]})
+    preprocessor = build_preprocessor(["age", "revenu_estime_mois"], ["smoker"]).fit(train)
+    X = preprocessor.transform(train)
+    y = np.array([1.0, 2.0])
+
+    cache = FeatureSnapshotCache(str(tmp_path), max_bytes=10 ** 9, max_age=3600)
+    assert cache.load("k1") is None
+    cache.save("k1", X, y, preprocessor)
+
+    X2, y2, preprocessor2 = cache.load("k1")
+    assert isinstance(X2, np.memmap)
+    np.testing.assert_array_equal(X2, X)
+    np.testing.assert_array_equal(y2, y)
+    np.testing.assert_array_equal(preprocessor2.transform(train), X)
+
+    # Taille dépassée : le moins récemment utilisé est évincé
+    old = time.time() - 100
+    os.utime(tmp_path / "k1" / "meta.json", (old, old))
+    cache.max_bytes = sum(f.stat().st_size for f in (tmp_path / "k1").iterdir()) + 1
+    cache.save("k2", X, y, preprocessor)
+    assert cache.load("k1") is None
+    assert cache.load("k2") is not None
+
+    # Âge dépassé
+    cache.max_age = 0
+    cache.evict()
+    assert cache.load("k2") is None
+
+
+def test_data_fingerprint_changes_with_new_loans():
+    from app.database import Base, engine, SessionLocal
+    from app.models import Client, Pret
+    from app.modules.feature_snapshot import data_fingerprint
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        client = Client(age=30, taille=170.0, poids=70.0, sport_licence="non", smoker="non",
+                        niveau_etude="bac", region="Corse")
+        client.prets = [Pret(montant_pret=1000.0, revenu_estime_mois=2000)]
+        db.add(client)
+        db.commit()
+
+        before = data_fingerprint(db)
+        assert data_fingerprint(db) == before
+        client.prets.append(Pret(montant_pret=2000.0, revenu_estime_mois=2500))
+        db.commit()
+        assert data_fingerprint(db) != before
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+# ---------------------------------------------------------
+# TEST : essais de la recherche d'hyperparamètres
+# ---------------------------------------------------------
+
+def test_build_trials_grid_and_random():
+    import pytest
+    from app.modules.hyperparam_search import build_trials
+
+    space = {"hidden_units": [[64, 32], [32]], "learning_rate": [0.001, 0.01], "epochs": [5], "batch_size": [32]}
+    grid = build_trials(space)
+    assert len(grid) == 4
+    assert {"hidden_units": [32], "learning_rate": 0.01, "epochs": 5, "batch_size": 32} in grid
+
+    sample = build_trials(space, strategy="random", n_trials=3, seed=1)
+    assert len(sample) == 3
+    assert all(trial in grid for trial in sample)
+    assert sample == build_trials(space, strategy="random", n_trials=3, seed=1)
+
+    with pytest.raises(ValueError):
+        build_trials({"dropout": [0.1]})
+    with pytest.raises(ValueError):
+        build_trials(space, strategy="bayes")
+
+
+# ---------------------------------------------------------
+# TEST : arrêt anticipé sur val_loss
+# ---------------------------------------------------------
+
+def test_train_model_stops_early_and_restores_best_weights():
+    import numpy as np
+    from app.models_ia import create_nn_model, train_model
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(256, 4))
+    y = X @ np.array([1.0, -2.0, 0.5, 0.0])
+    # Validation sans lien avec l'entraînement : val_loss cesse vite de s'améliorer
+    X_val, y_val = rng.normal(size=(64, 4)), rng.normal(size=64) * 100
+
+    model = create_nn_model(4)
+    model, hist = train_model(model, X, y, X_val=X_val, y_val=y_val, epochs=200, batch_size=32, patience=2)
+
+    epochs_run = len(hist.history["loss"])
+    assert epochs_run < 200
+    best = min(hist.history["val_loss"])
+    restored = model.evaluate(X_val.astype("float32"), y_val.astype("float32"), verbose=0)
+    assert np.isclose(restored, best, rtol=1e-3)
+
+
+# ---------------------------------------------------------
+# TEST : entraînement hors mémoire (preprocessor par paquets, découpage par hachage)
+# ---------------------------------------------------------
+
+def test_streamed_preprocessor_matches_full_fit():
+    import numpy as np
+    import pandas as pd
+    from app.modules.out_of_core import StreamingPreprocessorFit
+    from app.modules.preprocess import build_preprocessor, NUMERIC_COLUMNS, CATEGORICAL_COLUMNS
+
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({c: rng.normal(50, 10, n) for c in NUMERIC_COLUMNS})
+    for c in CATEGORICAL_COLUMNS:
+        df[c] = rng.choice(["a", "b", "c", None], n).astype(object)
+    df["montant_pret"] = rng.normal(10000, 1000, n)
+    df.loc[rng.choice(n, 50, replace=False), "age"] = np.nan
+    df["loyer_mensuel"] = np.where(rng.random(n) < 0.5, np.nan, df["loyer_mensuel"])  # > 40 % : écartée
+
+    stats = StreamingPreprocessorFit()
+    for start in range(0, n, 64):
+        stats.update(df.iloc[start:start + 64])
+    streamed = stats.finalize()
+
+    numeric = [c for c in NUMERIC_COLUMNS if c != "loyer_mensuel"]
+    reference = build_preprocessor(numeric, CATEGORICAL_COLUMNS).fit(df.drop(columns=["loyer_mensuel", "montant_pret"]))
+
+    assert list(streamed.feature_names_in_) == numeric + CATEGORICAL_COLUMNS
+    X = df[list(streamed.feature_names_in_)]
+    np.testing.assert_allclose(streamed.transform(X), reference.transform(X), rtol=1e-9, atol=1e-9)
+
+
+def test_validation_mask_is_deterministic():
+    import numpy as np
+    from app.modules.out_of_core import validation_mask
+
+    ids = np.arange(1, 100001)
+    mask = validation_mask(ids, 0.2)
+    assert abs(mask.mean() - 0.2) < 0.01
+    # Même décision pour un id quel que soit le paquet où il est lu
+    np.testing.assert_array_equal(validation_mask(ids[5000:6000], 0.2), mask[5000:6000])
+
+
+def _insert_loans(n):
+    from app.database import Base, engine, SessionLocal
+    from app.models import Client, Pret
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for i in range(n):
+            client = Client(age=20 + i % 40, taille=170.0, poids=70.0, sport_licence="non",
+                            smoker=["oui", "non"][i % 2], niveau_etude="bac", region="Corse")
+            client.prets = [Pret(montant_pret=1000.0 + 50 * (i % 40), revenu_estime_mois=2000 + 10 * i)]
+            db.add(client)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _patch_mlflow(monkeypatch, logged):
+    import contextlib
+    from types import SimpleNamespace
+    import mlflow
+
+    run = SimpleNamespace(info=SimpleNamespace(run_id="run-1"))
+    monkeypatch.setattr(mlflow, "start_run", lambda: contextlib.nullcontext(run))
+    monkeypatch.setattr(mlflow, "log_params", lambda params: None)
+    monkeypatch.setattr(mlflow, "log_metric", lambda key, value: logged.__setitem__(key, value))
+    monkeypatch.setattr(mlflow, "log_metrics", logged.update)
+
+
+def test_out_of_core_training_reports_validation_metrics(monkeypatch):
+    import numpy as np
+    from app.database import Base, engine
+    from app.models_ia import model_predict
+    from app.modules import training
+    from app.modules.evaluate import evaluate_performance
+    from app.modules.jobs import Job
+    from app.modules.out_of_core import iter_chunks, validation_mask
+
+    _insert_loans(60)
+    logged, held_out = {}, {}
+    _patch_mlflow(monkeypatch, logged)
+
+    def fake_log_artifacts(model, preprocessor, hist, perf, model_name):
+        # Référence : métriques recalculées sur les seules lignes de validation
+        df = next(iter_chunks(1000))
+        is_val = validation_mask(df["pret_id"].values, 0.2)
+        X = preprocessor.transform(df[list(preprocessor.feature_names_in_)]).astype(np.float32)
+        held_out.update(evaluate_performance(df["montant_pret"].values[is_val], model_predict(model, X)[is_val]))
+        held_out["perf"] = perf
+
+    monkeypatch.setattr(training, "log_model_artifacts", fake_log_artifacts)
+    try:
+        result = training.train_out_of_core(Job(id="test", kind="train"), epochs=2, batch_size=16,
+                                            validation_fraction=0.2)
+    finally:
+        Base.metadata.drop_all(bind=engine)
+
+    perf = held_out.pop("perf")
+    for name in ("MSE", "MAE", "R²"):
+        assert np.isclose(perf[name], held_out[name], rtol=1e-4)
+        assert result["metrics"][name] == perf[name]
+        assert logged[f"train_{name}"] == result["train_metrics"][name]
+    assert not any(key.startswith("val_") for key in logged)
+
+
+def test_out_of_core_training_refuses_an_empty_split_side(monkeypatch):
+    import math
+    import pytest
+    from app.database import Base, engine
+    from app.modules import training
+    from app.modules.jobs import Job
+    from app.modules.out_of_core import StreamingMetrics
+
+    assert all(math.isnan(v) for v in StreamingMetrics().result().values())
+
+    logged = {}
+    _patch_mlflow(monkeypatch, logged)
+    try:
+        # Un seul prêt (id 1) : côté validation vide avec 10 %
+        _insert_loans(1)
+        with pytest.raises(ValueError, match="sans ligne de validation"):
+            training.train_out_of_core(Job(id="test", kind="train"), epochs=1, validation_fraction=0.1)
+        # Ids 1 à 4 tous en validation avec 99 %
+        _insert_loans(4)
+        with pytest.raises(ValueError, match="sans ligne d'entraînement"):
+            training.train_out_of_core(Job(id="test", kind="train"), epochs=1, validation_fraction=0.99)
+    finally:
+        Base.metadata.drop_all(bind=engine)
+    assert logged == {}
+
+
+# ---------------------------------------------------------
+# TEST : données synthétiques du benchmark d'entraînement
+# ---------------------------------------------------------
+
+def test_synthetic_data_keeps_source_distributions():
+    from scripts.synthetic_data import load_source, generate
+
+    source = load_source()
+    df = generate(20000, seed=1, source=source)
+
+    assert list(df.columns) == list(source.columns)
+    assert len(df) == 20000
+    # Pas de modalité inventée, taux de valeurs manquantes conservés
+    for col in ["niveau_etude", "region", "situation_familiale", "smoker", "sport_licence"]:
+        assert set(df[col].dropna()) <= set(source[col].dropna())
+    assert (df.isna().mean() - source.isna().mean()).abs().max() < 0.02
+    # Numériques bruitées mais dans l'intervalle observé
+    assert df["age"].between(source["age"].min(), source["age"].max()).all()
+    assert abs(df["montant_pret"].mean() - source["montant_pret"].mean()) < 0.05 * source["montant_pret"].std()
+    # Même graine, mêmes données
+    assert generate(100, seed=1, source=source).equals(generate(100, seed=1, source=source))
+
+
+# ---------------------------------------------------------
+# TEST : découpage de la validation croisée
+# ---------------------------------------------------------
+
+def test_fold_indices_keep_test_rows_out_of_folds():
+    import numpy as np
+    from app.modules.cross_validation import fold_indices, summarize_folds
+
+    dev, test, splits = fold_indices(1000, folds=4, test_fraction=0.2)
+    assert len(test) == 200 and not set(dev) & set(test)
+    assert len(splits) == 4
+    # Chaque ligne hors test est en validation dans exactement un fold
+    validation = np.concatenate([val for _, val in splits])
+    assert sorted(validation) == sorted(dev)
+    for train, val in splits:
+        assert not set(train) & set(val)
+        assert not set(train) & set(test)
+
+    summary = summarize_folds([{"MSE": 1.0}, {"MSE": 3.0}])
+    assert summary["MSE"] == {"mean": 2.0, "variance": 1.0}
+
+
+# ---------------------------------------------------------
+# TEST : envoi des artefacts d'entraînement en tâche de fond
+# ---------------------------------------------------------
+
+def test_artifact_uploader_retries_and_resumes(tmp_path, monkeypatch):
+    import json
+    from app.modules import artifact_upload
+    from app.modules.artifact_upload import ArtifactUploader
+
+    spool = tmp_path / "spool"
+    (spool / "run-1").mkdir(parents=True)
+    (spool / "run-1" / "manifest.json").write_text(json.dumps({"run_id": "run-1"}))
+    (spool / ".run-2.tmp").mkdir()  # écriture interrompue
+
+    calls = []
+
+    def flaky_upload(path):
+        calls.append(path)
+        if len(calls) < 3:
+            raise ConnectionError("MLflow indisponible")
+
+    monkeypatch.setattr(artifact_upload, "upload_spooled", flaky_upload)
+    uploader = ArtifactUploader(spool_dir=str(spool), max_retries=3, backoff=0.01)
+    try:
+        # Redémarrage : l'entrée restée dans le spool est renvoyée, l'écriture partielle supprimée
+        assert uploader.pending() == 1
+        assert uploader.resume() == 1
+        assert not (spool / ".run-2.tmp").exists()
+        uploader.flush()
+        assert calls == [str(spool / "run-1")] * 3
+    finally:
+        uploader.stop()